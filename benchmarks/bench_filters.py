@@ -0,0 +1,86 @@
+"""decoded MB/s of every stream filter and predictor on a synthetic corpus"""
+import random
+import zlib
+from corpus import best_of
+from bench_operators import path_stream
+from src.filters import (
+    ascii85_decode,
+    ascii85_encode,
+    ascii_hex_decode,
+    ascii_hex_encode,
+    flate_decode,
+    lzw_decode,
+    lzw_encode,
+    png_unpredict,
+    run_length_decode,
+    run_length_encode,
+    tiff_unpredict,
+)
+from src.utils import png_unpredict as png_unpredict_rows
+
+
+def image_rows(rows: int, columns: int, colors: int, seed: int = 0) -> bytes:
+    """a smooth gradient with noise, as scanned pages are"""
+    rnd = random.Random(seed)
+    return bytes(
+        (x * 3 + y + rnd.randrange(4)) & 0xFF
+        for y in range(rows)
+        for x in range(columns * colors)
+    )
+
+
+def png_filter(raw: bytes, row_len: int, bpp: int, types=(2,)) -> bytes:
+    """PNG-filters every row with the given types in turn"""
+    out = bytearray()
+    prev = bytes(row_len)
+    for n, i in enumerate(range(0, len(raw), row_len)):
+        row = raw[i : i + row_len]
+        kind = types[n % len(types)]
+        left = bytes(bpp) + row[:-bpp]
+        if kind == 1:
+            enc = bytes((r - a) & 0xFF for r, a in zip(row, left))
+        elif kind == 2:
+            enc = bytes((r - b) & 0xFF for r, b in zip(row, prev))
+        elif kind == 3:
+            enc = bytes((r - ((a + b) >> 1)) & 0xFF for r, a, b in zip(row, left, prev))
+        else:
+            enc = row
+        out.append(kind)
+        out += enc
+        prev = row
+    return bytes(out)
+
+
+def main():
+    text = path_stream(5_000)
+    print(f"content corpus {len(text) / 1e6:.1f} MB")
+    cases = [
+        ("FlateDecode", flate_decode, zlib.compress(text)),
+        ("ASCIIHexDecode", ascii_hex_decode, ascii_hex_encode(text)),
+        ("ASCII85Decode", ascii85_decode, ascii85_encode(text)),
+        ("LZWDecode", lzw_decode, lzw_encode(text)),
+        ("RunLengthDecode", run_length_decode, run_length_encode(text)),
+    ]
+    for name, decode, encoded in cases:
+        assert decode(encoded) == text, name
+        t = best_of(lambda: decode(encoded), repeat=3)
+        print(f"{name:<32} {len(text) / t / 1e6:10.1f} MB/s")
+
+    columns, colors = 600, 3
+    raw = image_rows(400, columns, colors)
+    print(f"image corpus {len(raw) / 1e6:.1f} MB")
+    for label, types in (("Up", (2,)), ("Sub", (1,)), ("mixed", (0, 1, 2, 3))):
+        data = png_filter(raw, columns * colors, colors, types)
+        assert png_unpredict(data, columns, colors) == raw, label
+        old = best_of(lambda: png_unpredict_rows(data, columns, colors), repeat=3)
+        new = best_of(lambda: png_unpredict(data, columns, colors), repeat=3)
+        print(f"{'PNG ' + label + ' (per byte)':<32} {len(raw) / old / 1e6:10.1f} MB/s")
+        print(f"{'PNG ' + label:<32} {len(raw) / new / 1e6:10.1f} MB/s  x{old / new:.1f}")
+    diffs = bytes(raw[i] if i % (columns * colors) < colors else (raw[i] - raw[i - colors]) & 0xFF for i in range(len(raw)))
+    assert tiff_unpredict(diffs, columns, colors) == raw
+    t = best_of(lambda: tiff_unpredict(diffs, columns, colors), repeat=3)
+    print(f"{'TIFF predictor 2':<32} {len(raw) / t / 1e6:10.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
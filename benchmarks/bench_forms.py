@@ -0,0 +1,70 @@
+"""pages painting a letterhead and a watermark form: forms fetched and tokenized per page against FormExpander"""
+from corpus import stream_object, build_pdf, write_temp, best_of, report
+from src.pdfparser import PDFFile
+from src.streamparser import iter_operators_chunks
+
+LETTERHEAD = b"\n".join(
+    [b"BT /F1 9 Tf 0 0 Td (Letterhead Inc, 1 Main Street) Tj ET"]
+    + [b"%d 0 m %d 10 l S" % (i, i + 5) for i in range(0, 400, 2)]
+    + [b"/Wm Do"]
+)
+WATERMARK = b"q 0.9 g BT /F1 48 Tf 100 300 Td (CONFIDENTIAL) Tj ET Q"
+
+
+def build_form_document(pages: int) -> bytes:
+    """objects 3.. are the pages, the letterhead paints the watermark and the last form paints itself"""
+    first = 3 + 2 * pages
+    font = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    form = b"/Type /XObject /Subtype /Form /BBox [0 0 612 792] /Resources << /Font << /F1 %d 0 R >> /XObject << /Wm %d 0 R >> >> "
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    objects.append(
+        b"<< /Type /Pages /Kids [%s] /Count %d /MediaBox [0 0 612 792] /Resources << /Font << /F1 %d 0 R >> "
+        b"/XObject << /Lh %d 0 R /Loop %d 0 R >> >> >>"
+        % (b" ".join(b"%d 0 R" % (3 + 2 * i) for i in range(pages)), pages, first, first + 1, first + 3)
+    )
+    for i in range(pages):
+        objects.append(b"<< /Type /Page /Parent 2 0 R /Contents %d 0 R >>" % (4 + 2 * i))
+        objects.append(stream_object(b"q 1 0 0 1 36 700 cm /Lh Do Q BT /F1 12 Tf 72 600 Td (page %d) Tj ET /Loop Do" % i))
+    objects.append(font)
+    objects.append(stream_object(LETTERHEAD, extra=form % (first, first + 2) + b"/Matrix [1 0 0 1 0 50] "))
+    objects.append(stream_object(WATERMARK, extra=form % (first, first + 2)))
+    objects.append(stream_object(b"/Loop Do", extra=b"/Type /XObject /Subtype /Form /BBox [0 0 1 1] /Resources << /XObject << /Loop %d 0 R >> >> " % (first + 3)))
+    return build_pdf(objects)
+
+
+def per_page(file: PDFFile, pages: range) -> int:
+    """what callers did before: fetch, decode and tokenize every form where it is painted"""
+    count = 0
+    for key in pages:
+        page = file[key]
+        pending = [(list(page.operators(expand_forms=False)), page.Resources, 0)]
+        while pending:
+            operators, resources, depth = pending.pop()
+            for op, operands in operators:
+                count += 1
+                if op == "Do" and depth < 16:
+                    form = file.get_object(resources.entry("XObject", operands[0]).on).content
+                    operators = list(iter_operators_chunks(form.iter_decoded()))
+                    pending.append((operators, file.shared_resources(form.streamDict["Resources"]), depth + 1))
+    return count
+
+
+def expanded(file: PDFFile, pages: range) -> int:
+    return sum(sum(1 for _ in file[key].operators()) for key in pages)
+
+
+def main():
+    path = write_temp(build_form_document(1000))
+    file = PDFFile(path, use_mmap=True)
+    pages = range(len(file))
+    print(f"{len(file)} pages, {expanded(file, pages)} operators with the forms expanded")
+    baseline = best_of(lambda: per_page(file, pages), repeat=3)
+    report("forms tokenized per page", baseline, baseline)
+    report("FormExpander", best_of(lambda: expanded(file, pages), repeat=3), baseline)
+    report("extract_text", best_of(lambda: sum(1 for _ in file.iter_text()), repeat=3))
+    print(file[0].extract_text())
+    file.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""device space path boxes: a per-point Python loop against PageGeometry"""
+from corpus import best_of, report
+from bench_operators import path_stream
+from src.streamparser import StreamStack, Path, CurrentMatrix
+from src.geometry import PageGeometry, multiply, IDENTITY
+
+
+def python_boxes(stack: list) -> list:
+    """what callers did before: walk every command and transform every point"""
+    boxes = []
+    pending = [(iter(stack), IDENTITY)]
+    while pending:
+        commands, ctm = pending.pop()
+        for command in commands:
+            if isinstance(command, list):
+                pending.append((commands, ctm))
+                pending.append((iter(command), ctm))
+                break
+            if isinstance(command, CurrentMatrix):
+                ctm = multiply(command.matrix, ctm)
+            elif isinstance(command, Path):
+                a, b, c, d, e, f = ctm
+                xs, ys = [], []
+                for cmd in command:
+                    values = [getattr(cmd, n) for n in cmd.fields]
+                    if cmd.operator == "re":
+                        x, y, w, h = values
+                        values = [x, y, x + w, y, x, y + h, x + w, y + h]
+                    for px, py in zip(values[::2], values[1::2]):
+                        xs.append(a * px + c * py + e)
+                        ys.append(b * px + d * py + f)
+                boxes.append((min(xs), min(ys), max(xs), max(ys)))
+    return boxes
+
+
+def main():
+    stack = StreamStack.get_stack(path_stream(50_000))
+    paths = len(PageGeometry(stack))
+    print(f"{paths} paths")
+    baseline = best_of(lambda: python_boxes(stack), repeat=3)
+    report("per-point loop", baseline, baseline)
+    report("PageGeometry", best_of(lambda: PageGeometry(stack), repeat=3), baseline)
+    geometry = PageGeometry(stack)
+    report("overlapping", best_of(lambda: geometry.overlapping((0, 0, 100, 100)), repeat=5), baseline)
+
+
+if __name__ == "__main__":
+    main()
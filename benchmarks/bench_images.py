@@ -0,0 +1,68 @@
+"""image XObjects: decoding every image to read its size, against PDFImage metadata, passthrough and array modes"""
+import random
+from corpus import stream_object, build_pdf, write_temp, best_of, report
+from src.pdfparser import PDFFile
+
+SIZE = 256
+
+
+def build_image_document(pages: int, seed: int = 0) -> bytes:
+    """one Flate RGB image per page, and a JPEG on every tenth"""
+    rnd = random.Random(seed)
+    tile = bytes(rnd.randrange(256) for _ in range(SIZE * 3))
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None]
+    kids = []
+    for i in range(pages):
+        on = len(objects) + 1
+        kids.append(on)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /Resources << /XObject << /Im0 %d 0 R >> >> /Contents %d 0 R >>" % (on + 2, on + 1))
+        objects.append(stream_object(b"q %d 0 0 %d 0 0 cm /Im0 Do Q" % (SIZE, SIZE)))
+        if i % 10 == 9:
+            jpeg = b"\xff\xd8\xff\xe0" + bytes(rnd.randrange(256) for _ in range(4096)) + b"\xff\xd9"
+            objects.append(
+                b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB "
+                b"/BitsPerComponent 8 /Filter /DCTDecode /Length %d >>\nstream\n" % (SIZE, SIZE, len(jpeg))
+                + jpeg
+                + b"\nendstream"
+            )
+        else:
+            rows = b"".join(tile[j:] + tile[:j] for j in range(0, SIZE * 3, 3))
+            extra = b"/Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB /BitsPerComponent 8 " % (SIZE, SIZE)
+            objects.append(stream_object(rows, extra=extra))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d /MediaBox [0 0 612 792] >>" % (
+        b" ".join(b"%d 0 R" % on for on in kids),
+        pages,
+    )
+    return build_pdf(objects)
+
+
+def images(file: PDFFile) -> list:
+    return [image for key in range(len(file)) for _, image in file[key].images()]
+
+
+def full_decode(file: PDFFile) -> int:
+    """what callers did before: decode the payload to get at anything, JPEGs left out as they need Pillow"""
+    total = 0
+    for key in range(len(file)):
+        ref = file[key].Resources.entry("XObject", "Im0")
+        stream = file.read_object(ref.on).content
+        if stream.filters[0] != "DCTDecode":
+            stream.unapply_filters()
+            total += stream.streamDict["Width"] * stream.streamDict["Height"]
+    return total
+
+
+def main():
+    path = write_temp(build_image_document(200))
+    file = PDFFile(path, use_mmap=True)
+    print(f"{len(file)} pages, {SIZE}x{SIZE} RGB images")
+    baseline = best_of(lambda: full_decode(file), repeat=3)
+    report("decode to read the size", baseline, baseline)
+    report("info", best_of(lambda: [i.info for i in images(file)], repeat=3), baseline)
+    report("passthrough", best_of(lambda: [i.passthrough() for i in images(file)], repeat=3), baseline)
+    report("to_array, JPEGs left out", best_of(lambda: [i.to_array() for i in images(file) if not i.codec], repeat=3), baseline)
+    file.close()
+
+
+if __name__ == "__main__":
+    main()
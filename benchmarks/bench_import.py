@@ -0,0 +1,47 @@
+"""import time of the parser, module by module
+
+each run is a fresh interpreter under -X importtime, the best cumulative
+time of `src.pdfparser` is reported along with NumPy or Pillow when they
+were imported along the way. tests/test_import.py holds the check.
+"""
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+from corpus import ROOT
+
+# imported only by the code that needs them
+HEAVY = ("numpy", "PIL")
+PROBE = "import sys, src.pdfparser; print(' '.join(m for m in {} if m in sys.modules))".format(HEAVY)
+
+
+def import_times() -> Tuple[Dict[str, int], List[str]]:
+    """module -> cumulative microseconds, and the heavy modules that were loaded"""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times, out.stdout.split()
+
+
+def main():
+    # the first run also writes the bytecode caches
+    import_times()
+    runs = [import_times() for _ in range(5)]
+    best = min(times["src.pdfparser"] for times, _ in runs) / 1000
+    times, heavy = min(runs, key=lambda run: run[0]["src.pdfparser"])
+    for name, us in sorted(times.items(), key=lambda item: -item[1]):
+        if name.startswith("src."):
+            print(f"{name:<40} {us / 1000:10.2f} ms")
+    print(f"{'import src.pdfparser':<40} {best:10.2f} ms")
+    if heavy:
+        print(f"imported at import time: {', '.join(heavy)}")
+
+
+if __name__ == "__main__":
+    main()
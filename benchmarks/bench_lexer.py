@@ -0,0 +1,71 @@
+"""scaling of the offset-based lexer on /Widths- and /Kids-style arrays
+
+the legacy functions are the slicing lax_next_elem/PDFList.lax path this
+lexer replaced, trimmed to the elements the arrays contain.
+"""
+import re
+from corpus import best_of
+from src.PDFPrimitives import PDFObject, PDFList, PDFIndirectReference
+from bench_primitives import legacy_token_idx
+
+
+def legacy_is_int(token: bytes) -> bool:
+    return token.lstrip(b"-").isdigit()
+
+
+def legacy_next_elem(data: bytes):
+    data = data.lstrip()
+    space = legacy_token_idx(data)
+    space = len(data) if space < 0 else space
+    token = data[:space]
+    if (_ := token.find(b"]")) != -1:
+        space = _
+        token = data[:space]
+    r = re.search(b"^" + rb"(?P<ON>\d{1,})\s(?P<GN>\d{1,})\sR", data)
+    if r:
+        return PDFIndirectReference(int(r.group("ON")), int(r.group("GN"))), data[r.end() :]
+    elif legacy_is_int(token):
+        return int(token), data[space:]
+    elif data.startswith(b"["):
+        return legacy_list(data)
+    elif data.startswith(b"]"):
+        return b"]", data[1:]
+    raise ValueError(token)
+
+
+def legacy_list(data: bytes):
+    data = data[1:].lstrip()
+    res = PDFList()
+    while True:
+        val, data = legacy_next_elem(data)
+        if val == b"]":
+            break
+        res.append(val)
+    return res, data
+
+
+def widths(n: int) -> bytes:
+    return b"[" + b" ".join(b"%d" % (500 + i % 500) for i in range(n)) + b"]"
+
+
+def kids(n: int) -> bytes:
+    return b"[" + b" ".join(b"%d 0 R" % (i + 3) for i in range(n)) + b"]"
+
+
+def main():
+    print(f"{'array':<8} {'elements':>9} {'lexer ms':>10} {'ns/elem':>8} {'legacy ms':>10}")
+    for name, build in (("Widths", widths), ("Kids", kids)):
+        for n in (1_000, 10_000, 25_000, 50_000, 100_000):
+            data = build(n)
+            assert len(PDFObject.lax(data)) == n
+            t = best_of(lambda: PDFObject.lax(data), repeat=3)
+            # the legacy path is quadratic, past 25k elements it takes minutes
+            legacy = best_of(lambda: legacy_list(data), repeat=1) if n <= 25_000 else None
+            print(
+                f"{name:<8} {n:>9} {t * 1e3:>10.2f} {t * 1e9 / n:>8.0f} "
+                + (f"{legacy * 1e3:>10.2f}" if legacy else f"{'-':>10}")
+            )
+
+
+if __name__ == "__main__":
+    main()
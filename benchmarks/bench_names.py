@@ -0,0 +1,121 @@
+"""dictionary-heavy object parsing and str lookups, with and without interned names
+
+the legacy classes are the PDFName and PDFDict these replaced: a name
+hashed through str() on every hash, and every str lookup made a new name.
+they are swapped into the parser for the "before" rows.
+"""
+import random
+from contextlib import contextmanager
+from typing import Any
+from corpus import best_of, report
+from src import PDFPrimitives
+from src.PDFPrimitives import PDFObject, PDFName, PDFDict
+
+
+class LegacyName(PDFName):
+    def __new__(cls, value: str):
+        return object.__new__(cls)
+
+    def __init__(self, value: str) -> None:
+        self._value = value
+
+    @property
+    def value(self):
+        return self._value
+
+    @staticmethod
+    def from_bytes(raw: bytes):
+        return LegacyName(raw.decode())
+
+    def __eq__(self, value: Any) -> bool:
+        if isinstance(value, PDFName):
+            return self._value == value.value
+        if isinstance(value, str):
+            return self._value == value
+        return False
+
+    def __str__(self) -> str:
+        return f"/{self._value}"
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+
+class LegacyDict(PDFDict):
+    def __setitem__(self, key, value) -> None:
+        if isinstance(key, str):
+            key = LegacyName(key)
+        dict.__setitem__(self, key, value)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return dict.__getitem__(self, LegacyName(key))
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key) -> bool:
+        if isinstance(key, str):
+            return dict.__contains__(self, LegacyName(key))
+        return dict.__contains__(self, key)
+
+
+@contextmanager
+def legacy():
+    names, dicts = PDFPrimitives.PDFName, PDFPrimitives.PDFDict
+    PDFPrimitives.PDFName, PDFPrimitives.PDFDict = LegacyName, LegacyDict
+    try:
+        yield
+    finally:
+        PDFPrimitives.PDFName, PDFPrimitives.PDFDict = names, dicts
+
+
+def font_dicts(n: int, seed: int = 0) -> list:
+    """font, page and annotation dicts as a typical document has them"""
+    rnd = random.Random(seed)
+    out = []
+    for i in range(n):
+        out.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Rotate 0 "
+            b"/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> /XObject << /Im%d %d 0 R >> "
+            b"/ProcSet [/PDF /Text /ImageB] >> /Contents %d 0 R /Annots [%d 0 R] "
+            b"/Group << /S /Transparency /CS /DeviceRGB /I true >> >>"
+            % (rnd.randrange(1000), rnd.randrange(1000), i, i, i, i)
+        )
+    return out
+
+
+def lookups(dicts: list) -> int:
+    found = 0
+    for d in dicts:
+        found += d["Type"] == "Page"
+        resources = d.get("Resources")
+        found += "Font" in resources
+        found += resources["Font"].get("F1") is not None
+        found += d.get("Missing") is None
+        found += d["Group"]["S"] == "Transparency"
+    return found
+
+
+def main():
+    data = font_dicts(20_000)
+    print(f"{len(data)} dicts, {sum(map(len, data)) / 1e6:.1f} MB")
+    parse = lambda: [PDFObject.lax(d) for d in data]
+    with legacy():
+        old_dicts = parse()
+        before = best_of(parse, repeat=3)
+        before_lookup = best_of(lambda: lookups(old_dicts), repeat=3)
+    new_dicts = parse()
+    assert lookups(new_dicts) == lookups(old_dicts)
+    report("parse, legacy names", before, before)
+    report("parse, interned names", best_of(parse, repeat=3), before)
+    report("lookups, legacy names", before_lookup, before_lookup)
+    report("lookups, interned names", best_of(lambda: lookups(new_dicts), repeat=3), before_lookup)
+
+
+if __name__ == "__main__":
+    main()
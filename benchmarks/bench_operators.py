@@ -0,0 +1,34 @@
+"""operators per second on a path-heavy content stream, as CAD exports produce"""
+import random
+from corpus import best_of
+from src.streamparser import iter_operators, StreamStack
+
+
+def path_stream(paths: int, seed: int = 0) -> bytes:
+    rnd = random.Random(seed)
+    out = [b"q 0.5 w 0 0 0 RG 1 0 0 1 0 0 cm\n"]
+    for _ in range(paths):
+        pts = [rnd.uniform(0, 1000) for _ in range(14)]
+        out.append(
+            b"%.2f %.2f m %.2f %.2f l %.2f %.2f %.2f %.2f %.2f %.2f c %.2f %.2f l h S\n"
+            % tuple(pts[:12])
+        )
+        out.append(b"%.2f %.2f 10 10 re f\n" % tuple(pts[12:]))
+    out.append(b"Q\n")
+    return b"".join(out)
+
+
+def main():
+    data = path_stream(50_000)
+    count = sum(1 for _ in iter_operators(data))
+    print(f"{len(data) / 1e6:.1f} MB, {count} operators")
+    for name, func in (
+        ("iter_operators", lambda: sum(1 for _ in iter_operators(data))),
+        ("StreamStack.get_stack", lambda: StreamStack.get_stack(data)),
+    ):
+        t = best_of(func, repeat=3)
+        print(f"{name:<24} {count / t / 1e3:10.0f} k operators/s")
+
+
+if __name__ == "__main__":
+    main()
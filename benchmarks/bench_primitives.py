@@ -0,0 +1,110 @@
+"""per primitive type: lax_at over a buffer of one kind of element, against the lexers it replaced
+
+the legacy functions are the uncompiled `re.search(b"^" + pattern, ...)`
+lexers on sliced data, the two-pass literal string lexer that found the end
+then unescaped into a str, and the token end search that built bytes([i])
+and a list for every byte it looked at.
+"""
+import re
+from corpus import best_of
+from src.PDFPrimitives import PDFObject, PDFIndirectReference
+
+COUNT = 20_000
+
+
+def legacy_token_idx(data: bytes) -> int:
+    for idx, i in enumerate(data):
+        if bytes([i]) in [b" ", b"\n", b"\r"]:
+            return idx
+    return -1
+
+
+def legacy_reference(data: bytes):
+    r = re.search(b"^" + rb"(?P<ON>\d{1,})\s(?P<GN>\d{1,})\sR", data)
+    return PDFIndirectReference(int(r.group("ON")), int(r.group("GN"))), data[r.end() :]
+
+
+def legacy_hex(data: bytes):
+    r = re.search(b"^" + rb"\<(?P<hexstring>[0-9A-Fa-f \t\r\n\f\x00]*)\>", data)
+    return bytes.fromhex(b"".join(r.group("hexstring").split()).decode()), data[r.end() :]
+
+
+def legacy_literal(data: bytes):
+    """balanced parentheses first, then the greedy pattern up to there, a check and a re.sub"""
+    depth, pos = 0, 0
+    while True:
+        pos = re.search(rb"[()\\]", data[pos:]).end() + pos
+        c = data[pos - 1 : pos]
+        if c == b"\\":
+            pos += 1
+        elif c == b"(":
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                break
+    string = re.search(b"^" + rb"(?<!\\\\)\((?P<string>.*)(?<!\\\\)\)", data[:pos]).group("string")
+    if re.search(rb"(?<!\\)[\(\)\n\r\t\b\f]|(?<!\\)\\(?<!\\)", string):
+        raise ValueError("Unencoded string")
+    return re.sub(rb"\\([\(\)\\\n\r\t\b\f])", lambda m: m.group(1), string).decode(), data[pos:]
+
+
+def legacy_token(data: bytes):
+    space = legacy_token_idx(data)
+    space = len(data) if space < 0 else space
+    return data[:space], data[space:]
+
+
+def sliced(lexer, data: bytes) -> int:
+    """the legacy loop: lex an element, strip, go on with the rest"""
+    count = 0
+    while data:
+        _, data = lexer(data)
+        data = data.lstrip()
+        count += 1
+    return count
+
+
+def walked(data: bytes) -> int:
+    """next_elem skips the white space before each element itself"""
+    count, pos = 0, 0
+    while pos < len(data):
+        _, pos = PDFObject.next_elem(data, pos)
+        count += 1
+    return count
+
+
+# name -> one element, the legacy lexer of the kind where there is one
+PRIMITIVES = {
+    "name": (lambda i: b"/Name%d" % i, None),
+    "integer": (lambda i: b"%d" % (i * 37), legacy_token),
+    "real": (lambda i: b"%d.%d" % (i, i % 100), legacy_token),
+    "reference": (lambda i: b"%d 0 R" % i, legacy_reference),
+    "literal string": (lambda i: b"(text shown %d)" % i, legacy_literal),
+    "escaped string": (lambda i: b"(text \\(%d\\) shown)" % i, legacy_literal),
+    "octal, nested": (lambda i: b"(caf\\351 (%d) \\050)" % i, None),
+    "hex string": (lambda i: b"<%08X>" % i, legacy_hex),
+    "keyword": (lambda i: (b"true", b"false", b"null")[i % 3], legacy_token),
+    "array": (lambda i: b"[%d %d 0 R /N]" % (i, i), None),
+    "dictionary": (lambda i: b"<< /Type /Font /W %d >>" % i, None),
+}
+
+
+def main():
+    print(f"{'primitive':<16} {'elements':>9} {'lexer ms':>10} {'ns/elem':>8} {'legacy ms':>10} {'speedup':>8}")
+    for name, (build, legacy) in PRIMITIVES.items():
+        data = b" ".join(build(i) for i in range(COUNT))
+        assert walked(data) == COUNT
+        t = best_of(lambda: walked(data), repeat=3)
+        line = f"{name:<16} {COUNT:>9} {t * 1e3:>10.2f} {t * 1e9 / COUNT:>8.0f}"
+        if legacy is not None:
+            # the slicing makes the legacy loop quadratic, a tenth of the elements is enough
+            part = b" ".join(build(i) for i in range(COUNT // 10))
+            n = sliced(legacy, part)
+            before = best_of(lambda: sliced(legacy, part), repeat=3) * COUNT / n
+            line += f" {before * 1e3:>10.2f} {before / t:>7.1f}x"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""resolving the fonts, forms and graphics states of every page, by hand against the shared resource cache
+
+the pages of a templated document share one resource dictionary. the
+object cache is kept small, as it effectively is for a document much larger
+than its budget, so resolving by hand parses the shared objects again.
+"""
+from corpus import stream_object, build_pdf, write_temp, best_of, report
+from src.objectcache import ObjectCache
+from src.pdfparser import PDFFile
+
+FONTS, FORMS, STATES = 8, 16, 4
+CATEGORIES = (("Font", "F", FONTS), ("XObject", "X", FORMS), ("ExtGState", "G", STATES))
+
+
+def build_templated_document(pages: int) -> bytes:
+    first = 3 + 2 * pages
+    names = []
+    objects = []
+    for kind, count, body in (
+        ("F", FONTS, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"),
+        ("X", FORMS, stream_object(b"0 0 m 10 10 l S", extra=b"/Type /XObject /Subtype /Form /BBox [0 0 10 10] ")),
+        ("G", STATES, b"<< /Type /ExtGState /LW 2 /CA 0.5 >>"),
+    ):
+        refs = []
+        for i in range(count):
+            refs.append(b"/%s%d %d 0 R" % (kind.encode(), i, first + 1 + len(objects)))
+            objects.append(body)
+        names.append(b" ".join(refs))
+    resources = b"<< /Font << %s >> /XObject << %s >> /ExtGState << %s >> >>" % tuple(names)
+    out = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    out.append(
+        b"<< /Type /Pages /Kids [%s] /Count %d /MediaBox [0 0 612 792] >>"
+        % (b" ".join(b"%d 0 R" % (3 + 2 * i) for i in range(pages)), pages)
+    )
+    for i in range(pages):
+        out.append(b"<< /Type /Page /Parent 2 0 R /Resources %d 0 R /Contents %d 0 R >>" % (first, 4 + 2 * i))
+        out.append(stream_object(b"/X0 Do"))
+    out.append(resources)
+    return build_pdf(out + objects)
+
+
+def by_hand(file: PDFFile, pages: list) -> int:
+    """what callers did before: resolve the dictionaries and every reference themselves"""
+    found = 0
+    for page in pages:
+        resources = file.resolve(file.get_object(page._on).content["Resources"])
+        for name, kind, count in CATEGORIES:
+            category = file.resolve(resources[name])
+            for i in range(count):
+                found += category[f"{kind}{i}"](file).content is not None
+    return found
+
+
+def shared(pages: list) -> int:
+    found = 0
+    for page in pages:
+        resources = page.Resources
+        for name, kind, count in CATEGORIES:
+            for i in range(count):
+                found += resources.get(name, f"{kind}{i}") is not None
+    return found
+
+
+def main():
+    path = write_temp(build_templated_document(500))
+    file = PDFFile(path, cache=ObjectCache(max_entries=16))
+    pages = [file[i] for i in range(len(file))]
+    print(f"{len(pages)} pages sharing {FONTS + FORMS + STATES} resources")
+    misses = file.cache.misses
+    baseline = best_of(lambda: by_hand(file, pages), repeat=3)
+    report("resolved by hand", baseline, baseline)
+    print(f"{'':<40} {(file.cache.misses - misses) // 3:10d} parses")
+    misses = file.cache.misses
+    report("PDFResources.get", best_of(lambda: shared(pages), repeat=3), baseline)
+    print(f"{'':<40} {file.cache.misses - misses:10d} parses")
+    file.close()
+
+
+if __name__ == "__main__":
+    main()
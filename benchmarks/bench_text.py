@@ -0,0 +1,77 @@
+"""text extraction throughput over a generated document whose pages share a few fonts"""
+import random
+from corpus import stream_object, build_pdf, write_temp, best_of, report
+from src.pdfparser import PDFFile
+
+WORDS = b"lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor".split()
+TO_UNICODE = b"""/CIDInit /ProcSet findresource begin 12 dict begin begincmap
+1 begincodespacerange <0000> <FFFF> endcodespacerange
+1 beginbfrange <0020> <007E> <0020> endbfrange
+endcmap CMapName currentdict /CMap defineresource pop end end"""
+
+
+def fonts(first: int) -> list:
+    """five font objects starting at object number `first`, the last one a Type0 font"""
+    widths = b" ".join(b"%d" % (400 + (c * 37) % 300) for c in range(32, 127))
+    return [
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /FirstChar 32 /LastChar 126 /Widths [%s] >>" % widths,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Times-Roman >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Symbol /Encoding << /Differences [97 /alpha /beta] >> >>",
+        b"<< /Type /Font /Subtype /Type0 /BaseFont /Sans /Encoding /Identity-H /ToUnicode %d 0 R "
+        b"/DescendantFonts [<< /Type /Font /Subtype /CIDFontType2 /DW 600 /W [32 [250] 97 122 520] >>] >>"
+        % (first + 5),
+        stream_object(TO_UNICODE),
+    ]
+
+
+def page_stream(rnd: random.Random, lines: int = 40) -> bytes:
+    out = [b"q 1 0 0 1 36 0 cm BT /F1 11 Tf 13 TL 0 760 Td"]
+    for line in range(lines):
+        words = rnd.sample(WORDS, 6)
+        font = rnd.randrange(5)
+        out.append(b"/F%d %d Tf" % (font + 1, rnd.choice((9, 10, 11, 12))))
+        if font == 4:
+            text = b" ".join(words).hex().encode()
+            out.append(b"<%s> Tj T*" % b"".join(b"00" + text[i : i + 2] for i in range(0, len(text), 2)))
+        elif line % 3 == 0:
+            out.append(b"[(%s) -300 (%s) 120 ( %s)] TJ T*" % (b" ".join(words[:2]), words[2], b" ".join(words[3:])))
+        elif line % 3 == 1:
+            out.append(b"(%s) ' T*" % b" ".join(words))
+        else:
+            out.append(b"0.5 Tc (%s) Tj 0 Tc 0 -13 Td" % b" ".join(words))
+    out.append(b"ET Q")
+    return b"\n".join(out)
+
+
+def build_text_document(pages: int, seed: int = 0) -> bytes:
+    rnd = random.Random(seed)
+    font_on = 3 + 2 * pages
+    resources = b"<< /Font << %s >> >>" % b" ".join(b"/F%d %d 0 R" % (i + 1, font_on + i) for i in range(5))
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    objects.append(
+        b"<< /Type /Pages /Kids [%s] /Count %d /MediaBox [0 0 612 792] /Resources %s >>"
+        % (b" ".join(b"%d 0 R" % (3 + 2 * i) for i in range(pages)), pages, resources)
+    )
+    for i in range(pages):
+        objects.append(b"<< /Type /Page /Parent 2 0 R /Contents %d 0 R >>" % (4 + 2 * i))
+        objects.append(stream_object(page_stream(rnd)))
+    objects.extend(fonts(font_on))
+    return build_pdf(objects)
+
+
+def main():
+    pages = 2000
+    path = write_temp(build_text_document(pages))
+    file = PDFFile(path, use_mmap=True)
+    print(f"{pages} pages, {sum(map(len, file.iter_text())) / 1e6:.1f} MB of text")
+    for spans in (False, True):
+        seconds = best_of(lambda: sum(1 for _ in file.iter_text(spans)), repeat=3)
+        report(f"iter_text(spans={spans})", seconds)
+        print(f"{'':<40} {pages / seconds:10.0f} pages/s")
+    print(file[0].extract_text()[:300])
+    file.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""open latency: block-based trailer scan vs the byte-at-a-time `read_reverse_order` walk"""
+from corpus import build_document, write_temp, best_of, report
+from src.pdfparser import PDFFile, PDFTrailer, TRAILER_STRING
+from src.utils import read_reverse_order
+
+
+def legacy_read(file):
+    data = bytearray()
+    for i in read_reverse_order(file):
+        if i == TRAILER_STRING:
+            break
+        i.extend(data)
+        data = i
+    return PDFTrailer.parse(bytes(data))
+
+
+def open_close(path):
+    PDFFile(path).close()
+
+
+def main():
+    for keys in (0, 100, 2000):
+        info = b"".join(b"/Key%d (value number %d)\n" % (i, i) for i in range(keys))
+        path = write_temp(build_document([b"q Q\n"] * 10, trailer_extra=info))
+        current = PDFTrailer.read
+        try:
+            PDFTrailer.read = staticmethod(legacy_read)
+            legacy = best_of(lambda: open_close(path))
+        finally:
+            PDFTrailer.read = current
+        report(f"legacy open, {keys} trailer keys", legacy)
+        report(f"block scan open, {keys} trailer keys", best_of(lambda: open_close(path)), legacy)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""synthetic documents for the benchmark scripts
+
+nothing here depends on the parser, so the same files can be fed to the old
+and the new code paths.
+"""
+import os
+import sys
+import zlib
+import tempfile
+import timeit
+from typing import List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the parser is imported as the `src` package
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def stream_object(payload: bytes, compress: bool = True, extra: bytes = b"") -> bytes:
+    if compress:
+        payload = zlib.compress(payload)
+        extra = b"/Filter /FlateDecode " + extra
+    return (
+        b"<< /Length %d %s>>\nstream\n" % (len(payload), extra)
+        + payload
+        + b"\nendstream"
+    )
+
+
+def build_pdf(
+    objects: List[bytes],
+    root: int = 1,
+    trailer_extra: bytes = b"",
+    tail: bytes = b"",
+) -> bytes:
+    """serializes `objects` (object number = index + 1) with a classic xref table"""
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for on, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % on + body + b"\nendobj\n"
+    start_xref = len(out)
+    out += b"xref\n0 %d\n" % (len(objects) + 1)
+    out += b"0000000000 65535 f \n"
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R %s>>\n" % (
+        len(objects) + 1,
+        root,
+        trailer_extra,
+    )
+    out += b"startxref\n%d\n%%%%EOF\n" % start_xref
+    out += tail
+    return bytes(out)
+
+
+def png_up(rows: List[bytes]) -> bytes:
+    """PNG "up" predictor (filter type 2) over equally sized rows"""
+    out = bytearray()
+    prev = bytes(len(rows[0]))
+    for row in rows:
+        out += b"\x02" + bytes((a - b) & 0xFF for a, b in zip(row, prev))
+        prev = row
+    return bytes(out)
+
+
+def build_pdf_xref_stream(
+    objects: List[bytes],
+    root: int = 1,
+    object_stream: bool = True,
+    trailer_extra: bytes = b"",
+) -> bytes:
+    """
+    serializes `objects` with a PDF 1.5 cross-reference stream. with
+    object_stream every object that is not a stream goes into one /ObjStm.
+    """
+    out = bytearray(b"%PDF-1.5\n")
+    rows = {0: (0, 0, 0xFFFF)}
+    compressed = []
+    if object_stream:
+        compressed = [on for on, body in enumerate(objects, 1) if b"stream\n" not in body]
+    objstm_on = len(objects) + 1
+    for on, body in enumerate(objects, 1):
+        if on in compressed:
+            rows[on] = (2, objstm_on, compressed.index(on))
+            continue
+        rows[on] = (1, len(out), 0)
+        out += b"%d 0 obj\n" % on + body + b"\nendobj\n"
+    size = objstm_on
+    if compressed:
+        header = bytearray()
+        payload = bytearray()
+        for on in compressed:
+            header += b"%d %d " % (on, len(payload))
+            payload += objects[on - 1] + b"\n"
+        rows[objstm_on] = (1, len(out), 0)
+        out += b"%d 0 obj\n" % objstm_on + stream_object(
+            bytes(header + payload),
+            extra=b"/Type /ObjStm /N %d /First %d " % (len(compressed), len(header)),
+        ) + b"\nendobj\n"
+        size += 1
+    xref_on = size
+    rows[xref_on] = (1, len(out), 0)
+    size += 1
+    table = [
+        rows[on][0].to_bytes(1, "big") + rows[on][1].to_bytes(4, "big") + rows[on][2].to_bytes(2, "big")
+        for on in range(size)
+    ]
+    start_xref = len(out)
+    out += b"%d 0 obj\n" % xref_on + stream_object(
+        png_up(table),
+        extra=b"/Type /XRef /Size %d /W [1 4 2] /Root %d 0 R "
+        b"/DecodeParms << /Columns 7 /Predictor 12 >> %s" % (size, root, trailer_extra),
+    ) + b"\nendobj\n"
+    out += b"startxref\n%d\n%%%%EOF\n" % start_xref
+    return bytes(out)
+
+
+def append_update(pdf: bytes, objects: dict, root: int = 1) -> bytes:
+    """appends an incremental update replacing or adding `objects` (object number -> body)"""
+    start = pdf.rindex(b"startxref")
+    prev = int(pdf[start + len(b"startxref") : pdf.rindex(b"%%EOF")])
+    size = int(pdf[pdf.rindex(b"/Size") + 5 :].split()[0])
+    out = bytearray(pdf)
+    offsets = {}
+    for on, body in sorted(objects.items()):
+        offsets[on] = len(out)
+        out += b"%d 0 obj\n" % on + body + b"\nendobj\n"
+    start_xref = len(out)
+    # one subsection per object
+    out += b"xref\n"
+    for on, offset in offsets.items():
+        out += b"%d 1\n%010d 00000 n \n" % (on, offset)
+    size = max(size, max(offsets) + 1)
+    out += b"trailer\n<< /Size %d /Root %d 0 R /Prev %d >>\n" % (size, root, prev)
+    out += b"startxref\n%d\n%%%%EOF\n" % start_xref
+    return bytes(out)
+
+
+def build_document(
+    contents: List[bytes], xref_stream: bool = False, fanout: int = None, **kwargs
+) -> bytes:
+    """
+    one content stream per page. the page tree is flat unless `fanout` is
+    given, then it is balanced with at most `fanout` kids per node and the
+    /MediaBox is only set on the root, for the pages to inherit.
+    """
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None]
+    nodes = []
+    for content in contents:
+        page_on = len(objects) + 1
+        objects.append(None)
+        objects.append(stream_object(content))
+        nodes.append((page_on, 1))
+    # group the nodes level by level until a single level fits under the root
+    parents = {}
+    while fanout and len(nodes) > fanout:
+        level = []
+        for i in range(0, len(nodes), fanout):
+            group = nodes[i : i + fanout]
+            on = len(objects) + 1
+            objects.append(
+                b"<< /Type /Pages /Kids [%s] /Count %d /Parent %%(parent)s >>"
+                % (b" ".join(b"%d 0 R" % n for n, _ in group), sum(c for _, c in group))
+            )
+            for n, _ in group:
+                parents[n] = on
+            level.append((on, sum(c for _, c in group)))
+        nodes = level
+    for n, _ in nodes:
+        parents[n] = 2
+    for on, body in enumerate(objects, 1):
+        if body is None and on != 2:
+            objects[on - 1] = (
+                b"<< /Type /Page /Parent %d 0 R %s/Contents %d 0 R >>"
+                % (parents[on], b"" if fanout else b"/MediaBox [0 0 612 792] ", on + 1)
+            )
+        elif body is not None and b"%(parent)s" in body:
+            objects[on - 1] = body.replace(b"%(parent)s", b"%d 0 R" % parents[on])
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d %s>>" % (
+        b" ".join(b"%d 0 R" % n for n, _ in nodes),
+        len(contents),
+        b"/MediaBox [0 0 612 792] /Rotate 90 " if fanout else b"",
+    )
+    if xref_stream:
+        return build_pdf_xref_stream(objects, **kwargs)
+    return build_pdf(objects, **kwargs)
+
+
+def build_page(content: bytes, resources: bytes = b"<< >>", objects: List[bytes] = ()) -> bytes:
+    """
+    a single page painting `content` with `resources`. `objects` follow the
+    content stream, the first is object 5.
+    """
+    return build_pdf(
+        [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources %s /Contents 4 0 R >>" % resources,
+            stream_object(content),
+            *objects,
+        ]
+    )
+
+
+def write_temp(data: bytes, suffix: str = ".pdf") -> str:
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    return path
+
+
+def best_of(func, repeat: int = 5, number: int = 1) -> float:
+    """best wall time of a single call, in seconds"""
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number
+
+
+def report(name: str, seconds: float, baseline: float = None) -> None:
+    line = f"{name:<40} {seconds * 1e3:10.3f} ms"
+    if baseline:
+        line += f"  x{baseline / seconds:.1f}"
+    print(line)
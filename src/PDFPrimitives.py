@@ -1,11 +1,59 @@
-import os, io
 import re
-from typing import Any, Tuple, NewType, List, Union
+import mmap
+from typing import Any, Callable, Dict, Iterator, Tuple, NewType, List, Union
 import zlib
-from src.utils import *
-from PIL.Image import Image, open as open_image
+from .utils import BYTE_CLASS, HEX_DIGITS, REGULAR_SET, WHITESPACE_CHARS, WHITESPACE_SET, byte_set, find_in_file, read_at
+from .filters import (
+    CHUNK_SIZE,
+    ascii85_decode,
+    ascii85_encode,
+    ascii_hex_decode,
+    ascii_hex_encode,
+    dct_decode,
+    flate_decode,
+    iter_ascii85_decode,
+    iter_ascii_hex_decode,
+    iter_flate_decode,
+    iter_identity,
+    iter_lzw_decode,
+    iter_run_length_decode,
+    iter_unpredict,
+    lzw_decode,
+    lzw_encode,
+    run_length_decode,
+    run_length_encode,
+    unpredict,
+)
 
 LaxTuple = NewType("LaxTuple", Tuple["PDFPrimitive", bytes])
+LaxPosTuple = NewType("LaxPosTuple", Tuple["PDFPrimitive", int])
+
+############## lexer ##############
+# the lax_at(data, pos) parsers work on offsets and return the element with
+# the position right after it, the buffer is never sliced while walking it.
+# lax(data) is kept on top of them and returns the remaining data.
+WHITESPACE_PTRN = re.compile(rb"(?:" + WHITESPACE_SET + rb"|%[^\r\n]*)*")
+REGULAR_PTRN = re.compile(REGULAR_SET + rb"*")
+REFERENCE_PATTERN = rb"(?P<ON>\d+)" + WHITESPACE_SET + rb"+(?P<GN>\d+)" + WHITESPACE_SET + rb"+R"
+INTEGER_PATTERN = rb"[+-]?\d+"
+REAL_PATTERN = rb"[+-]?(?:\d+\.\d*|\.\d+)"
+NUMBER_PATTERN = rb"[+-]?(?:\d+\.?\d*|\.\d+)"
+# the white space before an element, then a reference, a number or a keyword
+# when one comes: the elements that are one token take a single match
+ATOM_PTRN = re.compile(
+    WHITESPACE_PTRN.pattern
+    + rb"(?:(?:(?P<reference>" + REFERENCE_PATTERN + rb")"
+    + rb"|(?P<integer>" + INTEGER_PATTERN + rb")|(?P<real>" + REAL_PATTERN + rb")"
+    + rb"|(?P<true>true)|(?P<false>false)|(?P<null>null))"
+    + rb"(?!" + REGULAR_SET + rb"))?"
+)
+NAME_ESCAPE_PTRN = re.compile(rb"#([0-9A-Fa-f]{2})")
+DICT_END = b">>"
+LIST_END = b"]"
+
+
+def skip_whitespace(data: bytes, pos: int) -> int:
+    return WHITESPACE_PTRN.match(data, pos).end()
 
 
 class PDFElement:
@@ -19,14 +67,44 @@ class PDFElement:
 
 
 ############## pdf primitives ##############
+# every distinct name is a single PDFName, so names mostly compare by
+# identity. the tables stop growing at MAX_NAMES, names past that are made
+# anew every time and compare by value, a long running process does not
+# keep the names of every file it has read
+MAX_NAMES = 0x10000
+NAMES: Dict[str, "PDFName"] = {}
+# the same names by their undecoded bytes, for the lexers
+NAMES_BY_BYTES: Dict[bytes, "PDFName"] = {}
+
+
 class PDFName(PDFElement):
-    def __init__(self, value: bytes) -> None:
-        self.__value = value
+    def __new__(cls, value: str) -> "PDFName":
+        name = NAMES.get(value)
+        if name is None:
+            name = super().__new__(cls)
+            name.__value = value
+            # the hash of the plain str, so a str finds the name in a dict
+            name.__hash = hash(value)
+            if len(NAMES) < MAX_NAMES:
+                NAMES[value] = name
+        return name
+
+    def __init__(self, value: str) -> None: ...
 
     @property
     def value(self):
         return self.__value
 
+    @staticmethod
+    def from_bytes(raw: bytes) -> "PDFName":
+        """the name spelled `raw` (without the slash and #xx escapes already undone)"""
+        name = NAMES_BY_BYTES.get(raw)
+        if name is None:
+            name = PDFName(raw.decode())
+            if len(NAMES_BY_BYTES) < MAX_NAMES:
+                NAMES_BY_BYTES[raw] = name
+        return name
+
     @staticmethod
     def parse(data: bytes):
         if not PDFName.is_name(data):
@@ -35,7 +113,16 @@ class PDFName(PDFElement):
 
     @staticmethod
     def is_name(data: bytes):
-        return data.startswith(b"/") and data.find(b" ") == -1
+        # a slash then regular characters, no white space or delimiter
+        return data.startswith(b"/") and not any(BYTE_CLASS[c] for c in data[1:])
+
+    @staticmethod
+    def lax_at(data: bytes, pos: int) -> LaxPosTuple:
+        end = REGULAR_PTRN.match(data, pos + 1).end()
+        name = data[pos + 1 : end]
+        if b"#" in name:
+            name = NAME_ESCAPE_PTRN.sub(lambda m: bytes.fromhex(m.group(1).decode()), name)
+        return PDFName.from_bytes(name), end
 
     def try_lax(data: bytes):
         if not PDFName.is_name(data):
@@ -47,21 +134,28 @@ class PDFName(PDFElement):
         return f"PDFName(/{self.__value})"
 
     def __eq__(self, value: Any) -> bool:
-        if isinstance(value, PDFName):
-            return self.__value == value.value
-        if isinstance(value, str):
+        if value.__class__ is str:
             return self.__value == value
-        return super().__eq__(value)
+        # names past MAX_NAMES are not interned
+        return self is value or isinstance(value, PDFName) and self.__value == value.value
+
+    def __ne__(self, value: Any) -> bool:
+        return not self.__eq__(value)
 
     def __str__(self) -> str:
         return f"/{self.value}"
 
     def __hash__(self) -> int:
-        return hash(str(self))
+        return self.__hash
+
+    def __reduce__(self):
+        # unpickled names are interned too
+        return PDFName, (self.__value,)
 
 
 class PDFIndirectReference(PDFElement):
-    pattern = rb"(?P<ON>\d{1,})\s(?P<GN>\d{1,})\sR"
+    pattern = REFERENCE_PATTERN + rb"(?!" + REGULAR_SET + rb")"
+    ptrn = re.compile(pattern)
 
     def __init__(self, on: int, gn: int) -> None:
         self.on: int = on
@@ -75,19 +169,25 @@ class PDFIndirectReference(PDFElement):
 
     @staticmethod
     def lax(data: bytes) -> bool:
-        r = re.search(b"^" + PDFIndirectReference.pattern, data)
+        ref, pos = PDFIndirectReference.lax_at(data, 0)
+        return ref, data[pos:]
+
+    @staticmethod
+    def lax_at(data: bytes, pos: int) -> LaxPosTuple:
+        r = PDFIndirectReference.ptrn.match(data, pos)
         if r:
             on = int(r.group("ON"))
             gn = int(r.group("GN"))
-
-            return PDFIndirectReference(on, gn), data[r.end() :]
-        return None, data
+            return PDFIndirectReference(on, gn), r.end()
+        return None, pos
 
     def __repr__(self) -> str:
         return f"PDFIndirectReference({self.on},{self.gn})"
 
 
 class PDFDict(dict):
+    # a str key finds the PDFName with the same value, see PDFName.__hash__,
+    # so lookups never make a name
     def __setitem__(self, key: PDFName, value: Any) -> None:
         if isinstance(key, str):
             return super().__setitem__(PDFName(key), value)
@@ -97,48 +197,42 @@ class PDFDict(dict):
             raise ValueError("key Must be a PDFname or str object")
 
     def __getitem__(self, key: PDFName) -> None:
-        if isinstance(key, str):
-            return super().__getitem__(PDFName(key))
-        elif isinstance(key, PDFName):
+        if key.__class__ is str or key.__class__ is PDFName:
             return super().__getitem__(key)
-        else:
-            raise ValueError("key Must be a PDFname or str object")
+        raise ValueError("key Must be a PDFname or str object")
 
     def get(self, key: PDFName, default: Any = None) -> Any:
-        try:
-            if isinstance(key, str):
-                return super().__getitem__(PDFName(key))
-            elif isinstance(key, PDFName):
-                return super().__getitem__(key)
-        except KeyError:
-            return default
-
-    def __contains__(self, key: object) -> bool:
-        if isinstance(key, str):
-            return super().__contains__(PDFName(key))
-        return super().__contains__(key)
+        if key.__class__ is str or key.__class__ is PDFName:
+            return super().get(key, default)
+        return default
 
     def __repr__(self) -> str:
         return f"pdfdict({super().__repr__()})"
 
     @staticmethod
     def lax(data: bytes) -> LaxTuple:
-        if not data.startswith(b"<<"):
+        res, pos = PDFDict.lax_at(data, 0)
+        return res, data[pos:].lstrip()
+
+    @staticmethod
+    def lax_at(data: bytes, pos: int, streams: bool = True) -> LaxPosTuple:
+        """with streams=False a dict followed by "stream" is returned as is, before the keyword"""
+        if not data.startswith(b"<<", pos):
             raise ValueError("not a dict")
-        data = data[2:].lstrip()
+        pos += 2
         res = PDFDict()
         while True:
-            key, data = PDFObject.lax_next_elem(data)
-            if key == b">>":
+            key, pos = PDFObject.next_elem(data, pos)
+            if key is DICT_END:
                 break
-            val, data = PDFObject.lax_next_elem(data)
+            val, pos = PDFObject.next_elem(data, pos)
+            if val is DICT_END:
+                raise ValueError(f"no value for {key}")
             res[key] = val
-            if data.find(b"\n") == -1:
-                break
-        data = data.lstrip()
-        if data.startswith(b"stream"):
-            return PDFStream.lax(res, data)
-        return res, data
+        pos = skip_whitespace(data, pos)
+        if streams and data.startswith(b"stream", pos):
+            return PDFStream.lax_at(res, data, pos)
+        return res, pos
 
 
 class PDFList(list):
@@ -147,16 +241,22 @@ class PDFList(list):
 
     @staticmethod
     def lax(data: bytes) -> LaxTuple:
-        if not data.startswith(b"["):
+        res, pos = PDFList.lax_at(data, 0)
+        return res, data[pos:]
+
+    @staticmethod
+    def lax_at(data: bytes, pos: int) -> LaxPosTuple:
+        if not data.startswith(b"[", pos):
             raise ValueError("not a list")
-        data = data[1:].lstrip()
+        pos += 1
         res = PDFList()
+        append = res.append
         while True:
-            val, data = PDFObject.lax_next_elem(data)
-            if val == b"]":
+            val, pos = PDFObject.next_elem(data, pos)
+            if val is LIST_END:
                 break
-            res.append(val)
-        return res, data
+            append(val)
+        return res, pos
 
     def __contains__(self, value: Any) -> bool:
         return any([x for x in self if x == value])
@@ -173,56 +273,146 @@ class PDFStr(str):
         obj = str.__new__(cls, value)
         return obj
 
+    hex_ptrn = re.compile(rb"\<(?P<hexstring>" + byte_set(HEX_DIGITS + WHITESPACE_CHARS) + rb"*)\>")
+    # the bytes a literal string scan stops at, everything between them is copied as is
+    specials_ptrn = re.compile(rb"[()\\\r]")
+    octal_ptrn = re.compile(rb"[0-7]{1,3}")
+    # escaped byte -> the byte it stands for
+    escapes = {ord(k): ord(v) for k, v in zip("nrtbf()\\", "\n\r\t\b\f()\\")}
+
     @staticmethod
     def lax(data: bytes):
-        ptrn = rb"^(?<!\\\\)\((?P<string>.*)(?<!\\\\)\)"
-        if string := re.search(ptrn, data):
-            data = data[string.end() :]
-            string: str = string.group("string")
-            if re.search(rb"(?<!\\)[\(\)\n\r\t\b\f]|(?<!\\)\\(?<!\\)", string):
-                raise ValueError("Unencoded string")
-            string = re.sub(
-                rb"\\([\(\)\\\n\r\t\b\f])", lambda m: m.group(1), string
-            ).decode()
-            return PDFStr(string), data
-        raise ValueError("Not a PDF string")
+        string, pos = PDFStr.lax_at(data, 0)
+        return string, data[pos:]
+
+    @staticmethod
+    def lax_at(data: bytes, pos: int) -> LaxPosTuple:
+        """
+        the literal string at `pos` as bytes, and the position after it.
+        one pass from the opening to the matching closing parenthesis:
+        balanced parentheses are kept, escapes decoded, \\ddd octal ones
+        included, and an end of line is read as a single \\n.
+        """
+        if not data.startswith(b"(", pos):
+            raise ValueError("Not a PDF string")
+        pos += 1
+        search = PDFStr.specials_ptrn.search
+        special = search(data, pos)
+        if special is None:
+            raise ValueError("unterminated string")
+        end = special.start()
+        if data[end] == 0x29:
+            # no escapes, parentheses or line ends, the common case
+            return bytes(data[pos:end]), end + 1
+        out = bytearray()
+        depth = 0
+        while True:
+            out += data[pos:end]
+            c = data[end]
+            pos = end + 1
+            if c == 0x29:
+                if depth == 0:
+                    return bytes(out), pos
+                depth -= 1
+                out.append(c)
+            elif c == 0x28:
+                depth += 1
+                out.append(c)
+            elif c == 0x0D:
+                out.append(0x0A)
+                if data[pos : pos + 1] == b"\n":
+                    pos += 1
+            elif pos < len(data):
+                c = data[pos]
+                escaped = PDFStr.escapes.get(c)
+                if escaped is not None:
+                    out.append(escaped)
+                    pos += 1
+                elif 0x30 <= c <= 0x37:
+                    octal = PDFStr.octal_ptrn.match(data, pos)
+                    out.append(int(octal.group(), 8) & 0xFF)
+                    pos = octal.end()
+                elif c == 0x0D:
+                    # a backslash ending the line continues the string on the next
+                    pos += 2 if data[pos + 1 : pos + 2] == b"\n" else 1
+                elif c == 0x0A:
+                    pos += 1
+                # any other escaped byte stands for itself, the backslash is dropped
+            special = search(data, pos)
+            if special is None:
+                raise ValueError("unterminated string")
+            end = special.start()
 
     @staticmethod
     def lax_hex(data: bytes):
-        ptrn = rb"^\<(?P<hexstring>[0-9A-Fa-f]*)\>"
-        string = re.search(ptrn, data)
+        string, pos = PDFStr.lax_hex_at(data, 0)
+        return string, data[pos:]
+
+    @staticmethod
+    def lax_hex_at(data: bytes, pos: int) -> LaxPosTuple:
+        string = PDFStr.hex_ptrn.match(data, pos)
         if string:
-            data = data[string.end() :]
-            string: str = string.group("hexstring").decode()
-            string = bytes.fromhex(string)
-            return string, data
+            pos = string.end()
+            string: bytes = b"".join(string.group("hexstring").split())
+            if len(string) % 2:
+                # a missing last digit is taken as 0
+                string += b"0"
+            return bytes.fromhex(string.decode()), pos
         raise ValueError("Not a hex string")
 
 
 class PDFFilter:
-    def __init__(self, encode, decode) -> None:
+    def __init__(self, encode, decode, iter_decode=iter_identity) -> None:
         self.encode = encode
         self.decode = decode
+        # the incremental decoder, encoded chunks in and decoded chunks out
+        self.iter_decode = iter_decode
 
 
 class PDFStream(PDFElement):
     streamStartLen = len(b"stream\n")
     streamEndLen = len(b"endstream")
+    # decoders take the buffer and the filter's DecodeParms
     filters_encoders = {
-        "ASCIIHexDecode": PDFFilter(lambda b: b, lambda b: b),
-        "ASCII85Decode": PDFFilter(lambda b: b, lambda b: b),
-        "LZWDecode": PDFFilter(lambda b: b, lambda b: b),
-        "FlateDecode": PDFFilter(zlib.compress, zlib.decompress),
-        "RunLengthDecode": PDFFilter(lambda b: b, lambda b: b),
-        "CCITTFaxDecode": PDFFilter(lambda b: b, lambda b: b),
-        "JBIG2Decode": PDFFilter(lambda b: b, lambda b: b),
-        "DCTDecode": PDFFilter(lambda b: b, lambda b: open_image(io.BytesIO(b))),
+        "ASCIIHexDecode": PDFFilter(ascii_hex_encode, ascii_hex_decode, iter_ascii_hex_decode),
+        "ASCII85Decode": PDFFilter(ascii85_encode, ascii85_decode, iter_ascii85_decode),
+        "LZWDecode": PDFFilter(lzw_encode, lzw_decode, iter_lzw_decode),
+        "FlateDecode": PDFFilter(zlib.compress, flate_decode, iter_flate_decode),
+        "RunLengthDecode": PDFFilter(run_length_encode, run_length_decode, iter_run_length_decode),
+        "CCITTFaxDecode": PDFFilter(lambda b: b, lambda b, parms=None: b),
+        "JBIG2Decode": PDFFilter(lambda b: b, lambda b, parms=None: b),
+        "DCTDecode": PDFFilter(lambda b: b, dct_decode),
+        "JPXDecode": PDFFilter(lambda b: b, lambda b, parms=None: b),
     }
-
-    def __init__(self, streamDict: PDFDict, buffer: bytes) -> None:
-        # self.__streamDict = streamDict
-        self.buffer = buffer
-        self.__length = streamDict.get("Length", 0)
+    # the abbreviations inline images use
+    filters_encoders.update(
+        AHx=filters_encoders["ASCIIHexDecode"],
+        A85=filters_encoders["ASCII85Decode"],
+        LZW=filters_encoders["LZWDecode"],
+        Fl=filters_encoders["FlateDecode"],
+        RL=filters_encoders["RunLengthDecode"],
+        CCF=filters_encoders["CCITTFaxDecode"],
+        DCT=filters_encoders["DCTDecode"],
+    )
+
+    def __init__(
+        self,
+        streamDict: PDFDict,
+        buffer: Union[bytes, memoryview] = None,
+        loader: Callable[[], Union[bytes, memoryview]] = None,
+        length: int = None,
+        reader: Callable[[int, int], bytes] = None,
+    ) -> None:
+        """
+        the payload is either given as `buffer` or read by `loader` the first
+        time it is used. reader(start, size) reads part of a payload that is
+        not loaded yet, for iter_raw to stream it from the file.
+        """
+        self.streamDict = streamDict
+        self.__buffer = buffer
+        self.__loader = loader
+        self.__reader = reader
+        self.__length = streamDict.get("Length", 0) if length is None else length
         self.filters = streamDict.get(PDFName("Filter"), PDFList())
         self.filters = (
             self.filters
@@ -233,8 +423,33 @@ class PDFStream(PDFElement):
         self.F = streamDict.get("F")
         self.FFilter = streamDict.get("FFilter")
         self.FDecodeParams = streamDict.get("FDecodeParams")
-        self.Resources = PDFResources(streamDict.get("Resources", PDFDict()))
+        self.__resources = None
         self.Subtype = streamDict.get("Subtype")
+        # the buffer holds the decoded data, decoding it again would fail
+        self.decoded = False
+
+    @property
+    def buffer(self) -> Union[bytes, memoryview]:
+        if self.__loader is not None:
+            self.__buffer = self.__loader()
+            self.__loader = None
+        return self.__buffer
+
+    @buffer.setter
+    def buffer(self, buffer: Union[bytes, memoryview]) -> None:
+        self.__buffer = buffer
+        self.__loader = None
+
+    @property
+    def Resources(self) -> "PDFResources":
+        # only forms, patterns and Type 3 glyphs have any, made on first use
+        if self.__resources is None:
+            self.__resources = PDFResources(self.streamDict.get("Resources", PDFDict()))
+        return self.__resources
+
+    @property
+    def loaded(self) -> bool:
+        return self.__loader is None
 
     def __len__(self):
         return self.__length
@@ -242,17 +457,98 @@ class PDFStream(PDFElement):
     def apply_filters(self):
         for filter in self.filters:
             self.buffer = self.filters_encoders[filter.value].encode(self.buffer)
+        self.decoded = False
+
+    def decode_parms(self) -> List[Union[PDFDict, None]]:
+        """the DecodeParms dict of every filter, None where there is none"""
+        parms = self.DecodeParms
+        if not isinstance(parms, PDFList):
+            parms = [parms]
+        return [
+            parms[idx] if idx < len(parms) and isinstance(parms[idx], PDFDict) else None
+            for idx in range(len(self.filters))
+        ]
 
     def unapply_filters(self):
-        for filter in self.filters:
-            self.buffer = self.filters_encoders[filter.value].decode(self.buffer)
+        if self.decoded:
+            return
+        for filter, parm in zip(self.filters, self.decode_parms()):
+            self.buffer = self.filters_encoders[filter.value].decode(self.buffer, parm)
+            if parm is not None:
+                self.buffer = unpredict(self.buffer, parm)
+        self.decoded = True
+
+    def iter_raw(self, chunk_size: int = CHUNK_SIZE) -> Iterator[Union[bytes, memoryview]]:
+        if self.__loader is not None and self.__reader is not None:
+            # not loaded, read from the file one chunk at a time
+            for start in range(0, self.__length, chunk_size):
+                yield self.__reader(start, min(chunk_size, self.__length - start))
+            return
+        buffer = memoryview(self.buffer)
+        for start in range(0, len(buffer), chunk_size):
+            yield buffer[start : start + chunk_size]
+
+    def iter_decoded(self, chunk_size: int = CHUNK_SIZE, max_output: int = None) -> Iterator[bytes]:
+        """
+        the decoded stream as a series of chunks. every filter decodes
+        incrementally and only carries over a partial code, group or row,
+        so memory follows chunk_size rather than the size of the stream.
+        at most max_output bytes are produced.
+        """
+        chunks = self.iter_raw(chunk_size)
+        if not self.decoded:
+            for filter, parm in zip(self.filters, self.decode_parms()):
+                chunks = self.filters_encoders[filter.value].iter_decode(chunks, parm)
+                if parm is not None:
+                    chunks = iter_unpredict(chunks, parm)
+        total = 0
+        for chunk in chunks:
+            if max_output is not None and total + len(chunk) >= max_output:
+                yield chunk[: max_output - total]
+                return
+            total += len(chunk)
+            yield chunk
 
     @staticmethod
     def lax(streamDict: PDFDict, data: bytes) -> LaxTuple:
-        length = streamDict["Length"]
-        buffer = data[PDFStream.streamStartLen : PDFStream.streamStartLen + length]
-        data = data[PDFStream.streamStartLen + length + 1 + PDFStream.streamEndLen :]
-        return PDFStream(streamDict, buffer), data
+        stream, pos = PDFStream.lax_at(streamDict, data, 0)
+        return stream, data[pos:]
+
+    @staticmethod
+    def lax_at(streamDict: PDFDict, data: bytes, pos: int) -> LaxPosTuple:
+        pos += len(b"stream")
+        # the keyword is followed by CRLF or a single LF
+        if data.startswith(b"\r", pos):
+            pos += 1
+        if data.startswith(b"\n", pos):
+            pos += 1
+        length = streamDict.get("Length")
+        end = skip_whitespace(data, pos + length) if isinstance(length, int) else -1
+        if not data.startswith(b"endstream", end):
+            # an indirect or wrong /Length, the payload ends at the endstream keyword
+            end = data.find(b"endstream", pos)
+            length = PDFStream.length_before(end, pos, data[max(pos, end - 2) : end])
+        buffer = data[pos : pos + length]
+        pos = skip_whitespace(data, pos + length)
+        if data.startswith(b"endstream", pos):
+            pos += PDFStream.streamEndLen
+        # the length measured, a wrong /Length must not be used again
+        return PDFStream(streamDict, buffer, length=len(buffer)), pos
+
+    @staticmethod
+    def length_before(end: int, start: int, before: bytes) -> int:
+        """
+        the length of a payload from `start` to the endstream keyword at
+        `end`, less the end of line in `before`, the bytes just ahead of it
+        """
+        if end == -1:
+            raise ValueError("stream without endstream")
+        length = end - start
+        if before.endswith(b"\r\n"):
+            length -= 2
+        elif before.endswith((b"\r", b"\n")):
+            length -= 1
+        return max(length, 0)
 
     def __repr__(self) -> str:
         return f"PDFStream({self.__length})"
@@ -263,7 +559,15 @@ class PDFNull(PDFElement):
         return "PDFNull()"
 
 
+# the first read of an object, doubled until the object fits
+OBJECT_WINDOW = 0x1000
+# what must fit after an object for it to be complete: endobj, or stream and its end of line
+OBJECT_TAIL = len(b"endstream")
+
+
 class PDFObject(PDFElement):
+    header_ptrn = re.compile(rb"(?P<ON>\d+)" + WHITESPACE_SET + rb"+(?P<GN>\d+)" + WHITESPACE_SET + rb"+obj")
+
     def __init__(self, on: int, gn: int, content: "PDFPrimitive") -> None:
         self.on = on
         self.gn = gn
@@ -274,73 +578,127 @@ class PDFObject(PDFElement):
             return getattr(self.content, name)
         try:
             return self.content[name]
-        except:
+        except (KeyError, IndexError, TypeError, ValueError):
             raise AttributeError(name)
 
     def __repr__(self) -> str:
         return f"PDFObject({self.on},{self.gn},{self.content})"
 
     @staticmethod
-    def read(file, start: int):
-        # file = open("r")
-        file.seek(start, os.SEEK_SET)
-        buffer = b""
-        line = file.readline()
-        res = re.search(rb"^(?P<ON>\d{1,})\s(?P<GN>\d{1,})\sobj", line)
-        on = int(res.group("ON"))
-        gn = int(res.group("GN"))
-        while not (line := file.readline()).startswith(b"endobj"):
-            buffer += line
-        return PDFObject(on, gn, PDFObject.lax(buffer))
+    def read(file, start: int, resolve: Callable[["PDFIndirectReference"], Any] = None) -> "PDFObject":
+        """
+        parses the object at `start` of a file or mapping. the object is
+        parsed from a window read at `start`, grown until it holds the whole
+        object; a stream's payload is not part of it. the payload is located
+        by /Length, resolved through `resolve` when it is indirect, checked
+        against the endstream keyword and only read when .buffer is used.
+        """
+        size = OBJECT_WINDOW
+        while True:
+            window = read_at(file, start, size)
+            complete = len(window) < size
+            try:
+                on, gn, content, pos = PDFObject.parse_window(window)
+            except (ValueError, IndexError):
+                if complete:
+                    raise
+                size *= 2
+                continue
+            # room for the keyword after the object, or the object may be cut off
+            if complete or len(window) - skip_whitespace(window, pos) >= OBJECT_TAIL:
+                break
+            size *= 2
+        if not window.startswith(b"stream", pos):
+            return PDFObject(on, gn, content)
+
+        pos += len(b"stream")
+        # the keyword is followed by CRLF or a single LF
+        if window.startswith(b"\r", pos):
+            pos += 1
+        if window.startswith(b"\n", pos):
+            pos += 1
+        offset = start + pos
+        length = content.get("Length")
+        if isinstance(length, PDFIndirectReference) and resolve is not None:
+            length = resolve(length)
+        tail = b""
+        if isinstance(length, int) and length >= 0:
+            tail = read_at(file, offset + length, OBJECT_TAIL + 32)
+        if not tail.startswith(b"endstream", skip_whitespace(tail, 0)):
+            # no or a wrong /Length, scan for the keyword instead
+            end = find_in_file(file, b"endstream", offset)
+            before = read_at(file, max(offset, end - 2), end - max(offset, end - 2))
+            length = PDFStream.length_before(end, offset, before)
+        if isinstance(file, mmap.mmap):
+            loader = lambda: memoryview(file)[offset : offset + length]
+            return PDFObject(on, gn, PDFStream(content, loader=loader, length=length))
+        loader = lambda: read_at(file, offset, length)
+        reader = lambda begin, size: read_at(file, offset + begin, size)
+        return PDFObject(on, gn, PDFStream(content, loader=loader, length=length, reader=reader))
+
+    @staticmethod
+    def parse_window(data: bytes) -> Tuple[int, int, Any, int]:
+        """(object number, generation, content, offset after the content) of the object data starts with"""
+        res = PDFObject.header_ptrn.match(data)
+        if res is None:
+            raise ValueError("no object header")
+        pos = res.end()
+        if data.startswith(b"<<", skip_whitespace(data, pos)):
+            content, pos = PDFDict.lax_at(data, skip_whitespace(data, pos), streams=False)
+        else:
+            content, pos = PDFObject.next_elem(data, pos)
+        return int(res.group("ON")), int(res.group("GN")), content, skip_whitespace(data, pos)
 
     @staticmethod
     def lax(data: bytes) -> Any:
-        content, data = PDFObject.lax_next_elem(data)
-        if len(data.strip()) != 0:
+        content, pos = PDFObject.next_elem(data, 0)
+        if skip_whitespace(data, pos) != len(data):
             raise ValueError("problem parsing")
         return content
 
     @staticmethod
     def lax_next_elem(data: bytes):
-        data = data.lstrip()
-        space = getTokenIDX(data)
-        space = len(data) if space < 0 else space
-        token = data[:space]
-        if (_ := token.find(b"]")) != -1:
-            space = _
-            token = data[:space]
-        r = None
-        if data.startswith(b"<<"):
-            return PDFDict.lax(data)
-        elif (r := PDFIndirectReference.lax(data))[0] != None:
-            # before int!
-            return r
-        elif PDFName.is_name(token):
-            return PDFName.parse(token), data[space:]
-        elif is_int(token):
-            return int(token), data[space:]
-        elif is_float(token):
-            return float(token), data[space:]
-        elif data.startswith(b"["):
-            return PDFList.lax(data)
-        elif data.startswith(b"("):
-            return PDFStr.lax(data)
-        elif data.startswith(b"<"):
-            return PDFStr.lax_hex(data)
-        elif data.startswith(b">>"):
-            return b">>", data[2:]
-        elif data.startswith(b"]"):
-            return b"]", data[1:]
-        elif token == b"false":
-            return False, data[space:]
-        elif token == b"true":
-            return True, data[space:]
-        elif token == b"null":
-            return PDFNull(), data[space:]
-        else:
-            print("bad!")
-            idx = data.find(b"\n")
-            return data[:idx], data[idx + 1 :]
+        elem, pos = PDFObject.next_elem(data, 0)
+        return elem, data[pos:]
+
+    @staticmethod
+    def next_elem(data: bytes, pos: int) -> LaxPosTuple:
+        m = ATOM_PTRN.match(data, pos)
+        kind = m.lastgroup
+        if kind is not None:
+            if kind == "integer":
+                return int(m.group(kind)), m.end()
+            if kind == "real":
+                return float(m.group(kind)), m.end()
+            if kind == "reference":
+                return PDFIndirectReference(int(m.group("ON")), int(m.group("GN"))), m.end()
+            return (True if kind == "true" else False if kind == "false" else PDFNull()), m.end()
+        pos = m.end()
+        c = data[pos : pos + 1]
+        if c == b"/":
+            return PDFName.lax_at(data, pos)
+        elif c == b"<":
+            if data.startswith(b"<<", pos):
+                return PDFDict.lax_at(data, pos)
+            return PDFStr.lax_hex_at(data, pos)
+        elif c == b">":
+            if data.startswith(DICT_END, pos):
+                return DICT_END, pos + 2
+            raise ValueError(f"unexpected > at {pos}")
+        elif c == b"[":
+            return PDFList.lax_at(data, pos)
+        elif c == b"]":
+            return LIST_END, pos + 1
+        elif c == b"(":
+            return PDFStr.lax_at(data, pos)
+        elif c == b"":
+            raise ValueError("unexpected end of data")
+        end = REGULAR_PTRN.match(data, pos).end()
+        if end == pos:
+            # { and } of postscript calculator functions
+            return data[pos : pos + 1], pos + 1
+        # an operator or a malformed number
+        return data[pos:end], end
 
 
 class PDFComment(PDFElement):
@@ -380,7 +738,21 @@ class PDFHighObject:
 
 
 class PDFResources(PDFHighObject):
-    def __init__(self, obj: PDFObject) -> None:
+    """
+    the attributes are the raw entries. the accessors resolve a category
+    and a resource on first use through `resolve`: with PDFFile.resolve the
+    objects are read through the object cache and its budget.
+    a dictionary given as an indirect reference is only read on first use.
+    """
+
+    def __init__(self, obj: Union[PDFDict, PDFIndirectReference], resolve: Callable[[Any], Any] = None) -> None:
+        self.__resolve = resolve
+        # category -> its resolved dictionary
+        self.__categories: Dict[str, PDFDict] = {}
+        self.__pending = obj if isinstance(obj, PDFIndirectReference) else None
+        self.load(obj if isinstance(obj, PDFDict) else PDFDict())
+
+    def load(self, obj: PDFDict) -> None:
         self.ExtGState: None = obj.get("ExtGState")
         self.ColorSpace: None = obj.get("ColorSpace")
         self.Pattern: None = obj.get("Pattern")
@@ -391,6 +763,45 @@ class PDFResources(PDFHighObject):
         self.Properties: None = obj.get("Properties")
         self.ExtResources: None = obj.get("ExtResources")
 
+    def resolve(self, value: Any) -> Any:
+        if self.__resolve is None or not isinstance(value, PDFIndirectReference):
+            return value
+        return self.__resolve(value)
+
+    def category(self, category: str) -> PDFDict:
+        """the resolved Font, XObject, ExtGState... dictionary, empty when there is none"""
+        found = self.__categories.get(category)
+        if found is None:
+            if self.__pending is not None and self.__resolve is not None:
+                content = self.__resolve(self.__pending)
+                self.__pending = None
+                self.load(content if isinstance(content, PDFDict) else PDFDict())
+            found = self.resolve(getattr(self, category, None))
+            if not isinstance(found, PDFDict):
+                found = PDFDict()
+            self.__categories[category] = found
+        return found
+
+    def entry(self, category: str, name: str) -> Any:
+        """the raw entry of resource `name`, usually an indirect reference"""
+        return self.category(category).get(name)
+
+    def get(self, category: str, name: str, default: Any = None) -> Any:
+        value = self.entry(category, name)
+        return default if value is None else self.resolve(value)
+
+    def font(self, name: str) -> Any:
+        return self.get("Font", name)
+
+    def xobject(self, name: str) -> Any:
+        return self.get("XObject", name)
+
+    def ext_gstate(self, name: str) -> Any:
+        return self.get("ExtGState", name)
+
+    def color_space(self, name: str) -> Any:
+        return self.get("ColorSpace", name)
+
 
 PDFPrimitive = NewType(
     "PDFPrimitive",
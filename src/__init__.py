@@ -0,0 +1,46 @@
+"""
+a PDF parser. the modules are imported on first use of one of their names,
+`import src` alone loads nothing, and NumPy and Pillow are only imported
+by the code that needs them: PageGeometry and PDFImage.to_array().
+"""
+import importlib
+from typing import Any
+
+# public name -> the module defining it
+EXPORTS = {
+    "PDFFile": "pdfparser",
+    "PDFPage": "pdfparser",
+    "PDFTrailer": "pdfparser",
+    "ObjectCache": "objectcache",
+    "PDFResources": "PDFPrimitives",
+    "PDFStream": "PDFPrimitives",
+    "PDFObject": "PDFPrimitives",
+    "iter_operators": "streamparser",
+    "iter_operators_chunks": "streamparser",
+    "StreamStack": "streamparser",
+    "FontDecoder": "fonts",
+    "Span": "text",
+    "TextExtractor": "text",
+    "to_text": "text",
+    "PDFForm": "xobjects",
+    "PDFImage": "xobjects",
+    "FormExpander": "xobjects",
+    "PageGeometry": "geometry",
+    "parse_many": "batch",
+    "TaskResult": "batch",
+}
+
+__all__ = list(EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module = EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(EXPORTS))
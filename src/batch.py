@@ -0,0 +1,183 @@
+"""
+parallel processing of many documents, or of page ranges of one large
+document, on a process pool.
+
+a job is a picklable callable job(file: PDFFile, pages: range) that
+returns something small and picklable. every task reopens its document
+in the worker, so nothing but paths, page ranges and results crosses the
+process boundary. a task that raises or runs past its timeout is reported
+in its TaskResult and the rest of the batch goes on.
+"""
+import os
+import signal
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing
+from typing import Any, Callable, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple, Union
+from .pdfparser import PDFFile
+from .streamparser import iter_operators
+
+
+# a task is also timed out by the parent, where the alarm cannot reach,
+# this long after its timeout
+TIMEOUT_GRACE = 1.0
+# how often the parent looks for tasks past their deadline
+POLL_INTERVAL = 0.5
+
+
+# not an Exception, the parser's own handlers must not swallow it
+class TaskTimeout(BaseException): ...
+
+
+class TaskResult(NamedTuple):
+    path: str
+    # (start, stop) page range, None for the whole document
+    pages: Optional[Tuple[int, int]]
+    value: Any = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _alarm(signum, frame):
+    raise TaskTimeout()
+
+
+def run_task(
+    job: Callable, path: str, pages: Optional[Tuple[int, int]], timeout: float, use_mmap: bool
+) -> TaskResult:
+    # the timeout is enforced inside the worker, a stuck task is interrupted
+    # instead of holding its process for the rest of the batch
+    alarm = timeout and hasattr(signal, "setitimer")
+    if alarm:
+        signal.signal(signal.SIGALRM, _alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        with closing(PDFFile(path, use_mmap)) as f:
+            rng = range(len(f)) if pages is None else range(*pages)
+            return TaskResult(path, pages, job(f, rng))
+    except TaskTimeout:
+        return TaskResult(path, pages, error=f"timed out after {timeout}s")
+    except Exception as e:
+        return TaskResult(path, pages, error=f"{type(e).__name__}: {e}")
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def split_tasks(
+    paths: Iterable[str], pages_per_task: int = None
+) -> Iterator[Union[Tuple[str, Optional[Tuple[int, int]]], TaskResult]]:
+    """(path, page range) tasks, a document that cannot be opened to be split is yielded as a failed TaskResult"""
+    for path in paths:
+        if not pages_per_task:
+            yield path, None
+            continue
+        try:
+            with closing(PDFFile(path)) as f:
+                count = len(f)
+        except Exception as e:
+            yield TaskResult(path, None, error=f"{type(e).__name__}: {e}")
+            continue
+        for start in range(0, count, pages_per_task):
+            yield path, (start, min(start + pages_per_task, count))
+
+
+def parse_many(
+    paths: Iterable[str],
+    job: Callable[[PDFFile, range], Any],
+    workers: int = None,
+    pages_per_task: int = None,
+    timeout: float = None,
+    use_mmap: bool = False,
+) -> Iterator[TaskResult]:
+    """
+    runs `job` over every document in `paths` and yields a TaskResult per
+    task as it completes, in completion order. with pages_per_task, large
+    documents are split into page ranges that run in parallel.
+    a worker that dies takes the tasks it was running with it, those are
+    retried once on a fresh pool before being reported as failed. a task
+    still running well past its timeout, stuck in C code or on a platform
+    without setitimer, is reported as timed out and the pool is replaced.
+    """
+    workers = workers or os.cpu_count() or 1
+    # a bounded window of queued tasks, a batch of 100k paths is never fully materialized
+    window = 4 * workers
+    tasks = split_tasks(paths, pages_per_task)
+    retries: Dict[Tuple[str, Any], int] = {}
+    retry = []
+    while True:
+        broken = False
+        with ProcessPoolExecutor(workers) as pool:
+            pending = {}
+            # future -> when it was first seen running
+            started = {}
+            while True:
+                while len(pending) < window:
+                    task = retry.pop() if retry else next(tasks, None)
+                    if task is None:
+                        break
+                    if isinstance(task, TaskResult):
+                        yield task
+                        continue
+                    pending[pool.submit(run_task, job, *task, timeout, use_mmap)] = task
+                if not pending:
+                    return
+                done, _ = wait(pending, timeout=timeout and POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = pending.pop(future)
+                    started.pop(future, None)
+                    try:
+                        yield future.result()
+                    except BrokenProcessPool:
+                        broken = True
+                        retries[task] = retries.get(task, 0) + 1
+                        if retries[task] > 1:
+                            yield TaskResult(*task, error="worker process died")
+                        else:
+                            retry.append(task)
+                if timeout and not broken:
+                    now = time.monotonic()
+                    # tasks run in the order they were submitted, those that wait in
+                    # the executor's call queue already count as running
+                    for future in [f for f in pending if f.running()][:workers]:
+                        started.setdefault(future, now)
+                    overdue = [f for f, t in started.items() if now - t > timeout + TIMEOUT_GRACE]
+                    for future in overdue:
+                        yield TaskResult(*pending.pop(future), error=f"timed out after {timeout}s")
+                    if overdue:
+                        # the executor cannot stop one task, the workers are
+                        # terminated and the other tasks run again on a new pool
+                        for process in list(pool._processes.values()):
+                            process.terminate()
+                        broken = True
+                if broken:
+                    for task in pending.values():
+                        retry.append(task)
+                    break
+        if not broken:
+            return
+
+
+############## jobs ##############
+def count_operators(file: PDFFile, pages: range) -> Dict[str, int]:
+    """how many times each content stream operator is used on `pages`"""
+    counts = Counter()
+    for idx in pages:
+        counts.update(op for op, _ in iter_operators(file.page_contents(idx)))
+    return dict(counts)
+
+
+def page_count(file: PDFFile, pages: range) -> int:
+    return len(pages)
+
+
+if __name__ == "__main__":
+    import sys
+
+    for result in parse_many(sys.argv[1:], count_operators, timeout=60):
+        print(result.path, result.pages, result.value if result.ok else result.error)
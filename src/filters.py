@@ -0,0 +1,448 @@
+"""
+stream filter decoders and encoders. every decoder takes the raw bytes and
+the filter's /DecodeParms (anything with .get, or None) and returns bytes.
+"""
+import io
+import zlib
+from typing import Iterable, Iterator
+from base64 import a85decode, a85encode
+from .utils import WHITESPACE_CHARS, png_unpredict as png_unpredict_rows, png_unpredict_row, tiff_unpredict as tiff_unpredict_rows
+
+CHUNK_SIZE = 0x10000
+
+LZW_CLEAR = 256
+LZW_EOD = 257
+LZW_MAX_CODES = 4096
+A85_WEIGHTS = tuple(85**i for i in range(4, -1, -1))
+
+
+def parm(parms, key: str, default: int) -> int:
+    value = parms.get(key, default) if parms is not None else default
+    return value if isinstance(value, int) else default
+
+
+########## decoders ##########
+def flate_decode(data: bytes, parms=None) -> bytes:
+    return zlib.decompress(data)
+
+
+def dct_decode(data: bytes, parms=None):
+    """JPEG data as a PIL Image, Pillow is only imported once a JPEG is decoded"""
+    from PIL.Image import open as open_image
+
+    return open_image(io.BytesIO(bytes(data)))
+
+
+def ascii_hex_decode(data: bytes, parms=None) -> bytes:
+    data = bytes(data)
+    end = data.find(b">")
+    if end != -1:
+        data = data[:end]
+    data = data.translate(None, WHITESPACE_CHARS)
+    if len(data) % 2:
+        # an odd last digit is followed by an implied 0
+        data += b"0"
+    try:
+        return bytes.fromhex(data.decode("latin-1"))
+    except ValueError:
+        raise ValueError("invalid ASCIIHex data")
+
+
+def ascii85_decode(data: bytes, parms=None) -> bytes:
+    data = bytes(data).translate(None, WHITESPACE_CHARS)
+    if data.startswith(b"<~"):
+        data = data[2:]
+    end = data.find(b"~>")
+    if end != -1:
+        data = data[:end]
+    return a85_groups(data)
+
+
+def a85_groups(data: bytes) -> bytes:
+    """converts ASCII85 digits without whitespace or delimiters, a short last group is padded"""
+    try:
+        import numpy as np
+    except ImportError:
+        try:
+            return a85decode(data)
+        except ValueError:
+            raise ValueError("invalid ASCII85 data")
+    # every group of 5 digits is one base 85 number, all groups at once
+    data = data.replace(b"z", b"!!!!!")
+    pad = -len(data) % 5
+    if pad == 4:
+        raise ValueError("invalid ASCII85 data")
+    digits = np.frombuffer(data + b"u" * pad, dtype=np.uint8).reshape(-1, 5)
+    if ((digits < 33) | (digits > 117)).any():
+        raise ValueError("invalid ASCII85 data")
+    values = (digits - 33).astype(np.uint64) @ np.array(A85_WEIGHTS, dtype=np.uint64)
+    if (values > 0xFFFFFFFF).any():
+        raise ValueError("invalid ASCII85 data")
+    out = values.astype(">u4").tobytes()
+    return out[: len(out) - pad]
+
+
+def lzw_decode(data: bytes, parms=None) -> bytes:
+    return b"".join(iter_lzw_decode((data,), parms))
+
+
+def run_length_decode(data: bytes, parms=None) -> bytes:
+    return b"".join(iter_run_length_decode((data,), parms))
+
+
+########## incremental decoders ##########
+# each takes an iterable of encoded chunks and yields decoded ones, carrying
+# over only the partial code, group or row a chunk ends with
+def iter_identity(chunks: Iterable[bytes], parms=None) -> Iterator[bytes]:
+    yield from chunks
+
+
+def iter_flate_decode(chunks: Iterable[bytes], parms=None, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    decompressor = zlib.decompressobj()
+    for chunk in chunks:
+        # max_length keeps a highly compressed chunk from inflating at once
+        while chunk and not decompressor.eof:
+            out = decompressor.decompress(chunk, chunk_size)
+            if out:
+                yield out
+            chunk = decompressor.unconsumed_tail
+    out = decompressor.flush()
+    if out:
+        yield out
+
+
+def iter_ascii_hex_decode(chunks: Iterable[bytes], parms=None) -> Iterator[bytes]:
+    rest = b""
+    for chunk in chunks:
+        data = rest + bytes(chunk).translate(None, WHITESPACE_CHARS)
+        end = data.find(b">")
+        if end != -1:
+            yield ascii_hex_decode(data[:end])
+            return
+        cut = len(data) & ~1
+        rest = data[cut:]
+        if cut:
+            yield ascii_hex_decode(data[:cut])
+    if rest:
+        yield ascii_hex_decode(rest)
+
+
+def iter_ascii85_decode(chunks: Iterable[bytes], parms=None) -> Iterator[bytes]:
+    rest = b""
+    start = True
+    for chunk in chunks:
+        data = rest + bytes(chunk).translate(None, WHITESPACE_CHARS).replace(b"z", b"!!!!!")
+        if start:
+            if len(data) < 2:
+                rest = data
+                continue
+            if data.startswith(b"<~"):
+                data = data[2:]
+            start = False
+        end = data.find(b"~>")
+        if end != -1:
+            yield a85_groups(data[:end])
+            return
+        # a trailing ~ may be the start of the end marker
+        cut = len(data) - data.endswith(b"~")
+        cut -= cut % 5
+        rest = data[cut:]
+        if cut:
+            yield a85_groups(data[:cut])
+    if rest.endswith(b"~"):
+        rest = rest[:-1]
+    if rest:
+        yield a85_groups(rest)
+
+
+def iter_lzw_decode(chunks: Iterable[bytes], parms=None) -> Iterator[bytes]:
+    # with EarlyChange (the default) the code width grows one code early
+    early = 1 if parm(parms, "EarlyChange", 1) else 0
+    table = [bytes((i,)) for i in range(256)] + [b"", b""]
+    width = 9
+    limit = (1 << width) - early
+    acc = 0
+    bits = 0
+    prev = b""
+    for chunk in chunks:
+        out = bytearray()
+        for byte in chunk:
+            acc = (acc << 8) | byte
+            bits += 8
+            if bits < width:
+                continue
+            bits -= width
+            code = acc >> bits
+            acc &= (1 << bits) - 1
+            if code == LZW_CLEAR:
+                del table[258:]
+                width = 9
+                limit = (1 << width) - early
+                prev = b""
+                continue
+            if code == LZW_EOD:
+                yield bytes(out)
+                return
+            if code < len(table):
+                entry = table[code]
+                if prev and len(table) < LZW_MAX_CODES:
+                    table.append(prev + entry[:1])
+            elif code == len(table) and prev:
+                entry = prev + prev[:1]
+                table.append(entry)
+            else:
+                raise ValueError(f"invalid LZW code {code}")
+            out += entry
+            prev = entry
+            if len(table) >= limit and width < 12:
+                width += 1
+                limit = (1 << width) - early
+        if out:
+            yield bytes(out)
+
+
+def iter_run_length_decode(chunks: Iterable[bytes], parms=None) -> Iterator[bytes]:
+    rest = b""
+    for chunk in chunks:
+        data = rest + bytes(chunk)
+        out = bytearray()
+        pos = 0
+        end = len(data)
+        while pos < end:
+            length = data[pos]
+            if length < 128:
+                # length + 1 literal bytes
+                if pos + length + 2 > end:
+                    break
+                out += data[pos + 1 : pos + length + 2]
+                pos += length + 2
+            elif length > 128:
+                # the next byte repeated 257 - length times
+                if pos + 2 > end:
+                    break
+                out += data[pos + 1 : pos + 2] * (257 - length)
+                pos += 2
+            else:
+                yield bytes(out)
+                return
+        rest = data[pos:]
+        if out:
+            yield bytes(out)
+
+
+def iter_unpredict(chunks: Iterable[bytes], parms) -> Iterator[bytes]:
+    """undoes the /Predictor of a filter's /DecodeParms a run of whole rows at a time"""
+    predictor = parm(parms, "Predictor", 1)
+    if predictor == 1:
+        yield from chunks
+        return
+    columns = parm(parms, "Columns", 1)
+    colors = parm(parms, "Colors", 1)
+    bpc = parm(parms, "BitsPerComponent", 8)
+    row_len = (columns * colors * bpc + 7) // 8
+    if predictor == 2:
+        stride = row_len
+    elif predictor >= 10:
+        stride = row_len + 1
+        # the row above the first one of a chunk, fed in as an unfiltered row
+        prev = bytes(row_len)
+    else:
+        raise ValueError(f"unknown predictor {predictor}")
+    rest = b""
+    for chunk in chunks:
+        data = rest + bytes(chunk)
+        cut = len(data) - len(data) % stride
+        rest = data[cut:]
+        if not cut:
+            continue
+        if predictor == 2:
+            yield tiff_unpredict(data[:cut], columns, colors, bpc)
+        else:
+            out = png_unpredict(b"\x00" + prev + data[:cut], columns, colors, bpc)[row_len:]
+            prev = out[-row_len:]
+            yield out
+
+
+########## encoders ##########
+def ascii_hex_encode(data: bytes) -> bytes:
+    return bytes(data).hex().encode() + b">"
+
+
+def ascii85_encode(data: bytes) -> bytes:
+    return a85encode(bytes(data)) + b"~>"
+
+
+def lzw_encode(data: bytes) -> bytes:
+    """LZW with EarlyChange 1, a clear code is sent whenever the table fills"""
+    out = bytearray()
+    acc = 0
+    bits = 0
+    width = 9
+
+    def emit(code: int) -> None:
+        nonlocal acc, bits
+        acc = (acc << width) | code
+        bits += width
+        while bits >= 8:
+            bits -= 8
+            out.append((acc >> bits) & 0xFF)
+        acc &= (1 << bits) - 1
+
+    table = {bytes((i,)): i for i in range(256)}
+    emit(LZW_CLEAR)
+    word = b""
+    for byte in bytes(data):
+        candidate = word + bytes((byte,))
+        if candidate in table:
+            word = candidate
+            continue
+        emit(table[word])
+        # the decoder adds this entry only after reading the code just sent
+        table[candidate] = len(table) + 2
+        word = bytes((byte,))
+        if len(table) + 2 >= 1 << width:
+            if width < 12:
+                width += 1
+            else:
+                emit(LZW_CLEAR)
+                table = {bytes((i,)): i for i in range(256)}
+                width = 9
+    if word:
+        emit(table[word])
+        if len(table) + 2 >= (1 << width) - 1 and width < 12:
+            width += 1
+    emit(LZW_EOD)
+    if bits:
+        out.append((acc << (8 - bits)) & 0xFF)
+    return bytes(out)
+
+
+def run_length_encode(data: bytes) -> bytes:
+    data = bytes(data)
+    out = bytearray()
+    pos = 0
+    end = len(data)
+    literal = pos
+    while pos < end:
+        run = pos + 1
+        while run < end and run - pos < 128 and data[run] == data[pos]:
+            run += 1
+        if run - pos >= 3:
+            while literal < pos:
+                chunk = data[literal : min(pos, literal + 128)]
+                out.append(len(chunk) - 1)
+                out += chunk
+                literal += len(chunk)
+            out += bytes((257 - (run - pos), data[pos]))
+            literal = pos = run
+        else:
+            pos += 1
+    while literal < end:
+        chunk = data[literal : literal + 128]
+        out.append(len(chunk) - 1)
+        out += chunk
+        literal += len(chunk)
+    return bytes(out + b"\x80")
+
+
+########## predictors ##########
+def unpredict(data: bytes, parms) -> bytes:
+    """undoes the /Predictor of a filter's /DecodeParms, if it has one"""
+    predictor = parm(parms, "Predictor", 1)
+    if predictor == 1:
+        return data
+    columns = parm(parms, "Columns", 1)
+    colors = parm(parms, "Colors", 1)
+    bpc = parm(parms, "BitsPerComponent", 8)
+    if predictor == 2:
+        return tiff_unpredict(data, columns, colors, bpc)
+    if predictor >= 10:
+        return png_unpredict(data, columns, colors, bpc)
+    raise ValueError(f"unknown predictor {predictor}")
+
+
+def png_unpredict(data: bytes, columns: int, colors: int = 1, bits_per_component: int = 8) -> bytes:
+    """
+    undoes the PNG row filters (predictors 10-15). Sub rows are prefix sums
+    along the row and runs of Up rows prefix sums down the columns, so both
+    are done a whole block at a time. Average and Paeth depend on the
+    decoded left neighbour and go a pixel at a time.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        return png_unpredict_rows(data, columns, colors, bits_per_component)
+    bpp = max(1, colors * bits_per_component // 8)
+    row_len = (columns * colors * bits_per_component + 7) // 8
+    stride = row_len + 1
+    count = len(data) // stride
+    if not count:
+        return b""
+    rows = np.frombuffer(data, dtype=np.uint8, count=count * stride).reshape(count, stride)
+    types = rows[:, 0]
+    out = rows[:, 1:].copy()
+    if not types.any():
+        return out.tobytes()
+
+    if row_len % bpp == 0:
+        sub = types == 1
+        if sub.any():
+            pixels = out[sub].reshape(-1, row_len // bpp, bpp)
+            out[sub] = np.cumsum(pixels, axis=1, dtype=np.uint8).reshape(-1, row_len)
+        plain = (types == 0) | (types == 1)
+    else:
+        plain = types == 0
+
+    prev = np.zeros(row_len, dtype=np.uint8)
+    idx = 0
+    while idx < count:
+        kind = types[idx]
+        if plain[idx]:
+            prev = out[idx]
+            idx += 1
+        elif kind == 2:
+            end = idx + 1
+            while end < count and types[end] == 2:
+                end += 1
+            out[idx] += prev
+            out[idx:end] = np.cumsum(out[idx:end], axis=0, dtype=np.uint8)
+            prev = out[end - 1]
+            idx = end
+        else:
+            # the rows a block cannot do, by the pure Python predictor
+            line = bytearray(out[idx].tobytes())
+            png_unpredict_row(int(kind), line, prev.tobytes(), bpp)
+            out[idx] = np.frombuffer(line, dtype=np.uint8)
+            prev = out[idx]
+            idx += 1
+    return out.tobytes()
+
+
+def tiff_unpredict(data: bytes, columns: int, colors: int = 1, bits_per_component: int = 8) -> bytes:
+    """undoes TIFF predictor 2, every sample is a difference to the one of the same colour on its left"""
+    try:
+        import numpy as np
+    except ImportError:
+        return tiff_unpredict_rows(data, columns, colors, bits_per_component)
+
+    bpc = bits_per_component
+    samples = columns * colors
+    row_len = (samples * bpc + 7) // 8
+    count = len(data) // row_len
+    rows = np.frombuffer(data, dtype=np.uint8, count=count * row_len).reshape(count, row_len)
+    if bpc == 8:
+        pixels = rows.reshape(count, columns, colors)
+        return np.cumsum(pixels, axis=1, dtype=np.uint8).tobytes()
+    if bpc == 16:
+        pixels = rows.view(">u2").reshape(count, columns, colors)
+        return np.cumsum(pixels, axis=1, dtype=np.uint16).astype(">u2").tobytes()
+    if bpc in (1, 2, 4):
+        # unpack to one sample per byte, sum modulo 2**bpc, pack again
+        shifts = np.arange(8 - bpc, -1, -bpc, dtype=np.uint8)
+        mask = (1 << bpc) - 1
+        values = ((rows[:, :, None] >> shifts) & mask).reshape(count, -1)
+        pixels = values[:, :samples].reshape(count, columns, colors)
+        values[:, :samples] = (np.cumsum(pixels, axis=1, dtype=np.uint8) & mask).reshape(count, samples)
+        values = values.reshape(count, row_len, len(shifts)) << shifts
+        return np.bitwise_or.reduce(values, axis=2).astype(np.uint8).tobytes()
+    raise ValueError(f"TIFF predictor with {bpc} bits per component")
@@ -0,0 +1,457 @@
+"""
+text decoding for fonts: the glyph codes of a shown string become unicode
+through the font's ToUnicode CMap, its /Encoding and /Differences, or the
+encoding its type implies. a FontDecoder is built once per font object, see
+PDFFile.font.
+"""
+import re
+import sys
+from array import array
+from itertools import repeat
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from .PDFPrimitives import PDFDict, PDFName, PDFStream
+from .utils import HEX_DIGITS, REGULAR_SET, WHITESPACE_CHARS, byte_set
+
+UNMAPPED = "\ufffd"
+# the width of glyphs a font gives no metrics for, in ems
+DEFAULT_WIDTH = 0.5
+
+########## encodings ##########
+# glyph names of WinAnsiEncoding for codes 32 to 255, - where there is none
+WIN_ANSI_NAMES = """
+space exclam quotedbl numbersign dollar percent ampersand quotesingle parenleft
+parenright asterisk plus comma hyphen period slash zero one two three four five
+six seven eight nine colon semicolon less equal greater question at A B C D E F
+G H I J K L M N O P Q R S T U V W X Y Z bracketleft backslash bracketright
+asciicircum underscore grave a b c d e f g h i j k l m n o p q r s t u v w x y z
+braceleft bar braceright asciitilde - Euro - quotesinglbase florin quotedblbase
+ellipsis dagger daggerdbl circumflex perthousand Scaron guilsinglleft OE - Zcaron
+- - quoteleft quoteright quotedblleft quotedblright bullet endash emdash tilde
+trademark scaron guilsinglright oe - zcaron Ydieresis space exclamdown cent
+sterling currency yen brokenbar section dieresis copyright ordfeminine
+guillemotleft logicalnot hyphen registered macron degree plusminus twosuperior
+threesuperior acute mu paragraph periodcentered cedilla onesuperior ordmasculine
+guillemotright onequarter onehalf threequarters questiondown Agrave Aacute
+Acircumflex Atilde Adieresis Aring AE Ccedilla Egrave Eacute Ecircumflex
+Edieresis Igrave Iacute Icircumflex Idieresis Eth Ntilde Ograve Oacute
+Ocircumflex Otilde Odieresis multiply Oslash Ugrave Uacute Ucircumflex Udieresis
+Yacute Thorn germandbls agrave aacute acircumflex atilde adieresis aring ae
+ccedilla egrave eacute ecircumflex edieresis igrave iacute icircumflex idieresis
+eth ntilde ograve oacute ocircumflex otilde odieresis divide oslash ugrave uacute
+ucircumflex udieresis yacute thorn ydieresis
+""".split()
+
+# glyph name -> unicode for the names of the latin text encodings
+GLYPHS: Dict[str, str] = {}
+for name, char in zip(WIN_ANSI_NAMES, bytes(range(32, 256)).decode("cp1252", "replace")):
+    if name != "-":
+        GLYPHS.setdefault(name, char)
+GLYPHS.update(
+    dotlessi="ı", Lslash="Ł", lslash="ł", fi="ﬁ", fl="ﬂ",
+    ff="ﬀ", ffi="ﬃ", ffl="ﬄ", fraction="⁄", ring="˚",
+    hungarumlaut="˝", ogonek="˛", caron="ˇ", breve="˘",
+    dotaccent="˙", minus="−", partialdiff="∂", Delta="∆",
+    summation="∑", product="∏", pi="π", integral="∫",
+    Omega="Ω", radical="√", approxequal="≈", notequal="≠",
+    lessequal="≤", greaterequal="≥", lozenge="◊", infinity="∞",
+    mu1="µ", nbspace="\xa0", sfthyphen="\xad", periodcentered="·",
+    dkshade="▓", ltshade="░", shade="▒", filledbox="■",
+)
+# the Greek, math and symbol names of the Adobe Glyph List, those of the
+# Symbol font's encoding among them. the Greek capitals in code point order,
+# - for the code with no letter
+GREEK_NAMES = """
+Alpha Beta Gamma Delta Epsilon Zeta Eta Theta Iota Kappa Lambda Mu Nu Xi Omicron
+Pi Rho - Sigma Tau Upsilon Phi Chi Psi Omega
+""".split()
+for i, name in enumerate(GREEK_NAMES):
+    if name != "-":
+        # names given above keep their meaning: Delta is the increment, Omega the ohm sign, mu the micro sign
+        GLYPHS.setdefault(name, chr(0x391 + i))
+        GLYPHS.setdefault(name.lower(), chr(0x3B1 + i))
+GLYPHS.update(
+    sigma1="ς", theta1="ϑ", phi1="ϕ", omega1="ϖ", Upsilon1="ϒ",
+    increment="∆", nabla="∇", gradient="∇",
+    universal="∀", existential="∃", suchthat="∋", asteriskmath="∗",
+    congruent="≅", therefore="∴", perpendicular="⊥", similar="∼",
+    minute="′", second="″", equivalence="≡", proportional="∝",
+    aleph="ℵ", Ifraktur="ℑ", Rfraktur="ℜ", weierstrass="℘",
+    circlemultiply="⊗", circleplus="⊕", emptyset="∅", intersection="∩",
+    union="∪", propersuperset="⊃", reflexsuperset="⊇", notsubset="⊄",
+    propersubset="⊂", reflexsubset="⊆", element="∈", notelement="∉",
+    angle="∠", logicaland="∧", logicalor="∨", logicalnot="¬", dotmath="⋅",
+    angleleft="〈", angleright="〉", carriagereturn="↵",
+    arrowboth="↔", arrowleft="←", arrowup="↑", arrowright="→", arrowdown="↓",
+    arrowdblboth="⇔", arrowdblleft="⇐", arrowdblup="⇑", arrowdblright="⇒",
+    arrowdbldown="⇓", club="♣", diamond="♦", heart="♥", spade="♠",
+    registerserif="®", copyrightserif="©", trademarkserif="™",
+    registersans="®", copyrightsans="©", trademarksans="™",
+)
+
+# code -> unicode, one character per code, "" for undefined codes
+WIN_ANSI_ENCODING = [""] * 32 + [GLYPHS.get(n, "") if n != "-" else "" for n in WIN_ANSI_NAMES]
+WIN_ANSI_ENCODING[160] = "\xa0"
+WIN_ANSI_ENCODING[173] = "\xad"
+MAC_ROMAN_ENCODING = [""] * 32 + list(bytes(range(32, 256)).decode("mac_roman"))
+MAC_ROMAN_ENCODING[127] = ""
+# StandardEncoding is ASCII with curly quotes below 128 and its own upper half
+STANDARD_ENCODING = [""] * 32 + [chr(c) for c in range(32, 127)] + [""] * 129
+STANDARD_ENCODING[39] = "’"
+STANDARD_ENCODING[96] = "‘"
+for code, char in zip(
+    (
+        161, 162, 163, 164, 165, 166, 167, 168, 169, 170, 171, 172, 173, 174, 175, 177,
+        178, 179, 180, 182, 183, 184, 185, 186, 187, 188, 189, 191, 193, 194, 195, 196,
+        197, 198, 199, 200, 202, 203, 205, 206, 207, 208, 225, 227, 232, 233, 234, 235,
+        241, 245, 248, 249, 250, 251,
+    ),
+    "¡¢£⁄¥ƒ§¤'“«‹›ﬁﬂ–†‡·¶•‚„”»…‰¿`´ˆ˜¯˘˙¨˚¸˝˛ˇ—ÆªŁØŒºæıłøœß",
+):
+    STANDARD_ENCODING[code] = char
+# PDFDocEncoding is latin-1 with its own 0x18-0x1f and 0x80-0xa0
+PDF_DOC_ENCODING = [chr(c) for c in range(256)]
+for code, char in zip(range(0x18, 0x20), "˘ˇˆ˙˝˛˚˜"):
+    PDF_DOC_ENCODING[code] = char
+for code, char in zip(range(0x80, 0xA1), "•†‡…—–ƒ⁄‹›−‰„“”‘’‚™ﬁﬂŁŒŠŸŽıłœšž\ufffd€"):
+    PDF_DOC_ENCODING[code] = char
+
+ENCODINGS = {
+    "WinAnsiEncoding": WIN_ANSI_ENCODING,
+    "MacRomanEncoding": MAC_ROMAN_ENCODING,
+    "StandardEncoding": STANDARD_ENCODING,
+    "PDFDocEncoding": PDF_DOC_ENCODING,
+    # the expert set has no latin text of its own, read it as standard
+    "MacExpertEncoding": STANDARD_ENCODING,
+}
+
+UNI_NAME_PTRN = re.compile(r"uni((?:[0-9A-F]{4})+)$|u([0-9A-F]{4,6})$")
+
+
+def glyph_to_unicode(name: str) -> str:
+    """the text of a glyph name, following the glyph list conventions"""
+    if name in GLYPHS:
+        return GLYPHS[name]
+    # a.sc, f_f_i: variants and ligatures of known glyphs
+    base = name.split(".", 1)[0]
+    if "_" in base:
+        return "".join(glyph_to_unicode(part) for part in base.split("_"))
+    if base in GLYPHS:
+        return GLYPHS[base]
+    uni = UNI_NAME_PTRN.match(base)
+    if uni:
+        if uni.group(1):
+            digits = uni.group(1)
+            return "".join(chr(int(digits[i : i + 4], 16)) for i in range(0, len(digits), 4))
+        code = int(uni.group(2), 16)
+        if code <= 0x10FFFF:
+            return chr(code)
+    if len(base) == 1:
+        return base
+    return UNMAPPED
+
+
+########## cmaps ##########
+CODESPACE_PTRN = re.compile(rb"begincodespacerange(.*?)endcodespacerange", re.S)
+BFCHAR_PTRN = re.compile(rb"beginbfchar(.*?)endbfchar", re.S)
+BFRANGE_PTRN = re.compile(rb"beginbfrange(.*?)endbfrange", re.S)
+CIDCHAR_PTRN = re.compile(rb"begincidchar(.*?)endcidchar", re.S)
+CIDRANGE_PTRN = re.compile(rb"begincidrange(.*?)endcidrange", re.S)
+# the operands of the mapping sections, <hex>, [ ], numbers and /names
+CMAP_TOKEN_PTRN = re.compile(
+    rb"<(" + byte_set(HEX_DIGITS + WHITESPACE_CHARS) + rb"*)>|(\[)|(\])|(\d+)|/(" + REGULAR_SET + rb"+)"
+)
+
+
+def cmap_tokens(section: bytes) -> list:
+    """hex strings as bytes, arrays as lists and numbers as ints"""
+    root = []
+    lists = [root]
+    for token in CMAP_TOKEN_PTRN.finditer(section):
+        hexstring, open_, close, number, name = token.groups()
+        if hexstring is not None:
+            digits = b"".join(hexstring.split())
+            lists[-1].append(bytes.fromhex((digits + b"0" * (len(digits) % 2)).decode()))
+        elif open_:
+            lists.append([])
+            lists[-2].append(lists[-1])
+        elif close:
+            if len(lists) > 1:
+                lists.pop()
+        elif number is not None:
+            lists[-1].append(int(number))
+        else:
+            lists[-1].append(glyph_to_unicode(name.decode("latin-1")))
+    return root
+
+
+def utf16(data: bytes) -> str:
+    return data.decode("utf-16-be", "replace")
+
+
+class CMap:
+    """
+    code -> unicode of a ToUnicode CMap, and code -> CID of an encoding CMap.
+    codes are kept as ints along with the byte lengths the codespace allows.
+    """
+
+    def __init__(self) -> None:
+        self.lengths: List[int] = []
+        self.unicode: Dict[int, str] = {}
+        self.cids: Dict[int, int] = {}
+
+    @staticmethod
+    def parse(data: bytes) -> "CMap":
+        cmap = CMap()
+        lengths = set()
+        for section in CODESPACE_PTRN.findall(data):
+            tokens = cmap_tokens(section)
+            lengths.update(len(lo) for lo in tokens[::2] if isinstance(lo, bytes))
+        cmap.lengths = sorted(lengths)
+
+        unicode = cmap.unicode
+        for section in BFCHAR_PTRN.findall(data):
+            tokens = cmap_tokens(section)
+            for src, dst in zip(tokens[::2], tokens[1::2]):
+                if isinstance(src, bytes):
+                    unicode[int.from_bytes(src, "big")] = utf16(dst) if isinstance(dst, bytes) else dst
+                    lengths.add(len(src))
+        for section in BFRANGE_PTRN.findall(data):
+            tokens = cmap_tokens(section)
+            for lo, hi, dst in zip(tokens[::3], tokens[1::3], tokens[2::3]):
+                if not isinstance(lo, bytes) or not isinstance(hi, bytes):
+                    continue
+                start = int.from_bytes(lo, "big")
+                end = int.from_bytes(hi, "big")
+                lengths.add(len(lo))
+                if isinstance(dst, list):
+                    for offset, item in enumerate(dst[: end - start + 1]):
+                        unicode[start + offset] = utf16(item) if isinstance(item, bytes) else item
+                elif isinstance(dst, bytes) and dst:
+                    # the last byte of the destination counts up with the code
+                    first = int.from_bytes(dst, "big")
+                    for offset in range(end - start + 1):
+                        unicode[start + offset] = utf16((first + offset).to_bytes(len(dst), "big"))
+
+        cids = cmap.cids
+        for section in CIDCHAR_PTRN.findall(data):
+            tokens = cmap_tokens(section)
+            for src, cid in zip(tokens[::2], tokens[1::2]):
+                if isinstance(src, bytes) and isinstance(cid, int):
+                    cids[int.from_bytes(src, "big")] = cid
+        for section in CIDRANGE_PTRN.findall(data):
+            tokens = cmap_tokens(section)
+            for lo, hi, cid in zip(tokens[::3], tokens[1::3], tokens[2::3]):
+                if isinstance(lo, bytes) and isinstance(hi, bytes) and isinstance(cid, int):
+                    start = int.from_bytes(lo, "big")
+                    for offset in range(int.from_bytes(hi, "big") - start + 1):
+                        cids[start + offset] = cid + offset
+        if not cmap.lengths:
+            cmap.lengths = sorted(lengths) or [2]
+        return cmap
+
+
+########## decoders ##########
+class FontDecoder:
+    """
+    turns the bytes of a shown string into text. simple fonts and fonts
+    whose codes are all one or two bytes decode with a single str.translate
+    over the latin-1 or UTF-16 reading of the bytes, the table mapping every
+    code straight to its text.
+    """
+
+    def __init__(self, code_length: int, table: Union[List[str], Dict[int, str]], lengths: List[int] = None) -> None:
+        # 1 or 2 for fixed length codes, 0 when the codespace mixes lengths
+        self.code_length = code_length
+        self.table = table
+        self.lengths = lengths or [code_length]
+        # glyph widths in ems, a 256 entry list for simple fonts and
+        # CID -> width for composite ones
+        self.widths: Union[List[float], Dict[int, float]] = [DEFAULT_WIDTH] * 256 if code_length == 1 else {}
+        self.default_width = DEFAULT_WIDTH
+        # code -> CID of a composite font, None when they are the same
+        self.cids: Optional[Dict[int, int]] = None
+
+    def decode(self, data: bytes) -> str:
+        if self.code_length == 1:
+            return data.decode("latin-1").translate(self.table)
+        if self.code_length == 2:
+            if len(data) % 2:
+                data = data[:-1]
+            text = data.decode("utf-16-be", "surrogatepass")
+            if len(text) * 2 != len(data) and isinstance(self.table, UnmappedTable):
+                # a surrogate pair became one character, the table maps every code on its own
+                codes = array("H", data)
+                if sys.byteorder == "little":
+                    codes.byteswap()
+                text = "".join(map(chr, codes))
+            return text.translate(self.table)
+        return "".join(self.table.get(code, UNMAPPED) for code in self.codes(data))
+
+    def codes(self, data: bytes) -> List[int]:
+        """splits the bytes into codes, each as long as the shortest codespace length it can be"""
+        out = []
+        pos = 0
+        end = len(data)
+        lengths = self.lengths
+        while pos < end:
+            for length in lengths:
+                code = int.from_bytes(data[pos : pos + length], "big")
+                if code in self.table or length == lengths[-1]:
+                    break
+            out.append(code)
+            pos += length
+        return out
+
+    def measure(self, data: bytes) -> Tuple[float, int, int]:
+        """(sum of the glyph widths, number of codes, number of single byte spaces) of a shown string"""
+        if isinstance(self.widths, list):
+            return sum(map(self.widths.__getitem__, data)), len(data), data.count(32)
+        if self.code_length == 1:
+            codes = data
+        elif self.code_length == 2:
+            codes = array("H", data[: len(data) & ~1])
+            if sys.byteorder == "little":
+                codes.byteswap()
+        else:
+            codes = self.codes(data)
+        if self.cids is not None:
+            codes = map(self.cids.get, codes, codes)
+        widths = sum(map(self.widths.get, codes, repeat(self.default_width)))
+        if self.code_length == 1:
+            return widths, len(data), data.count(32)
+        return widths, len(data) // max(1, self.code_length), 0
+
+    @staticmethod
+    def simple(encoding: List[str], to_unicode: Optional[CMap] = None) -> "FontDecoder":
+        table = list(encoding)
+        if to_unicode is not None:
+            for code, text in to_unicode.unicode.items():
+                if code < 256:
+                    table[code] = text
+        return FontDecoder(1, table)
+
+    @staticmethod
+    def composite(cmap: Optional[CMap], to_unicode: Optional[CMap], ucs2: bool = False) -> "FontDecoder":
+        """a Type0 font, its /Encoding given as `cmap` (None for Identity)"""
+        lengths = cmap.lengths if cmap is not None else [2]
+        if to_unicode is None and ucs2:
+            # the codes are UCS-2 text already
+            return FontDecoder(2, {})
+        # codes with no text read as the replacement character
+        table = UnmappedTable(to_unicode.unicode if to_unicode is not None else {})
+        if lengths == [1] or lengths == [2]:
+            return FontDecoder(lengths[0], table)
+        return FontDecoder(0, table, lengths)
+
+    @staticmethod
+    def from_font(font: PDFDict, resolve: Callable[[Any], Any]) -> "FontDecoder":
+        """a decoder for a font dictionary, `resolve` turns indirect references into their content"""
+        to_unicode = None
+        stream = resolve(font.get("ToUnicode"))
+        if isinstance(stream, PDFStream):
+            to_unicode = CMap.parse(b"".join(stream.iter_decoded()))
+
+        encoding = resolve(font.get("Encoding"))
+        if font.get("Subtype") == "Type0":
+            ucs2 = False
+            cmap = None
+            if isinstance(encoding, PDFName):
+                name = encoding.value
+                ucs2 = name.startswith("Uni") and ("UCS2" in name or "UTF16" in name)
+                if name.endswith("-H") or name.endswith("-V"):
+                    cmap = None if name.startswith("Identity") or ucs2 else CMap()
+                    if cmap is not None:
+                        cmap.lengths = [2]
+            elif isinstance(encoding, PDFStream):
+                cmap = CMap.parse(b"".join(encoding.iter_decoded()))
+            decoder = FontDecoder.composite(cmap, to_unicode, ucs2)
+            if cmap is not None and cmap.cids:
+                decoder.cids = cmap.cids
+            descendants = resolve(font.get("DescendantFonts"))
+            if isinstance(descendants, list) and descendants:
+                descendant = resolve(descendants[0])
+                if isinstance(descendant, PDFDict):
+                    FontDecoder.cid_widths(decoder, descendant, resolve)
+            return decoder
+
+        if font.get("Subtype") == "TrueType":
+            base = WIN_ANSI_ENCODING
+        else:
+            base = STANDARD_ENCODING
+        differences = None
+        if isinstance(encoding, PDFName):
+            base = ENCODINGS.get(encoding.value, base)
+        elif isinstance(encoding, PDFDict):
+            base_name = resolve(encoding.get("BaseEncoding"))
+            if isinstance(base_name, PDFName):
+                base = ENCODINGS.get(base_name.value, base)
+            differences = resolve(encoding.get("Differences"))
+        table = list(base)
+        if isinstance(differences, list):
+            code = 0
+            for item in differences:
+                item = resolve(item)
+                if isinstance(item, int):
+                    code = item
+                elif isinstance(item, PDFName):
+                    if 0 <= code < 256:
+                        table[code] = glyph_to_unicode(item.value)
+                    code += 1
+        decoder = FontDecoder.simple(table, to_unicode)
+        FontDecoder.simple_widths(decoder, font, resolve)
+        return decoder
+
+    @staticmethod
+    def simple_widths(decoder: "FontDecoder", font: PDFDict, resolve: Callable[[Any], Any]) -> None:
+        widths = resolve(font.get("Widths"))
+        if not isinstance(widths, list):
+            # a standard 14 font without metrics, every glyph is half an em
+            return
+        descriptor = resolve(font.get("FontDescriptor"))
+        missing = resolve(descriptor.get("MissingWidth", 0)) if isinstance(descriptor, PDFDict) else 0
+        missing = missing / 1000 if isinstance(missing, (int, float)) else 0.0
+        decoder.widths = [missing] * 256
+        first = resolve(font.get("FirstChar", 0))
+        first = first if isinstance(first, int) else 0
+        for code, width in enumerate(widths, first):
+            width = resolve(width)
+            if 0 <= code < 256 and isinstance(width, (int, float)):
+                decoder.widths[code] = width / 1000
+
+    @staticmethod
+    def cid_widths(decoder: "FontDecoder", descendant: PDFDict, resolve: Callable[[Any], Any]) -> None:
+        """the /DW and /W widths of a CIDFont: c [w1 w2 ...] lists and c_first c_last w ranges"""
+        default = resolve(descendant.get("DW", 1000))
+        decoder.default_width = default / 1000 if isinstance(default, (int, float)) else 1.0
+        decoder.widths = widths = {}
+        items = resolve(descendant.get("W"))
+        if not isinstance(items, list):
+            return
+        items = [resolve(item) for item in items]
+        idx = 0
+        while idx + 1 < len(items):
+            first, second = items[idx], items[idx + 1]
+            if isinstance(second, list) and isinstance(first, int):
+                for cid, width in enumerate(second, first):
+                    width = resolve(width)
+                    if isinstance(width, (int, float)):
+                        widths[cid] = width / 1000
+                idx += 2
+            elif idx + 2 < len(items) and isinstance(first, int) and isinstance(second, int):
+                width = items[idx + 2]
+                if isinstance(width, (int, float)) and second - first < 0x10000:
+                    for cid in range(first, second + 1):
+                        widths[cid] = width / 1000
+                idx += 3
+            else:
+                break
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(code_length={self.code_length}, codes={len(self.table)})"
+
+
+class UnmappedTable(dict):
+    """a code -> text dict for str.translate where missing codes read as UNMAPPED"""
+
+    def __missing__(self, code: int) -> str:
+        return UNMAPPED
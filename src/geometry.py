@@ -0,0 +1,197 @@
+"""
+device space geometry of content streams: the cm stack is followed across
+q/Q and every path is transformed and bounded with whole-array NumPy
+operations instead of a Python loop per point.
+"""
+from array import array
+from typing import List, Optional, Tuple
+import numpy as np
+from .streamparser import (
+    IDENTITY,
+    ClippingPath,
+    ClippingPathOddEven,
+    CurrentMatrix,
+    FillAndStrokeClosePath,
+    FillAndStrokeClosePathEvenOdd,
+    FillAndStrokeEvenOddPath,
+    FillAndStrokePath,
+    FillEvenOddPath,
+    FillPath,
+    FillPath2,
+    Matrix,
+    Path,
+    PathCommand,
+    RectanglePath,
+    StreamStack,
+    StrokeClosePath,
+    StrokePath,
+    Text,
+    multiply,
+)
+
+# (x0, y0, x1, y1)
+BBox = Tuple[float, float, float, float]
+
+# coordinates taken by each path opcode
+COORD_COUNTS = np.array([len(c.fields) for c in PathCommand.commands], dtype=np.intp)
+# the painting operators that paint something, "n" only ends the path
+PAINTING = (
+    StrokePath,
+    StrokeClosePath,
+    FillPath,
+    FillPath2,
+    FillEvenOddPath,
+    FillAndStrokePath,
+    FillAndStrokeEvenOddPath,
+    FillAndStrokeClosePath,
+    FillAndStrokeClosePathEvenOdd,
+)
+CLIPPING = (ClippingPath, ClippingPathOddEven)
+
+
+def transform(matrices: np.ndarray, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """applies matrices[i] (n x 6) to points[i] (n x 2)"""
+    x, y = points[:, 0], points[:, 1]
+    return (
+        matrices[:, 0] * x + matrices[:, 2] * y + matrices[:, 4],
+        matrices[:, 1] * x + matrices[:, 3] * y + matrices[:, 5],
+    )
+
+
+class PageGeometry:
+    """
+    the paths of a content stream with the CTM each one was drawn under and
+    its device space bounding box. boxes[i] is nan for a path without points.
+    """
+
+    def __init__(self, stack: list, ctm: Matrix = IDENTITY) -> None:
+        self.paths, self.ctms, painted = PageGeometry.collect(stack, ctm)
+        self.painted = np.frombuffer(painted, dtype=np.bool_)
+        self.boxes = PageGeometry.bound(self.paths, self.ctms)
+
+    @staticmethod
+    def from_stream(data: bytes, ctm: Matrix = IDENTITY) -> "PageGeometry":
+        return PageGeometry(StreamStack.get_stack(data), ctm)
+
+    @staticmethod
+    def from_page(file, key: int, ctm: Matrix = IDENTITY) -> "PageGeometry":
+        return PageGeometry.from_stream(file.page_contents(key), ctm)
+
+    @staticmethod
+    def collect(stack: list, ctm: Matrix = IDENTITY) -> Tuple[List[Path], np.ndarray, bytearray]:
+        """
+        walks the nested stack once, pairing every Path with the CTM in force
+        and whether the operators after it paint it or only clip with it.
+        """
+        paths = []
+        ctms = array("d")
+        painted = bytearray()
+        # q scopes save the CTM, Text blocks share the one they are in
+        saved = []
+        # the last path, while only clipping operators follow it
+        awaiting = False
+        pending = [(iter(stack), False)]
+        while pending:
+            commands, saves = pending[-1]
+            for command in commands:
+                if isinstance(command, list):
+                    saved.append(ctm)
+                    pending.append((iter(command), True))
+                    break
+                if isinstance(command, Text):
+                    pending.append((iter(command.garbage), False))
+                    break
+                if isinstance(command, CurrentMatrix):
+                    try:
+                        ctm = multiply(tuple(map(float, command.matrix)), ctm)
+                    except (TypeError, ValueError):
+                        pass
+                elif isinstance(command, Path):
+                    paths.append(command)
+                    ctms.extend(ctm)
+                    painted.append(0)
+                    awaiting = True
+                    continue
+                elif isinstance(command, CLIPPING):
+                    continue
+                elif isinstance(command, PAINTING) and awaiting:
+                    painted[-1] = 1
+                awaiting = False
+            else:
+                pending.pop()
+                if saves:
+                    ctm = saved.pop()
+        return paths, np.frombuffer(ctms, dtype=np.float64).reshape(-1, 6), painted
+
+    @staticmethod
+    def bound(paths: List[Path], ctms: np.ndarray) -> np.ndarray:
+        """the (x0, y0, x1, y1) device space box of every path, as an n x 4 array"""
+        boxes = np.full((len(paths), 4), np.nan)
+        ops = array("B")
+        coords = array("d")
+        sizes = np.empty(len(paths), dtype=np.intp)
+        for idx, path in enumerate(paths):
+            ops.extend(path.ops)
+            coords.extend(path.coords)
+            sizes[idx] = len(path.coords) // 2
+        if not coords:
+            return boxes
+        ops = np.frombuffer(ops, dtype=np.uint8)
+        points = np.frombuffer(coords, dtype=np.float64).reshape(-1, 2)
+        owner = np.repeat(np.arange(len(paths)), sizes)
+
+        rectangles = ops == RectanglePath.opcode
+        if rectangles.any():
+            # re is stored as (x, y) (width, height), the second pair becomes
+            # the opposite corner and the two remaining corners are appended
+            counts = COORD_COUNTS[ops]
+            first = (np.cumsum(counts) - counts)[rectangles] // 2
+            x, y = points[first, 0], points[first, 1]
+            x1 = x + points[first + 1, 0]
+            y1 = y + points[first + 1, 1]
+            points = points.copy()
+            points[first + 1, 0] = x1
+            points[first + 1, 1] = y1
+            points = np.concatenate(
+                (points, np.column_stack((np.concatenate((x1, x)), np.concatenate((y, y1)))))
+            )
+            owner = np.concatenate((owner, owner[first], owner[first]))
+            order = np.argsort(owner, kind="stable")
+            owner = owner[order]
+            points = points[order]
+
+        x, y = transform(ctms[owner], points)
+        starts = np.flatnonzero(np.diff(owner, prepend=-1))
+        ids = owner[starts]
+        boxes[ids, 0] = np.minimum.reduceat(x, starts)
+        boxes[ids, 1] = np.minimum.reduceat(y, starts)
+        boxes[ids, 2] = np.maximum.reduceat(x, starts)
+        boxes[ids, 3] = np.maximum.reduceat(y, starts)
+        return boxes
+
+    def bbox(self, painted_only: bool = True) -> Optional[BBox]:
+        """the union of the path boxes, clipping-only paths left out by default"""
+        boxes = self.boxes[self.painted] if painted_only else self.boxes
+        boxes = boxes[~np.isnan(boxes[:, 0])]
+        if not len(boxes):
+            return None
+        return (
+            float(boxes[:, 0].min()),
+            float(boxes[:, 1].min()),
+            float(boxes[:, 2].max()),
+            float(boxes[:, 3].max()),
+        )
+
+    def overlapping(self, region: BBox) -> np.ndarray:
+        """indices of the paths whose boxes intersect `region`"""
+        x0, y0, x1, y1 = region
+        boxes = self.boxes
+        # comparisons with nan are false, pointless paths never overlap
+        hit = (boxes[:, 0] <= x1) & (boxes[:, 2] >= x0) & (boxes[:, 1] <= y1) & (boxes[:, 3] >= y0)
+        return np.flatnonzero(hit)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(paths={len(self.paths)}, bbox={self.bbox()})"
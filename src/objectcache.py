@@ -0,0 +1,172 @@
+import sys
+from collections import OrderedDict
+from typing import Any, Hashable
+from .PDFPrimitives import PDFObject, PDFStream
+
+MiB = 1 << 20
+
+
+def buffer_size(buffer: Any) -> int:
+    if isinstance(buffer, (bytes, bytearray)):
+        return len(buffer)
+    if isinstance(buffer, memoryview):
+        return buffer.nbytes
+    return sys.getsizeof(buffer)
+
+
+def approx_size(value: Any) -> int:
+    """rough footprint of a parsed object, good enough for budgeting"""
+    if isinstance(value, PDFObject):
+        return sys.getsizeof(value) + approx_size(value.content)
+    if isinstance(value, PDFStream):
+        return (
+            sys.getsizeof(value)
+            + approx_size(value.streamDict)
+            + (buffer_size(value.buffer) if value.loaded else 0)
+        )
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            approx_size(k) + approx_size(v) for k, v in value.items()
+        )
+    if isinstance(value, list):
+        return sys.getsizeof(value) + sum(approx_size(i) for i in value)
+    return sys.getsizeof(value)
+
+
+def is_stream(value: Any) -> bool:
+    return isinstance(value, PDFStream) or (
+        isinstance(value, PDFObject) and isinstance(value.content, PDFStream)
+    )
+
+
+class LRUPool:
+    """an LRU bounded by entry count and approximate bytes, None means unbounded"""
+
+    def __init__(self, max_entries: int = None, max_bytes: int = None) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict = OrderedDict()
+        self.sizes = {}
+        self.bytes = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.entries
+
+    def get(self, key: Hashable) -> Any:
+        value = self.entries[key]
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any, size: int) -> None:
+        self.discard(key)
+        self.entries[key] = value
+        self.sizes[key] = size
+        self.bytes += size
+        self.evict()
+
+    def resize(self, key: Hashable, size: int) -> None:
+        self.bytes += size - self.sizes[key]
+        self.sizes[key] = size
+        self.evict()
+
+    def discard(self, key: Hashable) -> None:
+        if key in self.entries:
+            del self.entries[key]
+            self.bytes -= self.sizes.pop(key)
+
+    def evict(self) -> None:
+        while self.entries and (
+            (self.max_entries is not None and len(self.entries) > self.max_entries)
+            or (self.max_bytes is not None and self.bytes > self.max_bytes)
+        ):
+            key, _ = self.entries.popitem(last=False)
+            self.bytes -= self.sizes.pop(key)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.sizes.clear()
+        self.bytes = 0
+
+
+class ObjectCache:
+    """
+    the parsed-object cache of a PDFFile. streams get their own, smaller
+    pool so a few decoded images or content streams are evicted before
+    they can push out the small dictionaries every page lookup goes through.
+    stream sizes are re-measured on every hit, since callers decode their
+    buffers in place.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        max_bytes: int = 64 * MiB,
+        max_stream_entries: int = 256,
+        max_stream_bytes: int = 16 * MiB,
+    ) -> None:
+        self.objects = LRUPool(max_entries, max_bytes)
+        self.streams = LRUPool(max_stream_entries, max_stream_bytes)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def evictions(self) -> int:
+        return self.objects.evictions + self.streams.evictions
+
+    @property
+    def bytes(self) -> int:
+        return self.objects.bytes + self.streams.bytes
+
+    def __len__(self) -> int:
+        return len(self.objects) + len(self.streams)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.objects or key in self.streams
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if key in self.objects:
+            self.hits += 1
+            return self.objects.get(key)
+        if key in self.streams:
+            self.hits += 1
+            value = self.streams.get(key)
+            self.streams.resize(key, self.stream_size(value))
+            return value
+        self.misses += 1
+        return default
+
+    def put(self, key: Hashable, value: Any, stream: bool = None) -> None:
+        if stream is None:
+            stream = is_stream(value)
+        if stream:
+            self.objects.discard(key)
+            self.streams.put(key, value, self.stream_size(value))
+        else:
+            self.streams.discard(key)
+            self.objects.put(key, value, approx_size(value))
+
+    @staticmethod
+    def stream_size(value: Any) -> int:
+        if isinstance(value, PDFObject):
+            value = value.content
+        if isinstance(value, PDFStream):
+            # a payload not read yet costs nothing
+            return buffer_size(value.buffer) if value.loaded else 0
+        if hasattr(value, "data"):
+            return buffer_size(value.data)
+        return approx_size(value)
+
+    def clear(self) -> None:
+        self.objects.clear()
+        self.streams.clear()
+
+    def __repr__(self) -> str:
+        return (
+            f"ObjectCache(entries={len(self)}, bytes={self.bytes}, hits={self.hits}, "
+            f"misses={self.misses}, evictions={self.evictions})"
+        )
@@ -1,12 +1,41 @@
 import os
-from typing import Any, Tuple, NewType, List, Union, Callable
-import io
-from PDFPrimitives import *
-from streamparser import *
+import mmap
+from array import array
+from bisect import bisect_right
+from typing import Any, Iterable, Iterator, Optional, Tuple, List, Union
+import zlib
+from .utils import rfind_in_file
+from .filters import CHUNK_SIZE
+from .PDFPrimitives import (
+    PDFComment,
+    PDFDict,
+    PDFElement,
+    PDFHighObject,
+    PDFIndirectReference,
+    PDFList,
+    PDFName,
+    PDFNull,
+    PDFObject,
+    PDFResources,
+    PDFStream,
+)
+from .streamparser import StreamStack, iter_operators_chunks
+from .objectcache import MiB, LRUPool, ObjectCache, approx_size
+from .fonts import FontDecoder
+from .text import Span, TextExtractor, to_text
+from .xobjects import PDFForm, FormExpander, PDFImage
 
 
 # https://web.archive.org/web/20141010035745/http://gnupdf.org/Introduction_to_PDF
 TRAILER_STRING = b"trailer\n"
+TRAILER_KEYWORD = b"trailer"
+START_XREF_KEYWORD = b"startxref"
+EOF_MARKER = b"%%EOF"
+XREF_KEYWORD = b"xref"
+XREF_ENTRY_SIZE = 20
+# the bounds of PDFFile.parsed
+PARSED_ENTRIES = 1024
+PARSED_BYTES = 32 * MiB
 
 
 ############## pdf file components ##############
@@ -14,71 +43,195 @@ class PDFTrailer:
     start_xref: int
     data_temp: bytes
 
-    def __init__(self, start_xref, pdf_elem: PDFObject) -> None:
+    def __init__(
+        self, start_xref, pdf_elem: PDFObject, xref_stream: PDFStream = None
+    ) -> None:
         self.start_xref = start_xref
         self.trailer_root: PDFRoot = PDFRoot(pdf_elem)
+        # set when the trailer dict is the dict of a cross-reference stream
+        self.xref_stream = xref_stream
 
     @staticmethod
     def parse(data: bytes):
-        # data = [i for i in data.split(b"\n") if len(i) >0]
-        # print(data)
-        # if PDFComment(data[-1]).value != b"%EOF":
-        # 	raise ValueError("not a trailer")
-        # start_xref = data[-2].decode
         data = data.strip()
-        if not data.endswith(rb"%%EOF"):
+        if data.startswith(TRAILER_KEYWORD):
+            data = data[len(TRAILER_KEYWORD) :]
+        if not data.endswith(EOF_MARKER):
+            raise ValueError("not a trailer")
+        start_xref_loc = data.rfind(START_XREF_KEYWORD)
+        if start_xref_loc == -1:
             raise ValueError("not a trailer")
-        start_xref_string = b"startxref"
-        start_xref_loc = data.find(start_xref_string)
-        _ = start_xref_loc + len(start_xref_string) + 1
-        start_xref = int(data[_ : data.find(b"\n", _)].decode())
+        start_xref = int(
+            data[start_xref_loc + len(START_XREF_KEYWORD) : -len(EOF_MARKER)]
+        )
         trailerDict = PDFObject.lax(data[:start_xref_loc])
         return PDFTrailer(start_xref, trailerDict)
 
     @staticmethod
     def read(file):
-        # def read(file:BufferedReader):
-        data = bytearray()
-        for i in read_reverse_order(file):
-            if i == TRAILER_STRING:
-                break
-            i.extend(data)
-            data = i
-        return PDFTrailer.parse(data)
+        # only the last %%EOF counts: earlier ones close incremental updates,
+        # anything after it is garbage appended by the producer
+        eof = rfind_in_file(file, EOF_MARKER)
+        if eof == -1:
+            raise ValueError("no %%EOF marker")
+        start_xref_loc = rfind_in_file(file, START_XREF_KEYWORD, eof)
+        if start_xref_loc == -1:
+            raise ValueError("no startxref")
+        file.seek(start_xref_loc, os.SEEK_SET)
+        data = file.read(eof - start_xref_loc)
+        start_xref = int(data[len(START_XREF_KEYWORD) :])
+
+        file.seek(start_xref, os.SEEK_SET)
+        if file.read(len(XREF_KEYWORD)) != XREF_KEYWORD:
+            # PDF 1.5 cross-reference stream, its dict doubles as the trailer
+            xref_stream = PDFObject.read(file, start_xref).content
+            if not isinstance(xref_stream, PDFStream):
+                raise ValueError(f"no cross-reference section at {start_xref}")
+            return PDFTrailer(start_xref, xref_stream.streamDict, xref_stream)
+
+        trailer = rfind_in_file(file, TRAILER_KEYWORD, start_xref_loc)
+        if trailer < start_xref:
+            raise ValueError("no trailer")
+        file.seek(trailer, os.SEEK_SET)
+        return PDFTrailer.parse(file.read(eof + len(EOF_MARKER) - trailer))
 
     def __repr__(self) -> str:
         return f"PDFTrailer({self.start_xref},{self.data_temp})"
 
 
 class XREFTable:
-    def __init__(
-        self, count_start: int, count: int, entries: List["XREFEntry"]
-    ) -> None:
-        if len(entries) != count:
-            raise ValueError(f"Expected {count} entries, got {len(entries)}")
+    """
+    the cross-reference sections of every revision merged into parallel
+    arrays indexed by object number. for COMPRESSED entries `offsets` holds
+    the object stream number and `generations` the index inside it.
+    """
+
+    FREE = 0
+    IN_USE = 1
+    COMPRESSED = 2
+
+    def __init__(self, size: int = 0) -> None:
+        self.types = array("B", bytes(size))
+        self.offsets = array("q", bytes(8 * size))
+        self.generations = array("q", bytes(8 * size))
+        # only used while merging: the newest revision's entry wins
+        self.__seen = bytearray(size)
 
-        self.count_start = count_start
-        self.count = count
-        self.entries = entries
+    def __len__(self) -> int:
+        return len(self.types)
 
     def __getitem__(self, key: int) -> "XREFEntry":
-        return self.entries[key - self.count]
+        if not 0 <= key < len(self.types):
+            raise KeyError(f"object {key} is not in the cross-reference table")
+        if self.types[key] == XREFTable.COMPRESSED:
+            return XREFCompressedEntry(self.offsets[key], self.generations[key])
+        return XREFEntry(
+            self.offsets[key], self.generations[key], self.types[key] == XREFTable.FREE
+        )
+
+    def grow(self, size: int) -> None:
+        missing = size - len(self.types)
+        if missing > 0:
+            self.types.frombytes(bytes(missing))
+            self.offsets.frombytes(bytes(8 * missing))
+            self.generations.frombytes(bytes(8 * missing))
+            self.__seen.extend(bytes(missing))
+
+    def set(self, on: int, kind: int, offset: int, gen: int) -> None:
+        if on >= len(self.types):
+            self.grow(on + 1)
+        if self.__seen[on]:
+            return
+        self.__seen[on] = 1
+        self.types[on] = kind
+        self.offsets[on] = offset
+        self.generations[on] = gen
 
     @staticmethod
-    def read(file, start):
-        file.seek(start, os.SEEK_SET)
-        xref = file.readline()
-        count_start, count = file.readline().split(b" ")
-        entries = []
-        for i in file.readlines():
-            if i == TRAILER_STRING:
-                break
-            if len(i) == 20:
-                entry = XREFEntry.parse(i)
-                entries.append(entry)
+    def read(file, start: int, xref_stream: PDFStream = None) -> "XREFTable":
+        """merges the section at `start` with every older one reachable through /Prev"""
+        table = XREFTable()
+        visited = set()
+        while start is not None and start not in visited:
+            visited.add(start)
+            if xref_stream is None:
+                file.seek(start, os.SEEK_SET)
+                if file.read(len(XREF_KEYWORD)) != XREF_KEYWORD:
+                    xref_stream = PDFObject.read(file, start).content
+            if xref_stream is not None:
+                trailer = table.add_stream(xref_stream)
             else:
-                raise ValueError(f"Entry {i} is not 20 bytes long")
-        return XREFTable(int(count_start), int(count), entries)
+                subsections, trailer = XREFTable.read_section(file, start)
+                table.grow(trailer.get("Size", 0))
+                # hybrid files hide their PDF 1.5 objects in /XRefStm
+                if isinstance(trailer.get("XRefStm"), int):
+                    table.add_stream(PDFObject.read(file, trailer["XRefStm"]).content)
+                for count_start, data in subsections:
+                    table.add_rows(count_start, data)
+            start = trailer.get("Prev")
+            xref_stream = None
+        table.__seen = None
+        return table
+
+    @staticmethod
+    def read_section(file, start: int) -> Tuple[List[Tuple[int, bytes]], PDFDict]:
+        """the raw (first object number, entries) subsections and the trailer dict of an xref table"""
+        file.seek(start + len(XREF_KEYWORD), os.SEEK_SET)
+        subsections = []
+        while True:
+            line = file.readline()
+            if line == b"":
+                raise ValueError(f"no trailer after the xref table at {start}")
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith(TRAILER_KEYWORD):
+                break
+            count_start, count = line.split()
+            # entries are fixed width, a subsection is read in one go
+            subsections.append(
+                (int(count_start), file.read(int(count) * XREF_ENTRY_SIZE))
+            )
+        data = line[len(TRAILER_KEYWORD) :]
+        chunk = 0x1000
+        while True:
+            more = file.read(chunk)
+            data += more
+            try:
+                trailer, _ = PDFObject.next_elem(data, 0)
+                return subsections, trailer
+            except ValueError:
+                if not more:
+                    raise
+            chunk *= 2
+
+    def add_rows(self, count_start: int, data: bytes) -> None:
+        for idx, i in enumerate(range(0, len(data), XREF_ENTRY_SIZE)):
+            entry = data[i : i + XREF_ENTRY_SIZE]
+            if len(entry) != XREF_ENTRY_SIZE or not entry.endswith((b" \n", b"\r\n", b" \r")):
+                raise ValueError(f"Entry {entry} is not 20 bytes long")
+            kind = XREFTable.IN_USE if entry[17:18] == b"n" else XREFTable.FREE
+            self.set(count_start + idx, kind, int(entry[:10]), int(entry[11:16]))
+
+    def add_stream(self, stream: PDFStream) -> PDFDict:
+        """adds the rows of a /Type /XRef stream, fields are big-endian with widths given by /W"""
+        stream.unapply_filters()
+        data = stream.buffer
+        w1, w2, w3 = stream.streamDict["W"]
+        size = stream.streamDict["Size"]
+        index = stream.streamDict.get("Index", PDFList([0, size]))
+        self.grow(size)
+        row = w1 + w2 + w3
+        pos = 0
+        for count_start, count in zip(index[::2], index[1::2]):
+            for on in range(count_start, count_start + count):
+                # a zero width type field defaults to 1
+                kind = int.from_bytes(data[pos : pos + w1], "big") if w1 else 1
+                f2 = int.from_bytes(data[pos + w1 : pos + w1 + w2], "big")
+                f3 = int.from_bytes(data[pos + w1 + w2 : pos + row], "big")
+                pos += row
+                self.set(on, kind, f2, f3)
+        return stream.streamDict
 
 
 class XREFEntry(PDFElement):
@@ -100,6 +253,40 @@ class XREFEntry(PDFElement):
         return f"XREFEntry({self.offset},{self.gen},{self.free})"
 
 
+class XREFCompressedEntry(XREFEntry):
+    """type 2 entry of a cross-reference stream: the object lives in an object stream"""
+
+    def __init__(self, stream_on: int, index: int) -> None:
+        super().__init__(0, 0, False)
+        self.stream_on = stream_on
+        self.index = index
+
+    def __repr__(self) -> str:
+        return f"XREFCompressedEntry({self.stream_on},{self.index})"
+
+
+class PDFObjectStream:
+    """
+    a decoded /Type /ObjStm. the header of object number/offset pairs is
+    indexed once, the objects themselves are parsed when asked for.
+    """
+
+    def __init__(self, stream: PDFStream) -> None:
+        stream.unapply_filters()
+        self.data = bytes(stream.buffer)
+        first = stream.streamDict["First"]
+        header = self.data[:first].split()[: 2 * stream.streamDict["N"]]
+        self.numbers = [int(i) for i in header[::2]]
+        self.offsets = [first + int(i) for i in header[1::2]]
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+    def __getitem__(self, index: int) -> PDFObject:
+        content, _ = PDFObject.next_elem(self.data, self.offsets[index])
+        return PDFObject(self.numbers[index], 0, content)
+
+
 #############################
 
 
@@ -133,27 +320,109 @@ class PDFCatalog(PDFHighObject):
 
 
 class PDFPageCollection(PDFHighObject):
-
-    def __init__(self, obj: PDFObject) -> None:
+    """
+    the page tree. a page is found by descending from the root using the
+    /Count of every kid, so only the nodes on its path are loaded. the kids
+    of a node are counted in order as far as the page and their start
+    indices kept, later lookups through a visited node only load the page
+    itself.
+    """
+
+    INHERITABLE = ("Resources", "MediaBox", "CropBox", "Rotate")
+    MAX_DEPTH = 64
+
+    def __init__(self, obj: PDFObject, file: "PDFFile" = None) -> None:
         if obj.content["Type"] != PDFName("Pages"):
             raise ValueError("not a pages")
         super().__init__(obj)
         self.__count: int = obj.content["Count"]
         self.MediaBox: PDFList = obj.content.get("MediaBox", PDFList())
         self.Kids: PDFList = obj.content["Kids"]
+        self.__file = file
+        self.__root = obj.content
+        # object number -> the node as __node lists it
+        self.__nodes = {}
 
     def __len__(self) -> int:
         return self.__count
 
     def __getitem__(self, key: int) -> PDFIndirectReference:
-        return self.Kids[key]
+        page, _ = self.locate(key)
+        return PDFIndirectReference(page.on, page.gn)
+
+    def locate(self, key: int) -> Tuple[PDFObject, PDFDict]:
+        """the page object at index `key` and its attributes, inherited ones included"""
+        if key < 0:
+            key += self.__count
+        if not 0 <= key < self.__count:
+            raise IndexError("page index out of range")
+        attrs = PDFDict()
+        on = self._on
+        for _ in range(self.MAX_DEPTH):
+            node = self.__node(on)
+            kids, _, _, _, inherited = node
+            idx, start, leaf = self.__kid(node, key)
+            if leaf:
+                page = self.__file.get_object(kids[idx].on)
+                attrs.update(inherited)
+                attrs.update(self.__inheritable(page.content))
+                return page, attrs
+            attrs.update(inherited)
+            key -= start
+            on = kids[idx].on
+        raise ValueError("page tree is too deep or has a cycle")
+
+    def __node(self, on: int) -> list:
+        """[kids, kid start indices, kid is a leaf, pages counted, inheritable attributes] of a node"""
+        node = self.__nodes.get(on)
+        if node is None:
+            content = self.__root if on == self._on else self.__file.get_object(on).content
+            node = self.__nodes[on] = [content["Kids"], array("q"), bytearray(), 0, self.__inheritable(content)]
+        return node
+
+    def __kid(self, node: list, key: int) -> Tuple[int, int, bool]:
+        """(index, start index, is a leaf) of the kid holding page `key` of a node"""
+        kids, starts, leaves, total, _ = node
+        # kids are loaded in order up to the one holding the page, and only once.
+        # /Count alone cannot tell which kid that is, a /Pages kid may hold
+        # any number of pages
+        while total <= key and len(starts) < len(kids):
+            kid = self.__file.get_object(kids[len(starts)].on).content
+            starts.append(total)
+            if "Kids" in kid:
+                leaves.append(0)
+                total += kid.get("Count", 0)
+            else:
+                leaves.append(1)
+                total += 1
+        node[3] = total
+        if not starts:
+            raise IndexError("page index out of range")
+        idx = bisect_right(starts, key) - 1
+        return idx, starts[idx], bool(leaves[idx])
+
+    def __inheritable(self, content: PDFDict) -> PDFDict:
+        attrs = PDFDict()
+        for name in self.INHERITABLE:
+            value = content.get(name)
+            # a shared resource dictionary is resolved by the page, once per document
+            if isinstance(value, PDFIndirectReference) and name != "Resources":
+                value = value.get(self.__file).content
+            if value is not None:
+                attrs[name] = value
+        return attrs
 
 
 class PDFPage(PDFHighObject):
-    def __init__(self, obj: PDFObject) -> None:
+    def __init__(self, obj: PDFObject, attrs: PDFDict = None, file: "PDFFile" = None) -> None:
+        """
+        attrs are the page attributes with the inherited ones resolved, see
+        PDFPageCollection.locate. the content stream is read through `file`.
+        """
         if obj.content["Type"] != PDFName("Page"):
             raise ValueError("not a page")
         super().__init__(obj)
+        attrs = obj.content if attrs is None else attrs
 
         c = obj.content.get("Contents", PDFList())
         if not isinstance(c, PDFList):
@@ -161,13 +430,52 @@ class PDFPage(PDFHighObject):
 
         self.Parent: PDFIndirectReference = obj.content["Parent"]
         self.Contents: PDFList = c
-        self.Resources: PDFResources = PDFResources(
-            obj.content.get("Resources", PDFDict())
+        resources = attrs.get("Resources", PDFDict())
+        self.Resources: PDFResources = (
+            PDFResources(resources) if file is None else file.shared_resources(resources)
         )
-        self.CropBox: None = obj.content.get("CropBox")
+        self.CropBox: None = attrs.get("CropBox")
         self.Annots: None = obj.content.get("Annots")
-        self.MediaBox: None = obj.content.get("MediaBox")
+        self.MediaBox: None = attrs.get("MediaBox")
+        self.Rotate: int = attrs.get("Rotate", 0)
         self.ID: None = obj.content.get("ID")
+        self.__file = file
+
+    def font(self, name: str, resources: PDFResources = None) -> Optional[FontDecoder]:
+        """the decoder of the font resource `name`, in the page's resources unless others are given"""
+        font = (resources or self.Resources).entry("Font", name)
+        if not isinstance(font, (PDFIndirectReference, PDFDict)):
+            return None
+        return self.__file.font(font)
+
+    def operators(self, expand_forms: bool = True) -> Iterator[Tuple[str, list]]:
+        """
+        the (operator, operands) events of the page's content. with
+        expand_forms the operators of painted forms are played in place of
+        their Do, see FormExpander.
+        """
+        if self.__file is None:
+            raise ValueError("page is not attached to a file")
+        operators = iter_operators_chunks(self.__file.iter_contents(self.Contents))
+        return FormExpander(self.__file, operators, self.Resources) if expand_forms else operators
+
+    def images(self) -> Iterator[Tuple[PDFName, PDFImage]]:
+        """the image XObjects of the page's resources, by name. nothing but their dictionaries is read"""
+        for name, ref in self.Resources.category("XObject").items():
+            if isinstance(ref, PDFIndirectReference):
+                image = self.__file.image(ref)
+                if image is not None:
+                    yield name, image
+
+    def get_stack(self, expand_forms: bool = True) -> list:
+        return StreamStack.build(self.operators(expand_forms))
+
+    def extract_text(self, spans: bool = False) -> Union[str, List[Span]]:
+        """the text shown on the page and by the forms it paints, or the (x, y, w, h, text) spans it is made of"""
+        operators = self.operators()
+        # a form's fonts are looked up in its own resources
+        found = TextExtractor(lambda name: self.font(name, operators.resources)).run(operators)
+        return found if spans else to_text(found)
 
 
 class PDFFont(PDFHighObject):
@@ -209,43 +517,186 @@ class PDFFontDescriptor(PDFHighObject):
 
 
 class PDFFile:
+    """
+    use_mmap maps the file instead of reading it through a buffered reader:
+    objects are parsed out of the mapping and stream payloads are memoryview
+    slices of it, so nothing is copied until a filter decodes the stream.
+    cache takes any object with ObjectCache's get/put, the default is a
+    bounded ObjectCache.
+    """
 
-    def __init__(self, filename: str) -> None:
-        self.__objects_cache = {}
+    def __init__(
+        self, filename: str, use_mmap: bool = False, cache: ObjectCache = None
+    ) -> None:
+        self.cache = ObjectCache() if cache is None else cache
+        # what pages share, parsed: (object number, "Font") -> FontDecoder,
+        # (object number, "Form") -> PDFForm and (object number, "Resources")
+        # -> PDFResources. bounded like the object cache, the objects
+        # themselves are read through it
+        self.parsed = LRUPool(PARSED_ENTRIES, PARSED_BYTES)
         if isinstance(filename, str):
             self.__file = open(filename, "rb")
+            if use_mmap:
+                with self.__file as file:
+                    self.__file = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
             data = PDFComment.parse(self.__file.read(0x9))
             data = data.value.decode()
             if not data.startswith("PDF-"):
                 raise ValueError("Not a PDF file")
             self.version = data[4:]
             self.trailer = PDFTrailer.read(self.__file)
-            self.xref_table = XREFTable.read(self.__file, self.trailer.start_xref)
+            self.xref_table = XREFTable.read(
+                self.__file, self.trailer.start_xref, self.trailer.xref_stream
+            )
             self.catalog = PDFCatalog(
                 self.get_object(self.trailer.trailer_root.catalog.on)
             )
-            self.pages = PDFPageCollection(self.get_object(self.catalog.Pages.on))
+            self.pages = PDFPageCollection(
+                self.get_object(self.catalog.Pages.on), self
+            )
         elif filename is None:
             self.version = "1.4"
             self.trailer = PDFTrailer()
 
     def get_object(self, on: int) -> PDFObject:
-        entry = self.xref_table[on]
-        if hasattr(entry, "content"):
-            print("cached")
-            return entry.content
-        obj = PDFObject.read(self.__file, entry.offset)
-        setattr(entry, "content", obj)
+        obj = self.cache.get(on)
+        if obj is None:
+            obj = self.read_object(on)
+            self.cache.put(on, obj)
         return obj
 
+    def read_object(self, on: int) -> PDFObject:
+        """parses object `on` without going through the cache"""
+        xref = self.xref_table
+        if on >= len(xref) or xref.types[on] == XREFTable.FREE:
+            # references to free or missing objects are null
+            return PDFObject(on, 0, PDFNull())
+        if xref.types[on] == XREFTable.COMPRESSED:
+            obj = self.get_object_stream(xref.offsets[on])[xref.generations[on]]
+        else:
+            obj = PDFObject.read(self.__file, xref.offsets[on], self.resolve_length)
+        return obj
+
+    def page_contents(self, key: int) -> bytes:
+        """the decoded content streams of page `key`, joined as one stream"""
+        return b"".join(self.iter_page_contents(key))
+
+    def iter_page_contents(self, key: int, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """page_contents as decoded chunks, for iter_operators_chunks"""
+        return self.iter_contents(self[key].Contents, chunk_size)
+
+    def iter_contents(self, contents: PDFList, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """the decoded chunks of a /Contents array, one stream after the other"""
+        refs = list(contents)
+        first = True
+        while refs:
+            ref = refs.pop(0)
+            if not isinstance(ref, PDFIndirectReference):
+                continue
+            content = self.read_object(ref.on).content
+            if isinstance(content, PDFList):
+                refs[:0] = content
+            elif isinstance(content, PDFStream):
+                if not first:
+                    yield b"\n"
+                first = False
+                yield from content.iter_decoded(chunk_size)
+
+    def resolve(self, value: Any) -> Any:
+        """the content of an indirect reference, anything else as it is"""
+        if isinstance(value, PDFIndirectReference):
+            return self.get_object(value.on).content
+        return value
+
+    def font(self, font: Union[PDFIndirectReference, PDFDict]) -> FontDecoder:
+        """
+        the text decoder of a font. fonts are shared by many pages, the
+        decoder of a font object is built once and kept by object number.
+        """
+        if not isinstance(font, PDFIndirectReference):
+            return FontDecoder.from_font(font, self.resolve)
+        key = (font.on, "Font")
+        if key in self.parsed:
+            return self.parsed.get(key)
+        decoder = FontDecoder.from_font(self.resolve(font), self.resolve)
+        self.parsed.put(key, decoder, approx_size(decoder.table) + approx_size(decoder.widths))
+        return decoder
+
+    def shared_resources(self, resources: Union[PDFIndirectReference, PDFDict]) -> PDFResources:
+        """a PDFResources resolving through the object cache, one per shared resource dictionary"""
+        if not isinstance(resources, PDFIndirectReference):
+            return PDFResources(resources, self.resolve)
+        key = (resources.on, "Resources")
+        if key in self.parsed:
+            return self.parsed.get(key)
+        found = PDFResources(resources, self.resolve)
+        self.parsed.put(key, found, approx_size(found))
+        return found
+
+    def form(self, ref: PDFIndirectReference) -> Optional[PDFForm]:
+        """the form XObject `ref` points at, decoded and tokenized the first time; None if it is not a form"""
+        key = (ref.on, "Form")
+        if key in self.parsed:
+            return self.parsed.get(key)
+        # the stream dictionary alone tells, an image's payload is not read
+        stream = self.resolve(ref)
+        if not isinstance(stream, PDFStream) or stream.Subtype != "Form":
+            return None
+        resources = stream.streamDict.get("Resources")
+        try:
+            form = PDFForm(ref.on, stream, None if resources is None else self.shared_resources(resources))
+        except (ValueError, zlib.error):
+            # a form that cannot be read is left as its Do
+            return None
+        self.parsed.put(key, form, sum(approx_size(operands) for _, operands in form.operators))
+        return form
+
+    def image(self, ref: PDFIndirectReference) -> Optional[PDFImage]:
+        """
+        the image XObject `ref` points at, None if it is not an image. it
+        is read around the caches and its payload is only loaded when
+        PDFImage.passthrough or to_array need it, so images are not kept.
+        """
+        stream = self.read_object(ref.on).content
+        if not isinstance(stream, PDFStream) or stream.Subtype != "Image":
+            return None
+        return PDFImage(stream, self.resolve, ref.on)
+
+    def resolve_length(self, ref: PDFIndirectReference) -> Any:
+        # the /Length of a stream, kept in an object of its own
+        return self.get_object(ref.on).content
+
+    def get_object_stream(self, on: int) -> PDFObjectStream:
+        # decoded once, every object compressed in it is served from here.
+        # the stream is read around the cache: decoding happens in place
+        key = (on, "ObjStm")
+        objstm = self.cache.get(key)
+        if objstm is None:
+            objstm = PDFObjectStream(self.read_object(on).content)
+            self.cache.put(key, objstm, stream=True)
+        return objstm
+
     def close(self) -> None:
-        self.__file.close()
+        try:
+            self.__file.close()
+        except BufferError:
+            # stream payloads still point into the mapping, it is unmapped
+            # once the last of them is collected
+            pass
 
     def __len__(self) -> int:
         return len(self.pages)
 
     def __getitem__(self, key: int) -> PDFPage:
-        return PDFPage(self.get_object(self.pages[key].on))
+        return PDFPage(*self.pages.locate(key), self)
+
+    def iter_text(self, spans: bool = False, pages: Iterable[int] = None) -> Iterator[Union[str, List[Span]]]:
+        """
+        PDFPage.extract_text of every page in `pages` (all by default), one
+        page at a time so only the current page's operators are held.
+        """
+        for key in range(len(self)) if pages is None else pages:
+            yield self[key].extract_text(spans)
 
 
 if __name__ == "__main__":
@@ -255,12 +706,7 @@ if __name__ == "__main__":
     # # f = PDFFile("./Hello-stream.pdf")
     page: PDFPage = f[1]
     print(page.Resources)
-    xo = page.Resources.XObject["Xi1"](f)
-    _ = page.Contents[0](f)
-    _.unapply_filters()
-    xo.unapply_filters()
-    print(StreamStack.get_stack(xo.buffer))
-    print(StreamStack.get_stack(_.buffer))
+    print(page.get_stack())
 
     # print(zlib.decompress(xo.Resources.XObject["Im1"](f).buffer))
     # # for n,i in xo.Resources.XObject.items():
@@ -1,16 +1,50 @@
 import re
-from PDFPrimitives import *
-
-
-class StreamParseEnd(Exception): ...
+from array import array
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from .PDFPrimitives import (
+    DICT_END,
+    LIST_END,
+    NUMBER_PATTERN,
+    PDFDict,
+    PDFList,
+    PDFName,
+    PDFNull,
+    PDFObject,
+)
+from .utils import DELIMITER_CHARS, REGULAR_SET, WHITESPACE_CHARS, WHITESPACE_SET, byte_set
+
+# the code flag of functions taking *args
+CO_VARARGS = 0x04
+# operator -> (constructor taking the operand list, arity or None when variable)
+OPERATORS: Dict[str, Tuple[Callable, Optional[int]]] = {}
+# operator token -> operator, so known operators are never decoded
+OPERATOR_NAMES: Dict[bytes, str] = {}
 
 
 class StreamCommand:
+    __slots__ = ()
     operator: str
 
+    def __init_subclass__(cls, **kwargs) -> None:
+        # every command class that names an operator registers itself
+        super().__init_subclass__(**kwargs)
+        if "operator" in cls.__dict__:
+            OPERATORS[cls.operator] = (cls.from_operands, cls.arity())
+            OPERATOR_NAMES[cls.operator.encode()] = cls.operator
+
     @classmethod
-    def from_str(cls, data: str):
-        return cls()
+    def arity(cls) -> Optional[int]:
+        if cls.__init__ is object.__init__:
+            return 0
+        # read off the code object, inspect.signature is slow to import and to run
+        init = cls.__init__
+        if init.__code__.co_flags & CO_VARARGS or init.__defaults__:
+            return None
+        return init.__code__.co_argcount - 1
+
+    @classmethod
+    def from_operands(cls, operands: list):
+        return cls(*operands)
 
     def __repr__(self) -> str:
         return (
@@ -21,22 +55,219 @@ class StreamCommand:
 
 
 class StreamCommandFloats(StreamCommand):
-    @classmethod
-    def from_str(cls, data: str):
-        return cls(*(float(i) for i in data.strip().split(b" ")))
+    __slots__ = ()
 
 
 class StreamCommandName(StreamCommand):
     def __init__(self, name: PDFName) -> None:
         self.name = name
 
-    @classmethod
-    def from_str(cls, data: str):
-        return cls(PDFName.parse(data))
+
+class UnknownOperator(StreamCommand):
+    """an operator without a registered command, or with the wrong operand count, kept as is"""
+
+    def __init__(self, operator: str, operands: list) -> None:
+        self.operator = operator
+        self.operands = operands
+
+
+KEYWORD_START = b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'\""
+OPERAND_KEYWORDS = {b"true": True, b"false": False, b"null": PDFNull()}
+# the common operand and operator tokens in one pattern, anything else is
+# left to the primitive lexer. some alternative matches wherever the last
+# token ended, so finditer never skips over input
+TOKEN_END = rb"(?!" + REGULAR_SET + rb")"
+TOKEN_PTRN = re.compile(
+    rb"(?:" + WHITESPACE_SET + rb"|%[^\r\n]*(?![^\r\n]))*"
+    + rb"(?:(?P<number>" + NUMBER_PATTERN + rb")" + TOKEN_END
+    + rb"|(?P<keyword>[A-Za-z'\"]" + REGULAR_SET + rb"*)"
+    + rb"|/(?P<name>" + byte_set(WHITESPACE_CHARS + DELIMITER_CHARS + b"#", negated=True) + rb"*)" + TOKEN_END
+    + rb"|(?P<other>" + byte_set(WHITESPACE_CHARS + b"%", negated=True) + rb")"
+    + rb"|(?P<end>\Z))"
+)
+
+
+########## inline images ##########
+# the components of the colour spaces an inline image can name directly
+INLINE_COMPONENTS = {
+    "G": 1,
+    "DeviceGray": 1,
+    "CalGray": 1,
+    "I": 1,
+    "Indexed": 1,
+    "RGB": 3,
+    "DeviceRGB": 3,
+    "CalRGB": 3,
+    "Lab": 3,
+    "CMYK": 4,
+    "DeviceCMYK": 4,
+}
+# EI as a whole token, where the length of the data cannot be computed
+INLINE_EI_END = rb"EI(?=" + byte_set(WHITESPACE_CHARS + b"%/[<(") + rb"|\Z)"
+INLINE_END_PTRN = re.compile(WHITESPACE_SET + INLINE_EI_END)
+INLINE_EI_PTRN = re.compile(WHITESPACE_SET + rb"*" + INLINE_EI_END)
+
+
+def inline_attr(attrs: PDFDict, short: str, name: str, default=None):
+    value = attrs.get(short)
+    return attrs.get(name, default) if value is None else value
+
+
+def inline_length(attrs: PDFDict) -> Optional[int]:
+    """the byte length of an inline image's data, None when only scanning for EI can tell"""
+    length = inline_attr(attrs, "L", "Length")
+    if isinstance(length, int):
+        return length
+    if inline_attr(attrs, "F", "Filter"):
+        return None
+    width = inline_attr(attrs, "W", "Width")
+    height = inline_attr(attrs, "H", "Height")
+    if not isinstance(width, int) or not isinstance(height, int):
+        return None
+    if inline_attr(attrs, "IM", "ImageMask") is True:
+        components, bpc = 1, 1
+    else:
+        space = inline_attr(attrs, "CS", "ColorSpace")
+        if isinstance(space, list) and space:
+            # [/Indexed base hival lookup]
+            space = space[0]
+        components = INLINE_COMPONENTS.get(space) if isinstance(space, PDFName) else None
+        bpc = inline_attr(attrs, "BPC", "BitsPerComponent", 8)
+        if components is None or not isinstance(bpc, int):
+            # a named resource colour space
+            return None
+    return height * ((width * components * bpc + 7) // 8)
+
+
+def inline_image(data: bytes, pos: int, partial: bool = False) -> Optional[Tuple[PDFDict, bytes, int]]:
+    """
+    the attributes and data of the inline image whose BI ends at `pos`, and
+    the offset after its EI. the data is skipped by its computed length and
+    only scanned for EI when the length is unknown or does not end at one.
+    None when the data is cut short in partial mode.
+    """
+    attrs = PDFDict()
+    while True:
+        key, pos = PDFObject.next_elem(data, pos)
+        if key == b"ID":
+            break
+        if not isinstance(key, PDFName):
+            raise ValueError(f"inline image key expected at {pos}")
+        attrs[key], pos = PDFObject.next_elem(data, pos)
+    # a single white-space character separates ID from the data
+    start = pos + 1
+    length = inline_length(attrs)
+    if length is not None:
+        end = INLINE_EI_PTRN.match(data, start + length)
+        if end is not None and (not partial or end.end() < len(data)):
+            return attrs, data[start : start + length], end.end()
+        if partial and start + length + 3 >= len(data):
+            return None
+    end = INLINE_END_PTRN.search(data, start)
+    if end is None or partial and end.end() >= len(data):
+        if partial:
+            return None
+        raise ValueError("inline image without EI")
+    return attrs, data[start : end.start()], end.end()
+
+
+def iter_operators(data: bytes, partial: list = None) -> Iterator[Tuple[str, list]]:
+    """
+    yields an (operator, operands) event for every operator of a content
+    stream in a single forward pass. operands are parsed once, into the
+    same numbers, names, strings, arrays and dicts the object parser makes.
+    a stray >> or ] and operands left over at the end are dropped.
+
+    with `partial` the data may be cut anywhere: scanning stops quietly at
+    a token that could continue past the end, and partial[0] is kept at the
+    offset just after the last operator yielded.
+    """
+    pos = 0
+    operands = []
+    append = operands.append
+    end = len(data)
+    while True:
+        for token in TOKEN_PTRN.finditer(data, pos):
+            kind = token.lastgroup
+            if kind == "number":
+                value = token.group(kind)
+                append(float(value) if b"." in value else int(value))
+            elif kind == "name":
+                append(PDFName.from_bytes(token.group(kind)))
+            elif kind == "keyword":
+                value = token.group(kind)
+                if value in OPERAND_KEYWORDS:
+                    append(OPERAND_KEYWORDS[value])
+                    continue
+                if partial is not None and token.end() == end:
+                    return
+                if value == b"BI":
+                    # the binary data is never tokenized
+                    try:
+                        image = inline_image(data, token.end(), partial is not None)
+                    except (ValueError, IndexError):
+                        if partial is not None:
+                            return
+                        raise
+                    if image is None:
+                        return
+                    attrs, payload, pos = image
+                    if partial is not None:
+                        partial[0] = pos
+                    yield InlineImage.operator, [attrs, payload]
+                    operands = []
+                    append = operands.append
+                    kind = "image"
+                    break
+                if partial is not None:
+                    partial[0] = token.end()
+                # latin-1 decodes any byte, an odd operator comes out as an unknown one
+                yield OPERATOR_NAMES.get(value) or value.decode("latin-1"), operands
+                operands = []
+                append = operands.append
+            else:
+                # strings, arrays, dicts and odd names
+                pos = token.start(kind)
+                break
+        if kind == "end":
+            break
+        if kind == "image":
+            continue
+        try:
+            value, pos = PDFObject.next_elem(data, pos)
+        except (ValueError, IndexError):
+            if partial is not None:
+                return
+            raise
+        if partial is not None and pos == end:
+            return
+        # a stray >> or ] is skipped, it is no operand
+        if value is not DICT_END and value is not LIST_END:
+            append(value)
+    # operands left without an operator at the end are dropped
+
+
+def iter_operators_chunks(chunks: Iterable[bytes]) -> Iterator[Tuple[str, list]]:
+    """
+    iter_operators over a content stream that arrives in chunks, such as
+    PDFStream.iter_decoded yields. only the tail after the last complete
+    operator is carried over to the next chunk.
+    """
+    buffer = b""
+    # a tail without a single complete operator waits until it has doubled
+    wanted = 0
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer) < wanted:
+            continue
+        partial = [0]
+        yield from iter_operators(buffer, partial)
+        buffer = buffer[partial[0] :]
+        wanted = 2 * len(buffer) if not partial[0] else 0
+    yield from iter_operators(buffer)
 
 
 class StreamStack:
-    __ptrn = re.compile(rb"((?<=(?:[\>\s\n\)\]]))|^)[A-Za-z\*]{1,3}(?:[\r\s\n])")
     operator = "q"
     end_operator = "Q"
 
@@ -47,44 +278,79 @@ class StreamStack:
         return f"{self.__class__.__name__}({self.stack})"
 
     @staticmethod
-    def lax(data: bytes):
-        stack = []
-        while data:
-            try:
-                st = None
-                operator, operands, data2 = StreamStack.get_command(data)
-                if operands.startswith(b"("):
-                    st, data = PDFStr.lax(data.lstrip())
-                    operator, operands, data = StreamStack.get_command(data)
-                    operands = st
-                else:
-                    data = data2
-                endScope, command, data = build_command(operator, operands, data)
-                if endScope:
-                    break
-                stack.append(command)
-            except StreamParseEnd:
-                break
-        return stack, data
+    def build(events: Iterable[Tuple[str, list]]) -> list:
+        """
+        nests the events into lists for q/Q and Text blocks for BT/ET.
+        the open scopes are kept on an explicit stack, deep nesting costs
+        no recursion.
+        """
+        root = []
+        scopes = [root]
+        # the Path the construction operators are being packed into
+        path = None
+        for operator, operands in events:
+            opcode = PATH_OPCODES.get(operator)
+            if opcode is not None:
+                if path is None:
+                    path = Path()
+                    scopes[-1].append(path)
+                if not path.add(opcode, operands):
+                    if not path:
+                        scopes[-1].pop()
+                    scopes[-1].append(UnknownOperator(operator, operands))
+                    path = None
+                continue
+            path = None
+            if operator == StreamStack.operator:
+                scope = []
+                scopes[-1].append(scope)
+                scopes.append(scope)
+            elif operator == Text.operator:
+                text = Text([])
+                scopes[-1].append(text)
+                scopes.append(text.garbage)
+            elif operator in (StreamStack.end_operator, Text.end_operator):
+                if len(scopes) > 1:
+                    scopes.pop()
+            else:
+                scopes[-1].append(build_command(operator, operands))
+        return root
 
     @staticmethod
     def get_stack(data: bytes):
-        stack, data = StreamStack.lax(data)
-        if data.strip() != b"":
-            raise ValueError("problem parsing")
-        return stack
+        return StreamStack.build(iter_operators(data))
 
     @staticmethod
-    def get_command(data: bytes):
-        _ = StreamStack.__ptrn.search(data)
-        if _ == None:
-            raise StreamParseEnd()
-        operands = data[: _.start()].strip()
-        operator = _.group().strip().decode()
-        data = data[_.end() :]
-        return operator, operands, data
+    def get_stack_chunks(chunks: Iterable[bytes]):
+        return StreamStack.build(iter_operators_chunks(chunks))
 
 
+#################### Matrices ####################
+# (a, b, c, d, e, f) as in cm, Tm and /Matrix
+Matrix = Tuple[float, float, float, float, float, float]
+IDENTITY: Matrix = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+
+def multiply(m: Matrix, n: Matrix) -> Matrix:
+    """m x n, the transformation m followed by n"""
+    a, b, c, d, e, f = m
+    A, B, C, D, E, F = n
+    return (
+        a * A + b * C,
+        a * B + b * D,
+        c * A + d * C,
+        c * B + d * D,
+        e * A + f * C + E,
+        e * B + f * D + F,
+    )
+
+
+def apply(m: Matrix, x: float, y: float) -> Tuple[float, float]:
+    """the point (x, y) transformed by m"""
+    return m[0] * x + m[2] * y + m[4], m[1] * x + m[3] * y + m[5]
+
+
+#################### End Matrices ####################
 #################### General graphics state ####################
 class LineWidth(StreamCommand):
     operator = "w"
@@ -92,10 +358,6 @@ class LineWidth(StreamCommand):
     def __init__(self, lw: float):
         self.lw = lw
 
-    @staticmethod
-    def from_str(data: str):
-        return LineWidth(float(data))
-
 
 class CurrentMatrix(StreamCommand):
     operator = "cm"
@@ -103,12 +365,6 @@ class CurrentMatrix(StreamCommand):
     def __init__(self, a: int, b: int, c: int, d: int, e: int, f: int):
         self.matrix = (a, b, c, d, e, f)
 
-    @staticmethod
-    def from_str(data: str):
-        if isinstance(data, bytes):
-            data = data.decode()
-        return CurrentMatrix(*(float(i) for i in data.strip().split(" ")))
-
 
 class LineCap(StreamCommand):
     operator = "J"
@@ -116,10 +372,6 @@ class LineCap(StreamCommand):
     def __init__(self, cap: int):
         self.cap = cap
 
-    @staticmethod
-    def from_str(data: str):
-        return LineCap(int(data))
-
 
 class LineJoin(StreamCommand):
     operator = "j"
@@ -127,10 +379,6 @@ class LineJoin(StreamCommand):
     def __init__(self, join: int):
         self.join = join
 
-    @staticmethod
-    def from_str(data: str):
-        return LineJoin(int(data))
-
 
 class RenderingIntent(StreamCommandName):
     operator = "ri"
@@ -142,9 +390,20 @@ class Flatness(StreamCommand):
     def __init__(self, flatness: int):
         self.flatness = flatness
 
-    @staticmethod
-    def from_str(data: str):
-        return Flatness(int(data))
+
+class MiterLimit(StreamCommand):
+    operator = "M"
+
+    def __init__(self, limit: float):
+        self.limit = limit
+
+
+class LineDash(StreamCommand):
+    operator = "d"
+
+    def __init__(self, dash_array: PDFList, dash_phase: float):
+        self.dash_array = dash_array
+        self.dash_phase = dash_phase
 
 
 class GraphicalState(StreamCommandName):
@@ -160,11 +419,6 @@ class Text(StreamCommand):
     def __init__(self, data: list):
         self.garbage = data
 
-    @staticmethod
-    def lax(data: bytes):
-        s, data = StreamStack.lax(data)
-        return Text(s), data
-
 
 class TextMatrix(StreamCommand):
     operator = "Tm"
@@ -172,12 +426,6 @@ class TextMatrix(StreamCommand):
     def __init__(self, a: float, b: float, c: float, d: float, e: float, f: float):
         self.matrix = (a, b, c, d, e, f)
 
-    @staticmethod
-    def from_str(data: str):
-        if isinstance(data, bytes):
-            data = data.decode()
-        return TextMatrix(*(float(i) for i in data.strip().split(" ")))
-
 
 class TextDelta(StreamCommand):
     operator = "Td"
@@ -185,22 +433,10 @@ class TextDelta(StreamCommand):
     def __init__(self, x: float, y: float):
         self.x, self.y = x, y
 
-    @staticmethod
-    def from_str(data: str):
-        if isinstance(data, bytes):
-            data = data.decode()
-        x, y = data.strip().split(" ")
-        return TextDelta(float(x), float(y))
-
 
 class TextDelta2(TextDelta):
     operator = "TD"
 
-    @staticmethod
-    def from_str(data: str):
-        _ = TextDelta.from_str(data)
-        return TextDelta2(_.x, _.y)
-
 
 class TextToStartOfLine(StreamCommand):
     operator = "T*"
@@ -209,12 +445,30 @@ class TextToStartOfLine(StreamCommand):
 class TextContent(StreamCommand):
     operator = "Tj"
 
-    def __init__(self, data: PDFStr):
+    def __init__(self, data: bytes):
         self.data = data
 
-    @staticmethod
-    def from_str(data: str):
-        return TextContent(PDFStr.lax(data)[0])
+
+class TextArray(StreamCommand):
+    """strings and the adjustments between them, in thousandths of an em"""
+
+    operator = "TJ"
+
+    def __init__(self, data: PDFList):
+        self.data = data
+
+
+class NextLineText(TextContent):
+    operator = "'"
+
+
+class NextLineTextSpacing(StreamCommand):
+    operator = '"'
+
+    def __init__(self, word_space: float, char_space: float, data: bytes):
+        self.word_space = word_space
+        self.char_space = char_space
+        self.data = data
 
 
 #################### End Text-positioning operators ###############################
@@ -253,10 +507,6 @@ class TextRenderingMode(StreamCommand):
     def __init__(self, text_rendering_mode: int):
         self.value = text_rendering_mode
 
-    @classmethod
-    def from_str(cls, data: str):
-        return cls(int(data.strip()))
-
 
 class TextRise(StreamCommandFloats):
     operator = "Ts"
@@ -272,87 +522,136 @@ class TextFont(StreamCommand):
         self.text_font = text_font
         self.size = size
 
-    @classmethod
-    def from_str(cls, data: str):
-        data = data.strip()
-        _ = data.find(b" ")
-        return cls(PDFName.parse(data[:_]), int(data[_:].strip()))
-
 
 #################### End Text state operators ###############################
 
 #################### Path construction operators ###################
+# a vector-heavy page holds millions of these: consecutive construction
+# operators are packed into one Path, one opcode byte and a few doubles
+# each, and the command classes are views into it.
+class Path(StreamCommand):
+    __slots__ = ("ops", "coords")
+
+    def __init__(self) -> None:
+        self.ops = array("B")
+        self.coords = array("d")
+
+    def add(self, opcode: int, operands: list) -> bool:
+        """appends one command, False when the operands do not fit it"""
+        if len(operands) != PathCommand.commands[opcode].arity():
+            return False
+        # extend stops at a bad operand with the ones before it appended
+        end = len(self.coords)
+        try:
+            self.coords.extend(operands)
+        except TypeError:
+            del self.coords[end:]
+            return False
+        self.ops.append(opcode)
+        return True
+
+    def __len__(self) -> int:
+        return len(self.ops)
+
+    def __iter__(self) -> Iterator["PathCommand"]:
+        offset = 0
+        for opcode in self.ops:
+            command = PathCommand.commands[opcode]
+            yield command.view(self, offset)
+            offset += len(command.fields)
+
+    def __getitem__(self, key: int) -> "PathCommand":
+        return list(self)[key]
 
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({list(self)})"
+
+
+class PathCommand(StreamCommandFloats):
+    __slots__ = ("path", "offset")
+    fields: Tuple[str, ...] = ()
+    # opcode -> command class
+    commands: List[type] = []
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        cls.opcode = len(PathCommand.commands)
+        PathCommand.commands.append(cls)
+        for idx, name in enumerate(cls.fields):
+            setattr(
+                cls, name, property(lambda self, idx=idx: self.path.coords[self.offset + idx])
+            )
+        super().__init_subclass__(**kwargs)
+
+    def __init__(self, *coords: float) -> None:
+        # a command made on its own gets a path of its own
+        path = Path()
+        if not path.add(self.opcode, list(coords)):
+            raise TypeError(f"{self.operator} takes {len(self.fields)} numbers")
+        self.path = path
+        self.offset = 0
 
-class m(StreamCommandFloats):
-    operator = "m"
+    @classmethod
+    def view(cls, path: Path, offset: int) -> "PathCommand":
+        command = cls.__new__(cls)
+        command.path = path
+        command.offset = offset
+        return command
 
-    def __init__(self, x: float, y: float):
-        self.x = x
-        self.y = y
+    @classmethod
+    def arity(cls) -> Optional[int]:
+        return len(cls.fields)
 
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}("
+            + ", ".join(f"{n}={getattr(self, n)}" for n in self.fields)
+            + ")"
+        )
 
-class l(StreamCommandFloats):
-    operator = "l"
 
-    def __init__(self, x: float, y: float):
-        self.x = x
-        self.y = y
+class m(PathCommand):
+    __slots__ = ()
+    operator = "m"
+    fields = ("x", "y")
 
 
-class CubicBezier(StreamCommandFloats):
-    operator = "c"
+class l(PathCommand):
+    __slots__ = ()
+    operator = "l"
+    fields = ("x", "y")
 
-    def __init__(
-        self, x1: float, y1: float, x2: float, y2: float, x3: float, y3: float
-    ):
-        self.x1 = x1
-        self.y1 = y1
-        self.x2 = x2
-        self.y2 = y2
-        self.x3 = x3
-        self.y3 = y3
 
+class CubicBezier(PathCommand):
+    __slots__ = ()
+    operator = "c"
+    fields = ("x1", "y1", "x2", "y2", "x3", "y3")
 
-class v(StreamCommandFloats):
-    operator = "v"
 
-    def __init__(self, x2: float, y2: float, x3: float, y3: float):
-        self.x2 = x2
-        self.y2 = y2
-        self.x3 = x3
-        self.y3 = y3
+class v(PathCommand):
+    __slots__ = ()
+    operator = "v"
+    fields = ("x2", "y2", "x3", "y3")
 
 
-class y(StreamCommandFloats):
+class y(PathCommand):
+    __slots__ = ()
     operator = "y"
+    fields = ("x1", "y1", "x3", "y3")
 
-    def __init__(self, x1: float, y1: float, x3: float, y3: float):
-        self.x1 = x1
-        self.y1 = y1
-        self.x3 = x3
-        self.y3 = y3
 
-
-class CloseSubpath(StreamCommand):
+class CloseSubpath(PathCommand):
+    __slots__ = ()
     operator = "h"
 
-    def __init__(self):
-        pass
-
-    @staticmethod
-    def from_str(data: str):
-        return CloseSubpath()
-
 
-class RectanglePath(StreamCommandFloats):
+class RectanglePath(PathCommand):
+    __slots__ = ()
     operator = "re"
+    fields = ("x", "y", "width", "hight")
 
-    def __init__(self, x: float, y: float, width: float, hight: float):
-        self.x = x
-        self.y = y
-        self.width = width
-        self.hight = hight
+
+# operator -> opcode of the path construction operators
+PATH_OPCODES: Dict[str, int] = {c.operator: c.opcode for c in PathCommand.commands}
 
 
 #################### End Path construction operators ###################
@@ -409,6 +708,10 @@ class PaintXObject(StreamCommandName):
     operator = "Do"
 
 
+class PaintShading(StreamCommandName):
+    operator = "sh"
+
+
 #################### End Path-painting operators ###################
 #################### Marked-content operators ###################
 
@@ -428,15 +731,6 @@ class BDC(StreamCommand):
         self.tag = tag
         self.props = props
 
-    @staticmethod
-    def from_str(data):
-        data = data.strip()
-        _ = data.find(b" ")
-        last = data[_ + 1 :]
-        if PDFName.is_name(last):
-            return BDC(PDFName.parse(data[:_]), PDFName.parse(last))
-        return BDC(PDFName.parse(data[:_]), PDFDict.lax(last)[0])
-
 
 #################### End Marked-content operators ###################
 #################### Color operators ###################
@@ -462,10 +756,11 @@ class scn(SetColor):
         super().__init__(*args)
 
     @classmethod
-    def from_str(cls, data: str):
-        _ = data.rfind(b"/")
-        name = PDFName.parse(data[_:]) if PDFName.is_name(data[_:]) else None
-        return cls(name, *(float(i) for i in data.strip().split(b" ")))
+    def from_operands(cls, operands: list):
+        # the pattern name, when there is one, comes after the components
+        if operands and isinstance(operands[-1], PDFName):
+            return cls(operands[-1], *operands[:-1])
+        return cls(None, *operands)
 
 
 class SetGray(StreamCommandFloats):
@@ -519,133 +814,45 @@ class SetCMYKColorStroke(SetCYMKColor):
 
 
 #################### End Color operators ###################
+#################### Type 3 font operators ###################
+class GlyphWidth(StreamCommandFloats):
+    operator = "d0"
+
+    def __init__(self, wx: float, wy: float):
+        self.wx, self.wy = wx, wy
+
+
+class GlyphWidthBBox(StreamCommandFloats):
+    operator = "d1"
+
+    def __init__(self, wx: float, wy: float, llx: float, lly: float, urx: float, ury: float):
+        self.wx, self.wy = wx, wy
+        self.bbox = (llx, lly, urx, ury)
+
+
+#################### End Type 3 font operators ###################
+#################### Inline images ###################
+class InlineImage(StreamCommand):
+    """BI ... ID ... EI as one command: the attributes as written, short names included, and the raw data"""
+
+    operator = "BI"
+
+    def __init__(self, attrs: PDFDict, data: bytes):
+        self.attrs = attrs
+        self.data = data
+
+
+#################### End Inline images ###################
 
 
-def build_command(operator: str, operands: bytes, data):
-
-    command: str = None
-    end_scope = False
-    match operator:
-        case "q":
-            command, data = StreamStack.lax(data)
-        case "Q" | Text.end_operator:
-            end_scope = True
-        case Text.operator:
-            command, data = Text.lax(data)
-        case LineWidth.operator:
-            command = LineWidth.from_str(operands)
-        case CurrentMatrix.operator:
-            command = CurrentMatrix.from_str(operands)
-        case LineCap.operator:
-            command = LineCap.from_str(operands)
-        case LineJoin.operator:
-            command = LineJoin.from_str(operands)
-        case RenderingIntent.operator:
-            command = RenderingIntent.from_str(operands)
-        case Flatness.operator:
-            command = Flatness.from_str(operands)
-        case GraphicalState.operator:
-            command = GraphicalState.from_str(operands)
-        case TextMatrix.operator:
-            command = TextMatrix.from_str(operands)
-        case TextDelta2.operator:
-            command = TextDelta2.from_str(operands)
-        case TextToStartOfLine.operator:
-            command = TextToStartOfLine()
-        case TextContent.operator:
-            # already a PDFStr!!!
-            command = TextContent(operands)
-        case CubicBezier.operator:
-            command = CubicBezier.from_str(operands)
-        case v.operator:
-            command = v.from_str(operands)
-        case y.operator:
-            command = y.from_str(operands)
-        case CloseSubpath.operator:
-            command = CloseSubpath.from_str(operands)
-        case m.operator:
-            command = m.from_str(operands)
-        case l.operator:
-            command = l.from_str(operands)
-        case RectanglePath.operator:
-            command = RectanglePath.from_str(operands)
-        case StrokePath.operator:
-            command = StrokePath()
-        case StrokeClosePath.operator:
-            command = StrokeClosePath()
-        case FillPath.operator:
-            command = FillPath()
-        case FillPath2.operator:
-            command = FillPath2()
-        case FillEvenOddPath.operator:
-            command = FillEvenOddPath()
-        case FillAndStrokePath.operator:
-            command = FillAndStrokePath()
-        case FillAndStrokeEvenOddPath.operator:
-            command = FillAndStrokeEvenOddPath()
-        case FillAndStrokeClosePath.operator:
-            command = FillAndStrokeClosePath()
-        case FillAndStrokeClosePathEvenOdd.operator:
-            command = FillAndStrokeClosePathEvenOdd()
-        case EndPath.operator:
-            command = EndPath()
-        case ClippingPath.operator:
-            command = ClippingPath()
-        case ClippingPathOddEven.operator:
-            command = ClippingPathOddEven()
-        case PaintXObject.operator:
-            command = PaintXObject.from_str(operands)
-        case BeginMarkedContent.operator:
-            command = BeginMarkedContent.from_str(operands)
-        case BDC.operator:
-            command = BDC.from_str(operands)
-        case EndMarkedContent.operator:
-            command = EndMarkedContent()
-        case CurrentColorSpace.operator:
-            command = CurrentColorSpace.from_str(operands)
-        case SetColor.operator:
-            command = SetColor.from_str(operands)
-        case scn.operator:
-            command = scn.from_str(operands)
-        case SetGray.operator:
-            command = SetGray.from_str(operands)
-        case SetRGBColor.operator:
-            command = SetRGBColor.from_str(operands)
-        case SetCYMKColor.operator:
-            command = SetCYMKColor.from_str(operands)
-        case CurrentColorSpaceStroke.operator:
-            command = CurrentColorSpaceStroke.from_str(operands)
-        case SetColorStroke.operator:
-            command = SetColorStroke.from_str(operands)
-        case SCN.operator:
-            command = SCN.from_str(operands)
-        case SetGrayStroke.operator:
-            command = SetGrayStroke.from_str(operands)
-        case SetRGBColorStroke.operator:
-            command = SetRGBColorStroke.from_str(operands)
-        case SetCMYKColorStroke.operator:
-            command = SetCMYKColorStroke.from_str(operands)
-        case CharSpace.operator:
-            command = CharSpace.from_str(operands)
-        case WordSpace.operator:
-            command = WordSpace.from_str(operands)
-        case HorizontalScaling.operator:
-            command = HorizontalScaling.from_str(operands)
-        case TextLeading.operator:
-            command = TextLeading.from_str(operands)
-        case TextRenderingMode.operator:
-            command = TextRenderingMode.from_str(operands)
-        case TextRise.operator:
-            command = TextRise.from_str(operands)
-        case TextFont.operator:
-            command = TextFont.from_str(operands)
-        case _:
-            print("unknown operator", operator)
-            raise NotImplementedError()
-            # raise ValueError("unknown operator {}".format(operator))
-            command = operator, operands.decode()
-
-    return end_scope, command, data
+def build_command(operator: str, operands: list) -> StreamCommand:
+    entry = OPERATORS.get(operator)
+    if entry is None:
+        return UnknownOperator(operator, operands)
+    build, arity = entry
+    if arity is not None and len(operands) != arity:
+        return UnknownOperator(operator, operands)
+    return build(operands)
 
 
 if __name__ == "__main__":
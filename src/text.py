@@ -0,0 +1,140 @@
+"""
+text extraction: one pass over the operators of a page follows the text
+state (Tf, Tc, Tw, Tz, TL, Ts), the text and line matrices and the CTM,
+and places every shown string in device space. the spans read back as
+plain text with to_text.
+"""
+from math import hypot
+from typing import Callable, Iterable, List, NamedTuple, Optional, Tuple
+from .streamparser import IDENTITY, Matrix, apply, multiply
+from .fonts import FontDecoder, PDF_DOC_ENCODING
+
+# a TJ adjustment of at least this many ems reads as a word break
+TJ_SPACE = 0.25
+# the horizontal gap between spans of a line, in span heights, read as a space
+SPAN_SPACE = 0.15
+# the operators the interpreter looks at, everything else is skipped unparsed
+TEXT_OPERATORS = frozenset(
+    ("q", "Q", "cm", "BT", "Tf", "Tc", "Tw", "Tz", "TL", "Ts", "Td", "TD", "T*", "Tm", "Tj", "TJ", "'", '"')
+)
+# shows strings in fonts that cannot be found
+FALLBACK_FONT = FontDecoder.simple(PDF_DOC_ENCODING)
+
+
+class Span(NamedTuple):
+    """a shown string: its device space origin, advance and font height"""
+
+    x: float
+    y: float
+    w: float
+    h: float
+    text: str
+
+
+class TextExtractor:
+    """
+    the text state machine. `font` maps a font resource name to its
+    decoder, None when the resources in scope have no such font.
+    """
+
+    def __init__(self, font: Callable[[str], Optional[FontDecoder]], ctm: Matrix = IDENTITY) -> None:
+        self.font = font
+        self.ctm = ctm
+
+    def run(self, operators: Iterable[Tuple[str, list]]) -> List[Span]:
+        spans: List[Span] = []
+        ctm = self.ctm
+        # the graphics state parts text depends on, saved by q
+        font, size, char_space, word_space, scale, leading, rise = FALLBACK_FONT, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0
+        saved = []
+        tm = tlm = IDENTITY
+
+        def show(strings: list) -> None:
+            # strings holds the strings and TJ adjustments of one show operator
+            nonlocal tm
+            text = []
+            advance = 0.0
+            for item in strings:
+                if isinstance(item, (int, float)):
+                    shift = -item / 1000
+                    if shift >= TJ_SPACE and text and not text[-1].endswith(" "):
+                        text.append(" ")
+                    advance += shift * size * scale
+                    continue
+                widths, codes, spaces = font.measure(item)
+                text.append(font.decode(item))
+                advance += (widths * size + codes * char_space + spaces * word_space) * scale
+            if not text:
+                return
+            m = multiply(tm, ctm)
+            x, y = apply(m, 0.0, rise)
+            x1, y1 = apply(m, advance, rise)
+            spans.append(Span(x, y, hypot(x1 - x, y1 - y), size * hypot(m[2], m[3]), "".join(text)))
+            a, b, c, d, e, f = tm
+            tm = (a, b, c, d, e + advance * a, f + advance * b)
+
+        for op, operands in operators:
+            if op not in TEXT_OPERATORS:
+                continue
+            try:
+                if op == "Tj":
+                    show(operands[-1:])
+                elif op == "TJ":
+                    show(operands[-1])
+                elif op == "Td" or op == "TD" or op == "T*" or op == "'" or op == '"':
+                    if op == "Td" or op == "TD":
+                        tx, ty = map(float, operands[-2:])
+                        if op == "TD":
+                            leading = -ty
+                    else:
+                        tx, ty = 0.0, -leading
+                    a, b, c, d, e, f = tlm
+                    tm = tlm = (a, b, c, d, tx * a + ty * c + e, tx * b + ty * d + f)
+                    if op == '"':
+                        word_space, char_space = map(float, operands[-3:-1])
+                    if op == "'" or op == '"':
+                        show(operands[-1:])
+                elif op == "Tm":
+                    a, b, c, d, e, f = map(float, operands[-6:])
+                    tm = tlm = (a, b, c, d, e, f)
+                elif op == "Tf":
+                    name, size = operands[-2], float(operands[-1])
+                    font = self.font(name) or FALLBACK_FONT
+                elif op == "BT":
+                    tm = tlm = IDENTITY
+                elif op == "Tc":
+                    char_space = float(operands[-1])
+                elif op == "Tw":
+                    word_space = float(operands[-1])
+                elif op == "Tz":
+                    scale = float(operands[-1]) / 100
+                elif op == "TL":
+                    leading = float(operands[-1])
+                elif op == "Ts":
+                    rise = float(operands[-1])
+                elif op == "cm":
+                    ctm = multiply(tuple(map(float, operands[-6:])), ctm)
+                elif op == "q":
+                    saved.append((ctm, font, size, char_space, word_space, scale, leading, rise))
+                elif saved:
+                    ctm, font, size, char_space, word_space, scale, leading, rise = saved.pop()
+            except (TypeError, ValueError, IndexError, KeyError):
+                # operands a lax reader has to live with
+                continue
+        return spans
+
+
+def to_text(spans: Iterable[Span]) -> str:
+    """spans in content stream order as text, a line break wherever the baseline moves"""
+    out = []
+    last = None
+    for span in spans:
+        if last is not None:
+            height = max(span.h, last.h)
+            if abs(span.y - last.y) > height / 2:
+                out.append("\n")
+            elif span.x - (last.x + last.w) > SPAN_SPACE * height and not last.text.endswith(" "):
+                out.append(" ")
+        out.append(span.text)
+        last = span
+    return "".join(out)
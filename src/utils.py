@@ -1,4 +1,78 @@
 import os
+import mmap
+
+TAIL_BLOCK_SIZE = 0x2000
+
+# the character classes of PDF 32000 7.2.2, BYTE_CLASS[c] is the class of byte c
+REGULAR, WHITESPACE, DELIMITER = 0, 1, 2
+WHITESPACE_CHARS = b" \t\r\n\f\x00"
+DELIMITER_CHARS = b"()<>[]{}/%"
+BYTE_CLASS = bytes(
+    WHITESPACE if c in WHITESPACE_CHARS else DELIMITER if c in DELIMITER_CHARS else REGULAR for c in range(256)
+)
+HEX_DIGITS = b"0123456789ABCDEFabcdef"
+
+
+def byte_set(chars: bytes, negated: bool = False) -> bytes:
+    """the regular expression set of the bytes `chars`, or of every other byte"""
+    # only what is special inside a set is escaped, re.escape() escapes
+    # white space too and the set then matches slower
+    inner = b"".join(b"\\" + bytes([c]) if c in b"\\[]^-" else bytes([c]) for c in chars)
+    return (b"[^" if negated else b"[") + inner + b"]"
+
+
+# the classes as regular expression sets, the lexers' patterns are built on them
+WHITESPACE_SET = byte_set(WHITESPACE_CHARS)
+REGULAR_SET = byte_set(WHITESPACE_CHARS + DELIMITER_CHARS, negated=True)
+
+
+def rfind_in_file(read_obj, marker: bytes, end: int = None, block_size: int = TAIL_BLOCK_SIZE) -> int:
+    """
+    returns the offset of the last `marker` that ends before `end` (EOF by default), or -1.
+    the file is scanned backwards in `block_size` chunks, overlapping by len(marker) - 1
+    so a marker split across two blocks is still found.
+    """
+    if isinstance(read_obj, mmap.mmap):
+        return read_obj.rfind(marker, 0, len(read_obj) if end is None else end)
+    if end is None:
+        end = read_obj.seek(0, os.SEEK_END)
+    overlap = len(marker) - 1
+    while end > overlap:
+        start = max(0, end - block_size)
+        read_obj.seek(start, os.SEEK_SET)
+        idx = read_obj.read(end - start).rfind(marker)
+        if idx != -1:
+            return start + idx
+        if start == 0:
+            break
+        end = start + overlap
+    return -1
+
+
+def find_in_file(read_obj, marker: bytes, start: int = 0, block_size: int = TAIL_BLOCK_SIZE) -> int:
+    """returns the offset of the first `marker` at or after `start`, or -1. the forward twin of rfind_in_file"""
+    if isinstance(read_obj, mmap.mmap):
+        return read_obj.find(marker, start)
+    overlap = len(marker) - 1
+    while True:
+        read_obj.seek(start, os.SEEK_SET)
+        block = read_obj.read(block_size)
+        idx = block.find(marker)
+        if idx != -1:
+            return start + idx
+        if len(block) < block_size:
+            return -1
+        start += block_size - overlap
+
+
+def read_at(read_obj, offset: int, size: int) -> bytes:
+    """`size` bytes at `offset`, fewer at the end of the file"""
+    if isinstance(read_obj, mmap.mmap):
+        return read_obj[offset : offset + size]
+    read_obj.seek(offset, os.SEEK_SET)
+    return read_obj.read(size)
+
+
 def read_reverse_order(read_obj):
     read_obj.seek(0, os.SEEK_END)
     pointer_location = read_obj.tell()
@@ -18,19 +92,83 @@ def read_reverse_order(read_obj):
         yield buffer[::-1]
 
 
-def is_int(token: bytes) -> bool:
-    return token.lstrip(b"-").isdigit()
+def png_unpredict_row(filter_type: int, row: bytearray, prev: bytes, bpp: int) -> None:
+    """undoes the PNG filter of one row in place, `prev` is the decoded row above"""
+    row_len = len(row)
+    if filter_type == 0:
+        return
+    if filter_type == 1:
+        for j in range(bpp, row_len):
+            row[j] = (row[j] + row[j - bpp]) & 0xFF
+    elif filter_type == 2:
+        for j in range(row_len):
+            row[j] = (row[j] + prev[j]) & 0xFF
+    elif filter_type == 3:
+        for j in range(row_len):
+            left = row[j - bpp] if j >= bpp else 0
+            row[j] = (row[j] + ((left + prev[j]) >> 1)) & 0xFF
+    elif filter_type == 4:
+        for j in range(row_len):
+            a = row[j - bpp] if j >= bpp else 0
+            b = prev[j]
+            c = prev[j - bpp] if j >= bpp else 0
+            p = a + b - c
+            pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+            if pa <= pb and pa <= pc:
+                row[j] = (row[j] + a) & 0xFF
+            elif pb <= pc:
+                row[j] = (row[j] + b) & 0xFF
+            else:
+                row[j] = (row[j] + c) & 0xFF
+    else:
+        raise ValueError(f"unknown PNG filter type {filter_type}")
 
 
-def is_float(token: bytes) -> bool:
-    if token.count(b".") == 1:
-        return token.lstrip(b"-").replace(b".", b"").isdigit()
-    return False
+def png_unpredict(data: bytes, columns: int, colors: int = 1, bits_per_component: int = 8) -> bytes:
+    """undoes the PNG row filters (predictors 10-15), every row starts with its filter type"""
+    bpp = max(1, colors * bits_per_component // 8)
+    row_len = (columns * colors * bits_per_component + 7) // 8
+    prev = bytearray(row_len)
+    out = bytearray()
+    for i in range(0, len(data) - row_len, row_len + 1):
+        row = bytearray(data[i + 1 : i + 1 + row_len])
+        png_unpredict_row(data[i], row, prev, bpp)
+        out += row
+        prev = row
+    return bytes(out)
 
 
-def getTokenIDX(data: bytes) -> int:
-    for idx, i in enumerate(data):
-        if bytes([i]) in [b" ", b"\n", b"\r"]:
-            return idx
-    return -1
-
+def tiff_unpredict(data: bytes, columns: int, colors: int = 1, bits_per_component: int = 8) -> bytes:
+    """undoes TIFF predictor 2 a sample at a time, every sample is a difference to the one of the same colour on its left"""
+    bpc = bits_per_component
+    samples = columns * colors
+    row_len = (samples * bpc + 7) // 8
+    out = bytearray(data[: len(data) // row_len * row_len])
+    if bpc == 8:
+        for start in range(0, len(out), row_len):
+            for j in range(start + colors, start + row_len):
+                out[j] = (out[j] + out[j - colors]) & 0xFF
+    elif bpc == 16:
+        step = 2 * colors
+        for start in range(0, len(out), row_len):
+            for j in range(start + step, start + row_len, 2):
+                value = int.from_bytes(out[j : j + 2], "big") + int.from_bytes(out[j - step : j - step + 2], "big")
+                out[j : j + 2] = (value & 0xFFFF).to_bytes(2, "big")
+    elif bpc in (1, 2, 4):
+        # the row as one integer, samples from the most significant bits, padding kept
+        mask = (1 << bpc) - 1
+        width = row_len * 8
+        padding = width - samples * bpc
+        for start in range(0, len(out), row_len):
+            bits = int.from_bytes(out[start : start + row_len], "big")
+            values = [(bits >> (width - (k + 1) * bpc)) & mask for k in range(samples)]
+            for k in range(colors, samples):
+                values[k] = (values[k] + values[k - colors]) & mask
+            packed = 0
+            for value in values:
+                packed = packed << bpc | value
+            packed = packed << padding | bits & ((1 << padding) - 1)
+            out[start : start + row_len] = packed.to_bytes(row_len, "big")
+    else:
+        raise ValueError(f"TIFF predictor with {bpc} bits per component")
+    return bytes(out)
@@ -0,0 +1,284 @@
+"""
+external objects painted by Do. a form XObject is decoded and tokenized
+once per document, FormExpander then plays its operators in place of every
+Do that paints it. a PDFImage gives an image's attributes without reading
+its data, its encoded data as it can be saved, or its samples as an array.
+"""
+import io
+from typing import Any, Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from .PDFPrimitives import PDFDict, PDFHighObject, PDFIndirectReference, PDFList, PDFName, PDFResources, PDFStream
+from .filters import unpredict
+from .streamparser import IDENTITY, INLINE_COMPONENTS, InlineImage, Matrix, iter_operators_chunks
+
+# forms painting forms deeper than this are left as Do, it also stops cycles
+MAX_FORM_DEPTH = 16
+# filters that hold a whole image in a format of its own, with its extension
+IMAGE_CODECS = {
+    "DCTDecode": ".jpg",
+    "DCT": ".jpg",
+    "JPXDecode": ".jp2",
+    "JBIG2Decode": ".jb2",
+    "CCITTFaxDecode": ".g3",
+    "CCF": ".g3",
+}
+# the codecs Pillow decodes
+PILLOW_CODECS = ("DCTDecode", "DCT", "JPXDecode")
+# the long names of inline image keys and colour spaces
+INLINE_KEYS = {
+    "W": "Width",
+    "H": "Height",
+    "BPC": "BitsPerComponent",
+    "CS": "ColorSpace",
+    "F": "Filter",
+    "DP": "DecodeParms",
+    "IM": "ImageMask",
+    "D": "Decode",
+    "I": "Interpolate",
+    "L": "Length",
+}
+INLINE_SPACES = {"G": "DeviceGray", "RGB": "DeviceRGB", "CMYK": "DeviceCMYK", "I": "Indexed"}
+
+
+class PDFForm(PDFHighObject):
+    """a form XObject: its operators, /Matrix, /BBox and /Resources (None to use the painter's)"""
+
+    def __init__(self, on: int, stream: PDFStream, resources: Optional[PDFResources]) -> None:
+        self._on = on
+        self._gn = 0
+        matrix = stream.streamDict.get("Matrix")
+        try:
+            self.Matrix: Matrix = tuple(map(float, matrix)) if matrix is not None else IDENTITY
+        except (TypeError, ValueError):
+            self.Matrix = IDENTITY
+        if len(self.Matrix) != 6:
+            self.Matrix = IDENTITY
+        bbox = stream.streamDict.get("BBox")
+        if not isinstance(bbox, list) or len(bbox) != 4 or not all(isinstance(i, (int, float)) for i in bbox):
+            bbox = None
+        self.BBox: Optional[PDFList] = bbox
+        self.Resources = resources
+        # decoded without touching the stream, it may be shared
+        self.operators: List[Tuple[str, list]] = list(iter_operators_chunks(stream.iter_decoded()))
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self._on}, operators={len(self.operators)}, Matrix={self.Matrix})"
+
+
+class FormExpander:
+    """
+    the operators of a content stream, each Do of a form XObject replaced
+    by q, a cm of the form's /Matrix, a clip to its /BBox, the form's own
+    operators and Q. images and forms past max_depth stay as Do.
+    `resources` is the resource dictionary in scope for the operator last
+    yielded, fonts and the like are looked up there.
+    """
+
+    def __init__(self, file, operators: Iterable[Tuple[str, list]], resources: PDFResources, max_depth: int = MAX_FORM_DEPTH) -> None:
+        self.file = file
+        self.operators = operators
+        self.resources = resources
+        self.max_depth = max_depth
+
+    def __iter__(self) -> Iterator[Tuple[str, list]]:
+        frames = [(iter(self.operators), self.resources, None)]
+        # the forms being played, a form painting itself is not expanded
+        active = set()
+        while frames:
+            operators, resources, on = frames[-1]
+            self.resources = resources
+            for op, operands in operators:
+                if op != "Do" or not operands or len(frames) > self.max_depth:
+                    yield op, operands
+                    continue
+                ref = resources.entry("XObject", operands[-1])
+                form = self.file.form(ref) if isinstance(ref, PDFIndirectReference) else None
+                if form is None or ref.on in active:
+                    yield op, operands
+                    continue
+                yield "q", []
+                if form.Matrix != IDENTITY:
+                    yield "cm", list(form.Matrix)
+                if form.BBox is not None:
+                    x0, y0, x1, y1 = form.BBox
+                    yield "re", [x0, y0, x1 - x0, y1 - y0]
+                    yield "W", []
+                    yield "n", []
+                active.add(ref.on)
+                frames.append((iter(form.operators), form.Resources or resources, ref.on))
+                break
+            else:
+                frames.pop()
+                if on is not None:
+                    active.discard(on)
+                    self.resources = frames[-1][1]
+                    yield "Q", []
+
+
+class ImageInfo(NamedTuple):
+    width: int
+    height: int
+    bits_per_component: int
+    color_space: Any
+    filters: List[str]
+
+
+class PDFImage(PDFHighObject):
+    """
+    an image XObject or inline image. the attributes come from the stream
+    dictionary alone, a payload that is read lazily stays unread until
+    passthrough() or to_array() asks for it. `resolve` turns indirect
+    colour spaces and lookup tables into their content.
+    """
+
+    def __init__(self, stream: PDFStream, resolve: Callable[[Any], Any] = None, on: int = None) -> None:
+        self._on = on
+        self._gn = 0
+        self.__stream = stream
+        self.__resolve = resolve or (lambda value: value)
+        attrs = stream.streamDict
+        self.ImageMask: bool = attrs.get("ImageMask") is True
+        self.Width: int = self.__resolve(attrs.get("Width", 0))
+        self.Height: int = self.__resolve(attrs.get("Height", 0))
+        self.BitsPerComponent: int = 1 if self.ImageMask else self.__resolve(attrs.get("BitsPerComponent", 8))
+        self.ColorSpace: Any = self.__resolve(attrs.get("ColorSpace"))
+        self.Filter: List[str] = [str(f.value) for f in stream.filters if isinstance(f, PDFName)]
+        self.Decode: Optional[PDFList] = attrs.get("Decode")
+        self.SMask: Optional[PDFIndirectReference] = attrs.get("SMask")
+
+    @staticmethod
+    def from_inline(image: "InlineImage", resources: PDFResources = None) -> "PDFImage":
+        """an inline image, its abbreviations expanded and a named colour space looked up in `resources`"""
+        attrs = PDFDict()
+        for key, value in image.attrs.items():
+            attrs[INLINE_KEYS.get(key.value, key.value)] = value
+        space = attrs.get("ColorSpace")
+        if isinstance(space, PDFName):
+            if space.value in INLINE_SPACES:
+                attrs["ColorSpace"] = PDFName(INLINE_SPACES[space.value])
+            elif resources is not None and space.value not in INLINE_COMPONENTS:
+                attrs["ColorSpace"] = resources.color_space(space) or space
+        elif isinstance(space, list) and space and isinstance(space[0], PDFName):
+            attrs["ColorSpace"] = PDFList([PDFName(INLINE_SPACES.get(space[0].value, space[0].value))] + space[1:])
+        resolve = resources.resolve if resources is not None else None
+        return PDFImage(PDFStream(attrs, bytes(image.data), length=len(image.data)), resolve)
+
+    @property
+    def info(self) -> ImageInfo:
+        return ImageInfo(self.Width, self.Height, self.BitsPerComponent, self.ColorSpace, self.Filter)
+
+    @property
+    def codec(self) -> Optional[str]:
+        """the last filter when it holds the image in a format of its own, such as a JPEG"""
+        if self.Filter and self.Filter[-1] in IMAGE_CODECS:
+            return self.Filter[-1]
+        return None
+
+    @property
+    def extension(self) -> str:
+        """the file extension of passthrough()'s data, .bin for bare samples"""
+        return IMAGE_CODECS.get(self.codec, ".bin")
+
+    @property
+    def components(self) -> Optional[int]:
+        """colour components per sample, None for a colour space that cannot tell"""
+        if self.ImageMask:
+            return 1
+        return color_components(self.ColorSpace, self.__resolve)
+
+    def passthrough(self) -> bytes:
+        """
+        the image data with every filter before the codec undone: a JPEG,
+        JPEG 2000 or JBIG2 file as it can be written to disk, or the bare
+        samples of an image without a codec. nothing is decoded by Pillow.
+        """
+        stream = self.__stream
+        data = stream.buffer
+        if stream.decoded:
+            return bytes(data)
+        # decoded whole and out of place, the stream stays as it was read
+        for name, parms in zip(stream.filters, stream.decode_parms()):
+            if name in IMAGE_CODECS:
+                break
+            data = stream.filters_encoders[name.value].decode(data, parms)
+            if parms is not None:
+                data = unpredict(data, parms)
+        return bytes(data)
+
+    def to_array(self):
+        """
+        the samples as a NumPy array of height x width (x components),
+        uint8 for 1 to 8 bits, uint16 for 16. indexed images are looked up in
+        their palette. codec images go through Pillow, imported here only.
+        """
+        import numpy as np
+
+        data = self.passthrough()
+        codec = self.codec
+        if codec in PILLOW_CODECS:
+            from PIL import Image
+
+            with Image.open(io.BytesIO(data)) as image:
+                return np.asarray(image)
+        if codec is not None:
+            raise ValueError(f"{codec} images are not decoded")
+        width, height, bpc = self.Width, self.Height, self.BitsPerComponent
+        components = self.components
+        if components is None or bpc not in (1, 2, 4, 8, 16):
+            raise ValueError(f"cannot decode {self.ColorSpace} images of {bpc} bits")
+        row_len = (width * components * bpc + 7) // 8
+        if len(data) < row_len * height:
+            raise ValueError("image data is short")
+        if bpc == 16:
+            samples = np.frombuffer(data, dtype=">u2", count=width * components * height).astype(np.uint16)
+        elif bpc == 8:
+            samples = np.frombuffer(data, dtype=np.uint8, count=width * components * height)
+        else:
+            # rows are padded to whole bytes, samples are bpc bit fields
+            rows = np.frombuffer(data, dtype=np.uint8, count=row_len * height).reshape(height, row_len)
+            bits = np.unpackbits(rows, axis=1)[:, : width * components * bpc].reshape(-1, bpc)
+            samples = bits @ (1 << np.arange(bpc - 1, -1, -1)).astype(np.uint8)
+        samples = samples.reshape(height, width, components)
+        palette = self.palette()
+        if palette is not None:
+            samples = palette[np.minimum(samples[:, :, 0], len(palette) - 1)]
+        return samples[:, :, 0] if samples.shape[2] == 1 else samples
+
+    def palette(self):
+        """the lookup table of an Indexed image as a (hival + 1) x components array, None otherwise"""
+        space = self.ColorSpace
+        if not isinstance(space, list) or len(space) != 4 or space[0] not in ("Indexed", "I"):
+            return None
+        import numpy as np
+
+        base = color_components(self.__resolve(space[1]), self.__resolve)
+        lookup = self.__resolve(space[3])
+        if isinstance(lookup, PDFStream):
+            lookup = b"".join(lookup.iter_decoded())
+        if base is None or not isinstance(lookup, (bytes, bytearray)):
+            return None
+        entries = len(lookup) // base
+        return np.frombuffer(bytes(lookup), dtype=np.uint8, count=entries * base).reshape(entries, base)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.Width}x{self.Height}, bpc={self.BitsPerComponent}, {self.ColorSpace}, {self.Filter})"
+
+
+def color_components(space: Any, resolve: Callable[[Any], Any]) -> Optional[int]:
+    """the number of components of a colour space, None when it cannot be told"""
+    if isinstance(space, PDFName):
+        return INLINE_COMPONENTS.get(space)
+    if not isinstance(space, list) or not space:
+        return None
+    family = space[0]
+    if family in ("Indexed", "I", "Separation"):
+        return 1
+    if family in ("CalGray", "CalRGB", "Lab"):
+        return INLINE_COMPONENTS.get(family)
+    if family == "ICCBased" and len(space) > 1:
+        profile = resolve(space[1])
+        n = profile.streamDict.get("N") if isinstance(profile, PDFStream) else None
+        return n if isinstance(n, int) else None
+    if family == "DeviceN" and len(space) > 1:
+        names = resolve(space[1])
+        return len(names) if isinstance(names, list) else None
+    return None
@@ -0,0 +1,57 @@
+import signal
+import time
+from benchmarks.corpus import build_document, write_temp
+from src.batch import parse_many, run_task
+from src.PDFPrimitives import PDFObject
+
+
+class SlowContent(dict):
+    def __getitem__(self, key):
+        time.sleep(10)
+
+
+def resolve_slowly(file, pages):
+    return PDFObject(1, 0, SlowContent()).Type
+
+
+def swallow_errors(file, pages):
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            time.sleep(0.01)
+        except Exception:
+            pass
+
+
+def hang_on_two_pages(file, pages):
+    # out of the alarm's reach, like a call stuck in C code
+    if len(file) == 2:
+        signal.signal(signal.SIGALRM, signal.SIG_IGN)
+        time.sleep(60)
+    return len(file)
+
+
+def test_timeout_inside_attribute_resolution():
+    path = write_temp(build_document([b"q Q\n"]))
+    start = time.monotonic()
+    result = run_task(resolve_slowly, path, None, 0.2, False)
+    assert result.error == "timed out after 0.2s"
+    assert time.monotonic() - start < 5
+
+
+def test_timeout_not_swallowed_by_except_exception():
+    path = write_temp(build_document([b"q Q\n"]))
+    start = time.monotonic()
+    result = run_task(swallow_errors, path, None, 0.2, False)
+    assert result.error == "timed out after 0.2s"
+    assert time.monotonic() - start < 5
+
+
+def test_task_out_of_the_alarms_reach_is_timed_out_by_the_parent():
+    stuck = write_temp(build_document([b"q Q\n"] * 2))
+    paths = [write_temp(build_document([b"q Q\n"])), stuck, write_temp(build_document([b"q Q\n"] * 3))]
+    start = time.monotonic()
+    results = {r.path: r for r in parse_many(paths, hang_on_two_pages, workers=1, timeout=0.5)}
+    assert time.monotonic() - start < 20
+    assert results[stuck].error == "timed out after 0.5s"
+    assert [results[p].value for p in paths if p != stuck] == [1, 3]
@@ -0,0 +1,93 @@
+import random
+import pytest
+from src import filters, utils
+
+LAYOUTS = [(8, 3, 17), (16, 2, 9), (1, 1, 13), (2, 3, 7), (4, 1, 9), (8, 1, 5)]
+
+
+@pytest.mark.parametrize("bpc, colors, columns", LAYOUTS)
+def test_predictors_match_the_pure_python_fallback(bpc, colors, columns):
+    rnd = random.Random(bpc * colors * columns)
+    row_len = (columns * colors * bpc + 7) // 8
+    data = bytes(rnd.randrange(256) for _ in range(row_len * 6))
+    assert filters.tiff_unpredict(data, columns, colors, bpc) == utils.tiff_unpredict(data, columns, colors, bpc)
+    rows = b"".join(bytes([rnd.randrange(5)]) + bytes(rnd.randrange(256) for _ in range(row_len)) for _ in range(20))
+    assert filters.png_unpredict(rows, columns, colors, bpc) == utils.png_unpredict(rows, columns, colors, bpc)
+
+
+def one_byte_chunks(data: bytes):
+    return [data[i : i + 1] for i in range(len(data))]
+
+
+def decoded(decode, iter_decode, data: bytes, parms=None) -> bytes:
+    """decodes whole and a byte at a time, the two must agree"""
+    out = decode(data, parms)
+    assert b"".join(iter_decode(one_byte_chunks(data), parms)) == out
+    return out
+
+
+# PDF 32000-1 7.4.4.2, example: codes 256 45 258 258 65 259 66 257
+LZW_EXAMPLE = bytes.fromhex("800B6050220C0C8501")
+
+
+def test_lzw_known_answer():
+    assert decoded(filters.lzw_decode, filters.iter_lzw_decode, LZW_EXAMPLE) == b"-----A---B"
+    assert filters.lzw_encode(b"-----A---B") == LZW_EXAMPLE
+
+
+def distinct_pairs(count: int) -> bytes:
+    """bytes no two adjacent ones of which repeat, LZW codes every one as a literal"""
+    out, used = [0], set()
+    while len(out) < count:
+        nxt = next(b for b in range(255, -1, -1) if (out[-1], b) not in used)
+        used.add((out[-1], nxt))
+        out.append(nxt)
+    return bytes(out)
+
+
+def pack_lzw(codes, early: int) -> bytes:
+    """codes that are literals but the first and last, their width from the table size the decoder reaches"""
+    acc, bits, entries = 0, 0, 258
+    for idx, code in enumerate(codes):
+        width = 12
+        for w, top in ((9, 512), (10, 1024), (11, 2048)):
+            if entries < top - early:
+                width = w
+                break
+        acc, bits = (acc << width) | code, bits + width
+        # every literal after the first adds an entry
+        if idx >= 2 and code < 256:
+            entries += 1
+    acc <<= -bits % 8
+    return acc.to_bytes((bits + 7) // 8, "big")
+
+
+@pytest.mark.parametrize("early", [0, 1])
+def test_lzw_code_width_changes(early):
+    # past 511, 1023 and 2047 entries the codes widen to 10, 11 and 12 bits
+    data = distinct_pairs(2100)
+    packed = pack_lzw([256, *data, 257], early)
+    assert decoded(filters.lzw_decode, filters.iter_lzw_decode, packed, {"EarlyChange": early}) == data
+    if early:
+        assert filters.lzw_encode(data) == packed
+
+
+def test_ascii85_known_answer():
+    data = b"<~9jqo^z s8W-!\n!!!!\"F*2M7/c~>"
+    expected = b"Man " + bytes(4) + b"\xff" * 4 + b"\x00\x00\x00\x01" + b"sure."
+    assert decoded(filters.ascii85_decode, filters.iter_ascii85_decode, data) == expected
+    assert filters.ascii85_encode(b"Man sure.") == b"9jqo^F*2M7/c~>"
+
+
+def test_ascii_hex_known_answer():
+    # an odd last digit is followed by an implied 0
+    data = b"9 01F\nA>ignored"
+    assert decoded(filters.ascii_hex_decode, filters.iter_ascii_hex_decode, data) == b"\x90\x1f\xa0"
+    assert filters.ascii_hex_encode(b"\x90\x1f\xa0") == b"901fa0>"
+
+
+def test_run_length_known_answer():
+    # 3 literal bytes, "z" 4 times, then end of data
+    data = b"\x02abc\xfdz\x80ignored"
+    assert decoded(filters.run_length_decode, filters.iter_run_length_decode, data) == b"abczzzz"
+    assert filters.run_length_encode(b"abczzzz") == b"\x02abc\xfdz\x80"
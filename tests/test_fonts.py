@@ -0,0 +1,84 @@
+from src.fonts import CMap, FontDecoder, glyph_to_unicode
+from src.PDFPrimitives import PDFDict, PDFIndirectReference, PDFObject
+
+TO_UNICODE = b"""
+/CIDInit /ProcSet findresource begin
+begincmap
+1 begincodespacerange <0000> <FFFF> endcodespacerange
+3 beginbfchar
+<0003> <0020>
+<0011> <0066 0069>
+<D800> <0041>
+endbfchar
+2 beginbfrange
+<0024> <0026> <0041>
+<0030> <0032> [<03B1> <03B2> <D835DC00>]
+endbfrange
+endcmap
+"""
+
+
+def font_decoder(font: bytes, *objects: bytes) -> FontDecoder:
+    """the decoder of a font dictionary, indirect references n 0 R point at objects[n - 1]"""
+    parsed = [PDFObject.lax(obj) for obj in objects]
+
+    def resolve(value):
+        return parsed[value.on - 1] if isinstance(value, PDFIndirectReference) else value
+
+    return FontDecoder.from_font(PDFObject.lax(font), resolve)
+
+
+def to_unicode_stream() -> bytes:
+    return b"<< /Length %d >>\nstream\n%s\nendstream" % (len(TO_UNICODE), TO_UNICODE)
+
+
+def test_to_unicode_bfchar_and_bfrange():
+    cmap = CMap.parse(TO_UNICODE)
+    assert cmap.lengths == [2]
+    # a single code, a ligature, a range counting up and a range given as an array
+    assert [cmap.unicode[c] for c in (0x03, 0x11, 0x24, 0x26, 0x30, 0x31, 0x32)] == [
+        " ", "fi", "A", "C", "α", "β", "\U0001d400",
+    ]
+
+
+def test_identity_h_with_to_unicode():
+    decoder = font_decoder(
+        b"<< /Type /Font /Subtype /Type0 /Encoding /Identity-H /ToUnicode 1 0 R >>", to_unicode_stream()
+    )
+    assert decoder.decode(b"\x00\x24\x00\x03\x00\x11\x00\x30\x00\x32\x00\x99") == "A fiα\U0001d400�"
+
+
+def test_two_byte_codes_in_the_surrogate_range():
+    decoder = font_decoder(
+        b"<< /Type /Font /Subtype /Type0 /Encoding /Identity-H /ToUnicode 1 0 R >>", to_unicode_stream()
+    )
+    # D800 DC00 would be one character read as UTF-16, they are two codes
+    assert decoder.decode(b"\xd8\x00\xdc\x00\x00\x25") == "A�B"
+
+
+def test_simple_font_with_to_unicode_over_its_encoding():
+    cmap = b"1 begincodespacerange <00> <FF> endcodespacerange 1 beginbfchar <41> <263A> endbfchar"
+    decoder = font_decoder(
+        b"<< /Type /Font /Subtype /TrueType /Encoding /WinAnsiEncoding /ToUnicode 1 0 R >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(cmap), cmap),
+    )
+    assert decoder.decode(b"AB\x80") == "☺B€"
+
+
+def test_differences_with_symbol_names():
+    decoder = font_decoder(
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Symbol"
+        b" /Encoding << /BaseEncoding /WinAnsiEncoding /Differences [97 /alpha /beta 200 /universal /uni20AC] >> >>"
+    )
+    assert decoder.decode(b"abc\xc8\xc9") == "αβc∀€"
+
+
+def test_glyph_names():
+    assert [glyph_to_unicode(n) for n in ("Psi", "omega", "sigma1", "uni00410042", "u1D400", "f_i", "a.sc", "nosuch")] == [
+        "Ψ", "ω", "ς", "AB", "\U0001d400", "fi", "a", "�",
+    ]
+
+
+def test_ucs2_encoding_is_text_already():
+    decoder = FontDecoder.from_font(PDFDict(Subtype="Type0", Encoding=PDFObject.lax(b"/UniGB-UTF16-H")), lambda v: v)
+    assert decoder.decode("a\U0001d400".encode("utf-16-be")) == "a\U0001d400"
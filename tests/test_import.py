@@ -0,0 +1,37 @@
+import ast
+import subprocess
+import sys
+from benchmarks.corpus import ROOT
+
+# the parser's own modules may take this many times what the standard
+# modules they import take in the same interpreter, about 3 at the time
+MAX_RATIO = 6
+# imported only by the code that needs them
+HEAVY = ("numpy", "PIL")
+PROBE = """
+import sys, time
+t = time.perf_counter()
+import re, zlib, mmap, typing, array, bisect, io, os, base64, collections, itertools, math
+baseline = time.perf_counter() - t
+t = time.perf_counter()
+import src.pdfparser
+parser = time.perf_counter() - t
+print([baseline, parser, [m for m in %r if m in sys.modules]])
+""" % (HEAVY,)
+
+
+def probe():
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, capture_output=True, text=True, check=True)
+    return ast.literal_eval(out.stdout)
+
+
+def test_import_loads_no_heavy_module():
+    _, _, heavy = probe()
+    assert heavy == []
+
+
+def test_import_time_relative_to_the_standard_modules():
+    # the first run also writes the bytecode caches
+    probe()
+    ratio = min(parser / baseline for baseline, parser, _ in (probe() for _ in range(3)))
+    assert ratio < MAX_RATIO
@@ -0,0 +1,100 @@
+from benchmarks.corpus import build_document, build_pdf, png_up, stream_object, write_temp
+from src.PDFPrimitives import PDFIndirectReference
+from src.pdfparser import PDFFile
+
+
+def first_operand(page):
+    return next(iter(page.operators()))[1][0]
+
+
+def test_page_tree_reads_kids_up_to_the_page_once():
+    file = PDFFile(write_temp(build_document([b"q Q\n"] * 2000)))
+    misses = file.cache.misses
+    file[1234]
+    # the kids before it and the page, none after
+    assert file.cache.misses - misses == 1235
+    misses = file.cache.misses
+    file[1000]
+    assert file.cache.misses - misses <= 1
+
+
+def test_balanced_page_tree():
+    file = PDFFile(write_temp(build_document([b"%d 0 m\n" % i for i in range(100)], fanout=3)))
+    assert [first_operand(file[i]) for i in (0, 1, 50, 99, -1)] == [0, 1, 50, 99, 99]
+
+
+def test_count_matching_kids_by_chance():
+    # four kids and four pages, but one kid holds two pages and one none
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R 4 0 R 7 0 R 8 0 R] /Count 4 /MediaBox [0 0 1 1] >>",
+        b"<< /Type /Page /Parent 2 0 R /Contents 9 0 R >>",
+        b"<< /Type /Pages /Parent 2 0 R /Kids [5 0 R 6 0 R] /Count 2 >>",
+        b"<< /Type /Page /Parent 4 0 R /Contents 10 0 R >>",
+        b"<< /Type /Page /Parent 4 0 R /Contents 11 0 R >>",
+        b"<< /Type /Pages /Parent 2 0 R /Kids [] /Count 0 >>",
+        b"<< /Type /Page /Parent 2 0 R /Contents 12 0 R >>",
+    ] + [b"<< /Length 5 >>\nstream\n%d 0 m\nendstream" % i for i in range(4)]
+    file = PDFFile(write_temp(build_pdf(objects)))
+    assert [first_operand(file[i]) for i in range(4)] == [0, 1, 2, 3]
+
+
+def test_count_matching_kids_with_uneven_kids():
+    # three kids and three pages: the first kid holds two pages, the last none
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R 6 0 R 7 0 R] /Count 3 /MediaBox [0 0 1 1] >>",
+        b"<< /Type /Pages /Parent 2 0 R /Kids [4 0 R 5 0 R] /Count 2 >>",
+        b"<< /Type /Page /Parent 3 0 R /Contents 8 0 R >>",
+        b"<< /Type /Page /Parent 3 0 R /Contents 9 0 R >>",
+        b"<< /Type /Page /Parent 2 0 R /Contents 10 0 R >>",
+        b"<< /Type /Pages /Parent 2 0 R /Kids [] /Count 0 >>",
+    ] + [b"<< /Length 5 >>\nstream\n%d 0 m\nendstream" % i for i in range(3)]
+    path = write_temp(build_pdf(objects))
+    assert first_operand(PDFFile(path)[1]) == 1
+    # whatever the order the pages are asked in
+    file = PDFFile(path)
+    assert [first_operand(file[i]) for i in (2, 0, 1)] == [2, 0, 1]
+
+
+def test_parsed_fonts_are_bounded():
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", b"<< /Type /Pages /Kids [] /Count 0 >>"]
+    objects += [b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"] * 20
+    file = PDFFile(write_temp(build_pdf(objects)))
+    file.parsed.max_entries = 4
+    decoders = [file.font(PDFIndirectReference(on, 0)) for on in range(3, 23)]
+    assert len(file.parsed) == 4
+    assert file.font(PDFIndirectReference(22, 0)) is decoders[-1]
+    assert file.font(PDFIndirectReference(3, 0)) is not decoders[0]
+
+
+def test_only_forms_are_kept_parsed():
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [] /Count 0 >>",
+        b"<< /Type /XObject /Subtype /Image /Width 1 /Height 1 /BitsPerComponent 8 /Length 1 >>\nstream\n\xff\nendstream",
+        b"<< /Type /XObject /Subtype /Form /BBox [0 0 1 1] /Length 5 >>\nstream\n0 0 m\nendstream",
+    ]
+    file = PDFFile(write_temp(build_pdf(objects)))
+    assert file.form(PDFIndirectReference(3, 0)) is None
+    form = file.form(PDFIndirectReference(4, 0))
+    assert form is not None and file.form(PDFIndirectReference(4, 0)) is form
+    assert list(file.parsed.entries) == [(4, "Form")]
+
+
+def test_page_contents_follow_nested_arrays():
+    pdf = build_pdf(
+        [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+            b"<< /Type /Page /Parent 2 0 R /Contents [4 0 R 5 0 R 7] >>",
+            stream_object(b"1 0 m"),
+            b"[6 0 R]",
+            # a predictor is undone like in any other stream
+            stream_object(png_up([b"2 0", b" m "]), extra=b"/DecodeParms << /Predictor 12 /Columns 3 >> "),
+        ]
+    )
+    file = PDFFile(write_temp(pdf))
+    assert file.page_contents(0) == b"1 0 m\n2 0 m "
+    assert file.page_contents(0) == b"".join(file.iter_page_contents(0, 2))
+    assert [op for op, _ in file[0].operators()] == ["m", "m"]
@@ -0,0 +1,92 @@
+import io
+import random
+import zlib
+import pytest
+from src.PDFPrimitives import PDFIndirectReference, PDFNull, PDFObject, PDFStr
+
+
+def test_stream_with_wrong_length_keeps_the_measured_length():
+    stream = PDFObject.lax(b"<< /Length 99 >>\nstream\nq Q\nendstream")
+    assert len(stream) == 3
+    assert bytes(stream.buffer) == b"q Q"
+
+
+class CountingFile(io.BytesIO):
+    def __init__(self, data: bytes) -> None:
+        super().__init__(data)
+        self.sizes = []
+
+    def read(self, size: int = -1) -> bytes:
+        self.sizes.append(size)
+        return super().read(size)
+
+
+def test_stream_not_loaded_is_read_in_chunks():
+    # random data does not compress, the payload is as large as the content
+    data = random.Random(1).randbytes(1 << 20)
+    payload = zlib.compress(data)
+    file = CountingFile(
+        b"1 0 obj\n<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(payload)
+        + payload
+        + b"\nendstream\nendobj\n"
+    )
+    stream = PDFObject.read(file, 0).content
+    assert b"".join(stream.iter_decoded(chunk_size=0x4000)) == data
+    assert 0 < max(file.sizes) <= 0x4000
+    assert not stream.loaded
+
+
+def test_names_past_the_intern_table_compare_by_value(monkeypatch):
+    from src import PDFPrimitives
+    from src.PDFPrimitives import PDFDict, PDFName
+
+    monkeypatch.setattr(PDFPrimitives, "MAX_NAMES", len(PDFPrimitives.NAMES))
+    a, b = PDFName("NotInternedName"), PDFName.from_bytes(b"NotInternedName")
+    assert a is not b and a == b and not a != b
+    assert "NotInternedName" not in PDFPrimitives.NAMES
+    d = PDFDict()
+    d[a] = 1
+    assert d[b] == 1 and d["NotInternedName"] == 1
+
+
+def test_one_token_elements():
+    data = b" 12 0 R\t-3 +.5 4. true false null 7 8 Rx 12abc 1.2.3 %c\n9"
+    elems, pos = [], 0
+    while pos < len(data):
+        elem, pos = PDFObject.next_elem(data, pos)
+        elems.append(elem)
+    ref, *rest = elems
+    assert isinstance(ref, PDFIndirectReference) and (ref.on, ref.gn) == (12, 0)
+    assert isinstance(rest[5], PDFNull)
+    del rest[5]
+    assert rest == [-3, 0.5, 4.0, True, False, 7, 8, b"Rx", b"12abc", b"1.2.3", 9]
+    assert [type(e) for e in rest[:3]] == [int, float, float]
+
+
+@pytest.mark.parametrize(
+    "data, string",
+    [
+        (b"(plain)", b"plain"),
+        # balanced parentheses are kept, escaped ones need no balance
+        (b"(a(b(c)d)e)", b"a(b(c)d)e"),
+        (b"(\\(\\)\\))", b"())"),
+        (b"(\\n\\r\\t\\b\\f\\\\)", b"\n\r\t\b\f\\"),
+        # one to three octal digits, high bits dropped
+        (b"(\\101\\0532\\7x\\777)", b"A+2\x07x\xff"),
+        (b"(\\18)", b"\x018"),
+        # a backslash ending the line joins the lines
+        (b"(a\\\nb\\\r\nc\\\rd)", b"abcd"),
+        # any end of line reads as \n
+        (b"(a\r\nb\rc\nd)", b"a\nb\nc\nd"),
+        # an unknown escape stands for the byte
+        (b"(\\q\\%)", b"q%"),
+    ],
+)
+def test_literal_strings(data, string):
+    assert PDFStr.lax_at(b"x" + data + b" 1", 1) == (string, len(data) + 1)
+
+
+@pytest.mark.parametrize("data", [b"(abc", b"(a(b)", b"(abc\\", b"(abc\\)", b"(a\\\r"])
+def test_unterminated_literal_strings(data):
+    with pytest.raises(ValueError):
+        PDFStr.lax_at(data, 0)
@@ -0,0 +1,85 @@
+import pytest
+from src.PDFPrimitives import PDFObject
+from src.streamparser import (
+    PATH_OPCODES,
+    Path,
+    StreamStack,
+    UnknownOperator,
+    inline_length,
+    iter_operators,
+    iter_operators_chunks,
+)
+
+
+def test_path_add_bad_operand_after_valid_segment():
+    path = Path()
+    assert path.add(PATH_OPCODES["m"], [1, 2])
+    assert not path.add(PATH_OPCODES["l"], [3, "x"])
+    assert list(path.coords) == [1, 2]
+    assert path.add(PATH_OPCODES["l"], [3, 4])
+    assert list(path.coords) == [1, 2, 3, 4]
+    assert [(c.x, c.y) for c in path] == [(1, 2), (3, 4)]
+    repr(path)
+
+
+def test_non_ascii_operator_is_unknown():
+    events = list(iter_operators(b"1 0 0 1 0 0 cm 5 op\xe9 q Q"))
+    assert [op for op, _ in events] == ["cm", "op\xe9", "q", "Q"]
+    stack = StreamStack.get_stack(b"1 2 op\xe9 q Q")
+    assert isinstance(stack[0], UnknownOperator) and stack[0].operands == [1, 2]
+
+
+def test_leftover_operands_and_stray_closers_are_dropped():
+    assert list(iter_operators(b"q ] 1 2 m >> Q 3 4")) == [("q", []), ("m", [1, 2]), ("Q", [])]
+
+
+@pytest.mark.parametrize(
+    "attrs, length",
+    [
+        (b"<< /W 3 /H 2 /CS /RGB >>", 18),
+        (b"<< /Width 3 /Height 2 /ColorSpace /DeviceCMYK /BitsPerComponent 8 >>", 24),
+        # rows are padded to whole bytes
+        (b"<< /W 10 /H 2 /BPC 1 /CS /G >>", 4),
+        (b"<< /W 9 /H 1 /IM true >>", 2),
+        (b"<< /W 3 /H 1 /BPC 4 /CS [/I /RGB 1 <000000ffffff>] >>", 2),
+        (b"<< /W 3 /H 1 /F /AHx /L 7 >>", 7),
+        # only scanning for EI can tell
+        (b"<< /W 3 /H 1 /CS /Cs1 >>", None),
+        (b"<< /W 3 /H 1 /CS /G /F /AHx >>", None),
+        (b"<< /H 1 /CS /G >>", None),
+    ],
+)
+def test_inline_length(attrs, length):
+    assert inline_length(PDFObject.lax(attrs)) == length
+
+
+@pytest.mark.parametrize(
+    "content, data",
+    [
+        # the computed length skips an EI inside the data
+        (b"BI /W 4 /H 1 /CS /G ID EI Q EI Q", b"EI Q"),
+        (b"BI /W 2 /H 1 /CS /G ID \x00\xff\r\n  EI Q", b"\x00\xff"),
+        (b"BI /W 2 /H 1 /L 3 /CS /G ID EI\x00 EI Q", b"EI\x00"),
+        # no length, the first EI token ends the data
+        (b"BI /W 2 /H 1 /F /AHx ID 4EIB45> EI Q", b"4EIB45>"),
+        (b"BI /W 2 /H 1 /CS /Cs1 ID \x01EI\x02 EI/Im Q", b"\x01EI\x02"),
+        # a computed length that does not end at EI is not trusted
+        (b"BI /W 2 /H 1 /CS /G ID abc EI Q", b"abc"),
+    ],
+)
+def test_inline_image_boundaries(content, data):
+    events = list(iter_operators(content))
+    assert [op for op, _ in events] == ["BI", "Q"]
+    assert events[0][1][1] == data
+    # cut anywhere, the chunks give the same image
+    for cut in range(1, len(content)):
+        assert list(iter_operators_chunks([content[:cut], content[cut:]])) == events
+
+
+def test_inline_image_at_the_end_and_broken_ones():
+    attrs = PDFObject.lax(b"<< /W 1 /H 1 /CS /G >>")
+    assert list(iter_operators(b"BI /W 1 /H 1 /CS /G ID \x00 EI")) == [("BI", [attrs, b"\x00"])]
+    with pytest.raises(ValueError):
+        list(iter_operators(b"BI /W 1 /H 1 /F /AHx ID 00> EIQ"))
+    with pytest.raises(ValueError):
+        list(iter_operators(b"BI /W 1 1 ID \x00 EI"))
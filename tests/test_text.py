@@ -0,0 +1,53 @@
+from benchmarks.corpus import build_page, write_temp
+from src.pdfparser import PDFFile
+from src.text import Span
+
+# widths are not given, every glyph is half an em wide
+FONT = b"/Font << /F1 5 0 R >>"
+HELVETICA = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"
+
+
+def page(content, resources=b"<< %s >>" % FONT, objects=(HELVETICA,)):
+    return PDFFile(write_temp(build_page(content, resources, list(objects))))[0]
+
+
+def test_span_position_width_and_height():
+    spans = page(b"BT /F1 10 Tf 72 700 Td (Hello) Tj ET").extract_text(spans=True)
+    assert spans == [Span(72.0, 700.0, 25.0, 10.0, "Hello")]
+
+
+def test_spacing_and_scaling_widen_the_advance():
+    # 3 glyphs of 5, 3 char spaces of 1, a word space of 2, all at 200%
+    spans = page(b"BT /F1 10 Tf 1 Tc 2 Tw 200 Tz (a b) Tj (c) Tj ET").extract_text(spans=True)
+    assert [(s.x, s.w) for s in spans] == [(0.0, 40.0), (40.0, 12.0)]
+
+
+def test_tj_adjustments_break_words():
+    assert page(b"BT /F1 10 Tf [(Hel) -20 (lo) -300 (world)] TJ ET").extract_text() == "Hello world"
+
+
+def test_lines_from_td_tstar_and_quote():
+    content = b"BT /F1 10 Tf 12 TL 72 700 Td (one) Tj T* (two) Tj (three) ' 0 -12 Td (four) Tj ET"
+    assert page(content).extract_text() == "one\ntwo\nthree\nfour"
+
+
+def test_cm_scales_and_q_restores():
+    content = b"q 2 0 0 2 0 0 cm BT /F1 10 Tf 10 10 Td (A) Tj ET Q BT /F1 10 Tf 10 10 Td (B) Tj ET"
+    spans = page(content).extract_text(spans=True)
+    assert spans == [Span(20.0, 20.0, 10.0, 20.0, "A"), Span(10.0, 10.0, 5.0, 10.0, "B")]
+
+
+def test_tm_and_rise():
+    spans = page(b"BT /F1 10 Tf 0 1 -1 0 100 200 Tm 3 Ts (up) Tj ET").extract_text(spans=True)
+    # rotated a quarter turn, the string runs up the page and rises to the left
+    assert [(s.x, s.y, s.w, s.text) for s in spans] == [(97.0, 200.0, 10.0, "up")]
+
+
+def test_font_encoding_is_used():
+    font = b"<< /Type /Font /Subtype /Type1 /BaseFont /Symbol /Encoding << /Differences [97 /alpha /beta] >> >>"
+    assert page(b"BT /F1 10 Tf (abc) Tj ET", objects=[font]).extract_text() == "αβc"
+
+
+def test_unknown_font_and_bad_operands_are_lived_with():
+    content = b"BT /F9 10 Tf (caf\xe9) Tj /F1 x Tf 0 -20 Td (ok) Tj ET"
+    assert page(content).extract_text() == "café\nok"
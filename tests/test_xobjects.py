@@ -0,0 +1,238 @@
+import io
+import zlib
+import pytest
+from benchmarks.corpus import build_page, png_up, stream_object, write_temp
+from src.pdfparser import PDFFile
+from src.PDFPrimitives import PDFDict, PDFIndirectReference, PDFObject, PDFResources, PDFStream
+from src.streamparser import StreamStack
+from src.xobjects import FormExpander, ImageInfo, PDFImage, color_components
+
+HELVETICA = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"
+
+
+def form(content, extra=b""):
+    return stream_object(content, extra=b"/Type /XObject /Subtype /Form " + extra)
+
+
+# the page paints Fm1, which has its own fonts and paints Fm2. Fm2 has no
+# resources of its own, it uses Fm1's, and paints itself
+FORMS = [
+    HELVETICA,
+    form(
+        b"BT /F2 10 Tf (outer) Tj ET /Fm2 Do",
+        b"/Matrix [2 0 0 2 10 20] /BBox [0 0 50 40] /Resources << /Font << /F2 5 0 R >> /XObject << /Fm2 7 0 R >> >> ",
+    ),
+    form(b"BT /F2 10 Tf (inner) Tj ET /Fm2 Do", b"/Matrix [1 0 0 1 5 0] "),
+]
+
+
+def open_page(content=b"/Fm1 Do", resources=b"<< /XObject << /Fm1 6 0 R >> >>", objects=FORMS):
+    file = PDFFile(write_temp(build_page(content, resources, list(objects))))
+    return file, file[0]
+
+
+def test_nested_forms_are_played_in_place():
+    _, page = open_page()
+    assert list(page.operators()) == [
+        ("q", []),
+        ("cm", [2.0, 0.0, 0.0, 2.0, 10.0, 20.0]),
+        ("re", [0, 0, 50, 40]),
+        ("W", []),
+        ("n", []),
+        ("BT", []),
+        ("Tf", ["F2", 10]),
+        ("Tj", [b"outer"]),
+        ("ET", []),
+        ("q", []),
+        ("cm", [1.0, 0.0, 0.0, 1.0, 5.0, 0.0]),
+        ("BT", []),
+        ("Tf", ["F2", 10]),
+        ("Tj", [b"inner"]),
+        ("ET", []),
+        # a form painting itself is left as its Do
+        ("Do", ["Fm2"]),
+        ("Q", []),
+        ("Q", []),
+    ]
+
+
+def test_fonts_come_from_the_form_and_matrices_nest():
+    _, page = open_page()
+    spans = page.extract_text(spans=True)
+    # Fm2's translation by 5 is scaled by Fm1's matrix
+    assert [(s.x, s.y, s.h, s.text) for s in spans] == [(10.0, 20.0, 20.0, "outer"), (20.0, 20.0, 20.0, "inner")]
+
+
+def test_resources_follow_the_played_form():
+    _, page = open_page(b"/Fm1 Do BT /F2 10 Tf (after) Tj ET")
+    expander = page.operators()
+    scopes = [
+        (op, getattr(expander.resources.entry("XObject", "Fm2"), "on", None))
+        for op, _ in expander
+        if op in ("Tj", "Do")
+    ]
+    # Fm2 plays with Fm1's resources, the page has no Fm2
+    assert scopes == [("Tj", 7), ("Tj", 7), ("Do", 7), ("Tj", None)]
+
+
+def test_max_depth_leaves_deeper_forms_as_do():
+    file, page = open_page()
+    operators = list(FormExpander(file, page.operators(expand_forms=False), page.Resources, max_depth=1))
+    assert [op for op, _ in operators].count("Do") == 1
+    assert ("Tj", [b"outer"]) in operators and ("Tj", [b"inner"]) not in operators
+
+
+def test_images_and_missing_xobjects_stay_as_do():
+    stream = stream_object(
+        b"\x00", compress=False, extra=b"/Subtype /Image /Width 1 /Height 1 /BitsPerComponent 8 "
+        b"/ColorSpace /DeviceGray "
+    )
+    _, page = open_page(b"/Im1 Do /Nope Do", b"<< /XObject << /Im1 5 0 R >> >>", [stream])
+    assert list(page.operators()) == [("Do", ["Im1"]), ("Do", ["Nope"])]
+
+
+def test_a_form_is_decoded_once():
+    file, page = open_page(b"/Fm1 Do /Fm1 Do")
+    assert [op for op, _ in page.operators()].count("Tj") == 4
+    ref = PDFIndirectReference(6, 0)
+    assert file.form(ref) is file.form(ref)
+    assert file.form(PDFIndirectReference(5, 0)) is None
+
+
+def image(attrs, data, compress=True, objects=()):
+    """the PDFImage of a page's only image XObject, object 5, `objects` follow it"""
+    stream = stream_object(data, compress, b"/Type /XObject /Subtype /Image " + attrs)
+    file = PDFFile(write_temp(build_page(b"/Im1 Do", b"<< /XObject << /Im1 5 0 R >> >>", [stream, *objects])))
+    ((name, found),) = file[0].images()
+    assert name == "Im1"
+    return found
+
+
+def test_attributes_without_the_data():
+    found = image(b"/Width 2 /Height 1 /BitsPerComponent 8 /ColorSpace /DeviceRGB ", bytes(6))
+    assert found.info == ImageInfo(2, 1, 8, "DeviceRGB", ["FlateDecode"])
+    assert (found.components, found.codec, found.extension) == (3, None, ".bin")
+
+
+def test_raw_samples_and_predictors():
+    rows = [b"\x10\x20\x30", b"\x11\x22\x33"]
+    found = image(
+        b"/Width 1 /Height 2 /BitsPerComponent 8 /ColorSpace /DeviceRGB "
+        b"/DecodeParms << /Predictor 12 /Colors 3 /Columns 1 >> ",
+        png_up(rows),
+    )
+    assert found.passthrough() == b"".join(rows)
+    assert found.to_array().tolist() == [[[16, 32, 48]], [[17, 34, 51]]]
+
+
+@pytest.mark.parametrize(
+    "attrs, data, samples",
+    [
+        # rows are padded to whole bytes
+        (b"/Width 3 /Height 2 /BitsPerComponent 1 /ColorSpace /DeviceGray ", b"\xa0\x40", [[1, 0, 1], [0, 1, 0]]),
+        (b"/Width 4 /Height 1 /BitsPerComponent 2 /ColorSpace /DeviceGray ", b"\x1b", [[0, 1, 2, 3]]),
+        (b"/Width 2 /Height 1 /BitsPerComponent 16 /ColorSpace /DeviceGray ", b"\x01\x00\xff\xff", [[256, 65535]]),
+        (b"/Width 2 /Height 1 /ImageMask true ", b"\x80", [[1, 0]]),
+        (
+            b"/Width 2 /Height 1 /BitsPerComponent 8 /ColorSpace /DeviceCMYK ",
+            bytes(range(8)),
+            [[[0, 1, 2, 3], [4, 5, 6, 7]]],
+        ),
+    ],
+)
+def test_decoded_samples(attrs, data, samples):
+    assert image(attrs, data).to_array().tolist() == samples
+
+
+def test_indexed_images_look_up_their_palette():
+    found = image(
+        b"/Width 2 /Height 1 /BitsPerComponent 8 /ColorSpace [/Indexed /DeviceRGB 1 <ff000000ff00>] ", b"\x01\x00"
+    )
+    assert found.components == 1
+    assert found.to_array().tolist() == [[[0, 255, 0], [255, 0, 0]]]
+    # the lookup table in a stream of its own, indices past hival clamp to it
+    found = image(
+        b"/Width 4 /Height 1 /BitsPerComponent 2 /ColorSpace [/Indexed /DeviceGray 2 6 0 R] ",
+        b"\x1b",
+        objects=[stream_object(b"\x00\x80\xff")],
+    )
+    assert found.to_array().tolist() == [[0, 128, 255, 255]]
+
+
+def test_codec_data_is_passed_through():
+    jpeg = b"\xff\xd8 not decoded \xff\xd9"
+    found = image(
+        b"/Width 1 /Height 1 /BitsPerComponent 8 /ColorSpace /DeviceGray /Filter [/FlateDecode /DCTDecode] ",
+        zlib.compress(jpeg),
+        compress=False,
+    )
+    assert (found.codec, found.extension) == ("DCTDecode", ".jpg")
+    assert found.passthrough() == jpeg
+    # the stream is not decoded in place
+    assert found.passthrough() == jpeg
+
+
+def test_undecodable_images_raise():
+    jbig2 = image(b"/Width 1 /Height 1 /BitsPerComponent 1 /Filter /JBIG2Decode ", b"\x00", compress=False)
+    with pytest.raises(ValueError):
+        jbig2.to_array()
+    short = image(b"/Width 4 /Height 4 /BitsPerComponent 8 /ColorSpace /DeviceGray ", bytes(15))
+    with pytest.raises(ValueError):
+        short.to_array()
+    pattern = image(b"/Width 1 /Height 1 /BitsPerComponent 8 /ColorSpace /Pattern ", b"\x00")
+    with pytest.raises(ValueError):
+        pattern.to_array()
+
+
+def test_pillow_decodes_jpeg():
+    Image = pytest.importorskip("PIL.Image")
+    out = io.BytesIO()
+    Image.new("L", (8, 4), 128).save(out, "JPEG", quality=95)
+    found = image(
+        b"/Width 8 /Height 4 /BitsPerComponent 8 /ColorSpace /DeviceGray /Filter /DCTDecode ",
+        out.getvalue(),
+        compress=False,
+    )
+    samples = found.to_array()
+    assert samples.shape == (4, 8) and abs(int(samples.min()) - 128) <= 2 and abs(int(samples.max()) - 128) <= 2
+
+
+def test_inline_images():
+    (inline,) = StreamStack.get_stack(b"BI /W 2 /H 1 /BPC 8 /CS /RGB ID \x01\x02EI\x04\x05\x06 EI")
+    found = PDFImage.from_inline(inline)
+    assert found.info == ImageInfo(2, 1, 8, "DeviceRGB", [])
+    assert found.to_array().tolist() == [[[1, 2, 69], [73, 4, 5]]]
+    # a colour space named in the resources
+    resources = PDFResources(PDFObject.lax(b"<< /ColorSpace << /Cs1 [/Indexed /DeviceGray 1 <00ff>] >> >>"))
+    (inline,) = StreamStack.get_stack(b"BI /W 2 /H 1 /BPC 1 /CS /Cs1 ID \x40 EI")
+    assert PDFImage.from_inline(inline, resources).to_array().tolist() == [[0, 255]]
+
+
+@pytest.mark.parametrize(
+    "space, components",
+    [
+        (b"/DeviceGray", 1),
+        (b"/DeviceCMYK", 4),
+        (b"[/CalRGB << >>]", 3),
+        (b"[/Lab << >>]", 3),
+        (b"[/ICCBased 1 0 R]", 4),
+        (b"[/Indexed /DeviceRGB 255 <00>]", 1),
+        (b"[/Separation /Spot /DeviceCMYK 2 0 R]", 1),
+        (b"[/DeviceN [/Cyan /Spot] /DeviceCMYK 2 0 R]", 2),
+        (b"[/DeviceN 3 0 R /DeviceCMYK 2 0 R]", 3),
+        (b"/Pattern", None),
+        (b"[/ICCBased 2 0 R]", None),
+        (b"[]", None),
+    ],
+)
+def test_color_components(space, components):
+    objects = {
+        1: PDFStream(PDFDict(N=4), b"", length=0),
+        2: PDFDict(),
+        3: PDFObject.lax(b"[/Cyan /Magenta /Spot]"),
+    }
+
+    def resolve(value):
+        return objects[value.on] if isinstance(value, PDFIndirectReference) else value
+
+    assert color_components(PDFObject.lax(space), resolve) == components
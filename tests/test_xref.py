@@ -0,0 +1,109 @@
+import pytest
+from benchmarks.corpus import append_update, build_document, stream_object, write_temp
+from src.pdfparser import PDFFile, XREFTable
+
+PAGE_OBJECTS = [
+    b"<< /Type /Catalog /Pages 2 0 R >>",
+    b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+    b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 1 1] /Contents 4 0 R >>",
+    stream_object(b"7 0 m\n", compress=False),
+]
+
+
+def first_operand(file, key=0):
+    return next(iter(file[key].operators()))[1][0]
+
+
+def raw_objects(objects, numbers=None):
+    """the objects serialized after a header, and their offsets"""
+    out = bytearray(b"%PDF-1.5\n")
+    offsets = {}
+    for on, body in zip(numbers or range(1, len(objects) + 1), objects):
+        offsets[on] = len(out)
+        out += b"%d 0 obj\n" % on + body + b"\nendobj\n"
+    return out, offsets
+
+
+def xref_stream(on, rows, widths, index, extra=b""):
+    """an uncompressed /Type /XRef stream object holding `rows`, (type, field 2, field 3) each"""
+    data = b"".join(
+        b"".join(value.to_bytes(width, "big") for value, width in zip(row, widths) if width) for row in rows
+    )
+    size = max(first + count for first, count in zip(index[::2], index[1::2]))
+    return (
+        b"%d 0 obj\n<< /Type /XRef /Size %d /W [%d %d %d] /Index [%s] /Length %d %s>>\nstream\n"
+        % (on, size, *widths, b" ".join(b"%d" % i for i in index), len(data), extra)
+        + data
+        + b"\nendstream\nendobj\n"
+    )
+
+
+def object_stream(objects):
+    """the body of an /ObjStm holding `objects`, object number -> body"""
+    header, payload = bytearray(), bytearray()
+    for on, body in objects.items():
+        header += b"%d %d " % (on, len(payload))
+        payload += body + b"\n"
+    return stream_object(
+        bytes(header + payload), extra=b"/Type /ObjStm /N %d /First %d " % (len(objects), len(header))
+    )
+
+
+def test_xref_stream_with_compressed_objects():
+    path = write_temp(build_document([b"1 0 m\n", b"2 0 m\n"], xref_stream=True))
+    file = PDFFile(path)
+    assert file.xref_table.types[1] == XREFTable.COMPRESSED
+    assert file.get_object(1).content["Type"] == "Catalog"
+    assert [first_operand(file, i) for i in range(2)] == [1, 2]
+
+
+@pytest.mark.parametrize(
+    "widths, index",
+    [((1, 4, 2), [0, 6]), ((1, 3, 1), [0, 3, 3, 3]), ((0, 2, 1), [1, 5])],
+)
+def test_xref_stream_widths_and_subsections(widths, index):
+    out, offsets = raw_objects(PAGE_OBJECTS)
+    offsets[5] = len(out)
+    numbers = [on for first, count in zip(index[::2], index[1::2]) for on in range(first, first + count)]
+    rows = [(0, 0, 0xFF) if on == 0 else (1, offsets[on], 0) for on in numbers]
+    out += xref_stream(5, rows, widths, index, b"/Root 1 0 R ")
+    out += b"startxref\n%d\n%%%%EOF\n" % offsets[5]
+    file = PDFFile(write_temp(bytes(out)))
+    assert [file.xref_table.offsets[on] for on in range(1, 6)] == [offsets[on] for on in range(1, 6)]
+    assert first_operand(file) == 7
+
+
+def test_incremental_update_overrides_an_object():
+    pdf = build_document([b"1 0 m\n", b"2 0 m\n"])
+    # object 4 is the first page's content stream
+    pdf = append_update(pdf, {4: stream_object(b"9 0 m\n")})
+    file = PDFFile(write_temp(pdf))
+    assert [first_operand(file, i) for i in range(2)] == [9, 2]
+
+
+def test_update_over_an_xref_stream_keeps_the_compressed_objects():
+    pdf = build_document([b"1 0 m\n"], xref_stream=True)
+    pdf = append_update(pdf, {4: stream_object(b"5 0 m\n")})
+    file = PDFFile(write_temp(pdf))
+    assert file.xref_table.types[1] == XREFTable.COMPRESSED
+    assert first_operand(file) == 5
+
+
+def test_hybrid_file_with_xrefstm():
+    # the catalog and the pages node live in an object stream only the
+    # /XRefStm lists, the classic table has the rest
+    out, offsets = raw_objects(
+        [PAGE_OBJECTS[2], PAGE_OBJECTS[3], object_stream({1: PAGE_OBJECTS[0], 2: PAGE_OBJECTS[1]})], [3, 4, 5]
+    )
+    offsets[6] = len(out)
+    out += xref_stream(6, [(2, 5, 0), (2, 5, 1)], (1, 2, 1), [1, 2])
+    start_xref = len(out)
+    out += b"xref\n0 1\n0000000000 65535 f \n3 4\n"
+    for on in range(3, 7):
+        out += b"%010d 00000 n \n" % offsets[on]
+    out += b"trailer\n<< /Size 7 /Root 1 0 R /XRefStm %d >>\n" % offsets[6]
+    out += b"startxref\n%d\n%%%%EOF\n" % start_xref
+    file = PDFFile(write_temp(bytes(out)))
+    assert [file.xref_table.types[on] for on in range(1, 7)] == [XREFTable.COMPRESSED] * 2 + [XREFTable.IN_USE] * 4
+    assert file.get_object(2).content["Count"] == 1
+    assert first_operand(file) == 7